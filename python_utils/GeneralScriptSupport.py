@@ -61,6 +61,8 @@ import time
 import datetime
 import optparse
 import traceback
+import threading
+import signal
 
 #
 # Byte array / string / unicode support across Python 2 & 3
@@ -265,13 +267,18 @@ class SysCmndInterceptor:
     self.__fallThroughCmndRegexList = []
     self.__interceptedCmndStructList = []
     self.__allowExtraCmnds = True
+    # Guards the lists above so that commands can be intercepted from
+    # multiple threads (see processInterceptedCmnd())
+    self.__lock = threading.RLock()
 
   def setFallThroughCmndRegex(self, cmndRegex):
-    self.__fallThroughCmndRegexList.append(cmndRegex)
+    with self.__lock:
+      self.__fallThroughCmndRegexList.append(cmndRegex)
 
   def setInterceptedCmnd(self, cmndRegex, cmndReturn, cmndOutput=None):
-    self.__interceptedCmndStructList.append(
-       InterceptedCmndStruct(cmndRegex, cmndReturn, cmndOutput) )
+    with self.__lock:
+      self.__interceptedCmndStructList.append(
+         InterceptedCmndStruct(cmndRegex, cmndReturn, cmndOutput) )
 
   def setAllowExtraCmnds(self, allowExtraCmnds):
     self.__allowExtraCmnds = allowExtraCmnds
@@ -280,45 +287,62 @@ class SysCmndInterceptor:
      return len(self.__interceptedCmndStructList) > 0
 
   def getFallThroughCmndRegexList(self):
-    return self.__fallThroughCmndRegexList[:]
+    with self.__lock:
+      return self.__fallThroughCmndRegexList[:]
 
   def getInterceptedCmndStructList(self):
-    return self.__interceptedCmndStructList[:]
+    with self.__lock:
+      return self.__interceptedCmndStructList[:]
 
   def doProcessInterceptedCmnd(self, cmnd):
     #print("doProcessInterceptedCmnd(): cmnd='" + cmnd + "'")
-    if self.isFallThroughCmnd(cmnd):
+    with self.__lock:
+      if self.isFallThroughCmnd(cmnd):
+        return False
+      if len(self.__interceptedCmndStructList) > 0:
+        return True
+      if not self.__allowExtraCmnds:
+        return True
       return False
-    if len(self.__interceptedCmndStructList) > 0:
-      return True
-    if not self.__allowExtraCmnds:
-      return True
-    return False
 
   def isFallThroughCmnd(self, cmnd):
-     for interceptCmndStruct in self.__interceptedCmndStructList:
-       if re.match(interceptCmndStruct.cmndRegex, cmnd):
-         return False
-     for cmndRegex in self.__fallThroughCmndRegexList:
-       if re.match(cmndRegex, cmnd):
-         return True
-     return False
+    with self.__lock:
+      for interceptCmndStruct in self.__interceptedCmndStructList:
+        if re.match(interceptCmndStruct.cmndRegex, cmnd):
+          return False
+      for cmndRegex in self.__fallThroughCmndRegexList:
+        if re.match(cmndRegex, cmnd):
+          return True
+      return False
 
   def nextInterceptedCmndStruct(self, cmnd):
-    assert(not self.isFallThroughCmnd(cmnd))
-    if len(self.__interceptedCmndStructList) == 0:
-      raise Exception("Error, cmnd='"+cmnd+"' is past the last expected command!")
-    ics = self.__interceptedCmndStructList[0]
-    if not re.match(ics.cmndRegex, cmnd):
-      raise Exception("Error, cmnd='" + cmnd + "' did not match the" \
-                      " expected regex='" + ics.cmndRegex + "'!")
-    self.__interceptedCmndStructList.pop(0)
-    return (ics.cmndReturn, ics.cmndOutput)
+    with self.__lock:
+      assert(not self.isFallThroughCmnd(cmnd))
+      if len(self.__interceptedCmndStructList) == 0:
+        raise Exception("Error, cmnd='"+cmnd+"' is past the last expected command!")
+      ics = self.__interceptedCmndStructList[0]
+      if not re.match(ics.cmndRegex, cmnd):
+        raise Exception("Error, cmnd='" + cmnd + "' did not match the" \
+                        " expected regex='" + ics.cmndRegex + "'!")
+      self.__interceptedCmndStructList.pop(0)
+      return (ics.cmndReturn, ics.cmndOutput)
+
+  def processInterceptedCmnd(self, cmnd):
+    """
+    Atomic version of doProcessInterceptedCmnd() + nextInterceptedCmndStruct()
+    that is safe to call from multiple threads.  Returns (cmndReturn,
+    cmndOutput) if the command is intercepted or None if it falls through.
+    """
+    with self.__lock:
+      if not self.doProcessInterceptedCmnd(cmnd):
+        return None
+      return self.nextInterceptedCmndStruct(cmnd)
 
   def clear(self):
-    self.__fallThroughCmndRegexList = []
-    self.__interceptedCmndStructList = []
-    self.__allowExtraCmnds = True
+    with self.__lock:
+      self.__fallThroughCmndRegexList = []
+      self.__interceptedCmndStructList = []
+      self.__allowExtraCmnds = True
 
   def readCommandsFromStr(self, cmndsStr):
     lines = cmndsStr.splitlines()
@@ -331,7 +355,7 @@ class SysCmndInterceptor:
       #(tag, entry) = line.split(':')
       #print("(tag, entry) = " + str((tag, entry)))
       if tag == "FT":
-        self.__fallThroughCmndRegexList.append(entry.strip())
+        self.setFallThroughCmndRegex(entry.strip())
       elif tag == "IT":
         entryArray = entry.split(';')
         if len(entryArray) < 3:
@@ -344,17 +368,16 @@ class SysCmndInterceptor:
           cmndOutput += cmndOutputEntry.strip()[1:-1]+"\n"
         #print("(cmndRegex, cmndReturn, cmndOutput) = " +
         #      str((cmndRegex, cmndReturn, cmndOutput)))
-        self.__interceptedCmndStructList.append(
-          InterceptedCmndStruct(cmndRegex.strip(), int(cmndReturn), cmndOutput)
-          )
+        self.setInterceptedCmnd(cmndRegex.strip(), int(cmndReturn), cmndOutput)
       else:
         raise Exception("Error, invalid tag = '"+tag+"'!")
 
   def assertAllCommandsRun(self):
-    if len(self.__interceptedCmndStructList) > 0:
-      raise Exception("Error, all of the commands have not been run starting with" \
-                      " the command " + str(self.__interceptedCmndStructList[0])
-                      + "!")
+    with self.__lock:
+      if len(self.__interceptedCmndStructList) > 0:
+        raise Exception("Error, all of the commands have not been run starting with" \
+                        " the command " + str(self.__interceptedCmndStructList[0])
+                        + "!")
 
 
 g_sysCmndInterceptor = SysCmndInterceptor()
@@ -379,6 +402,70 @@ if cmndInterceptsFile:
 g_dumpAllSysCmnds = "GENERAL_SCRIPT_SUPPORT_DUMD_COMMANDS" in os.environ
 
 
+#
+# Per-thread current working directory
+#
+# The system command functions below never change the process-wide current
+# directory (they pass cwd= to the child process instead).  For backward
+# compatibility, echoChDir() still calls os.chdir() in the main thread, but
+# in any other thread it only changes the working directory of that thread
+# (stored below) which is then used by all of the system command functions
+# and the file/path utilities in this module (e.g. writeStrToFile(),
+# readStrFromFile(), createDir() and removeIfExists()) called from that
+# thread.  This allows the existing scripts that use echoChDir() +
+# runSysCmnd() to be driven from a pool of threads.  NOTE: Direct calls to
+# open(), os.path.exists(), etc. in such a thread are still relative to the
+# process-wide current directory so they must be passed the path from
+# getThreadPath() instead.
+#
+
+g_mainThread = threading.current_thread()
+
+g_threadLocalData = threading.local()
+
+
+def getThreadWorkingDir():
+  """Return working dir set by echoChDir() in this thread or None if not set"""
+  return getattr(g_threadLocalData, 'workingDir', None)
+
+
+def setThreadWorkingDir(workingDir):
+  """Set (or unset with None) the working dir for the calling thread"""
+  if workingDir:
+    workingDir = os.path.abspath(getThreadPath(workingDir))
+  g_threadLocalData.workingDir = workingDir
+
+
+def getCurrentWorkingDir():
+  """Return the current working dir of the calling thread"""
+  threadWorkingDir = getThreadWorkingDir()
+  if threadWorkingDir:
+    return threadWorkingDir
+  return os.getcwd()
+
+
+def getThreadPath(path):
+  """Return path relative to the current working dir of the calling thread"""
+  threadWorkingDir = getThreadWorkingDir()
+  if threadWorkingDir and path:
+    return os.path.join(threadWorkingDir, path)
+  return path
+
+
+def getCmndWorkingDir(workingDir):
+  """Return the cwd argument to pass to subprocess for workingDir"""
+  return getThreadPath(workingDir) or getThreadWorkingDir()
+
+
+def getCmndOutFilePath(outFile, cmndWorkingDir):
+  """
+  Return the path of the outFile of a command run in cmndWorkingDir (from
+  getCmndWorkingDir()) since a relative outFile is relative to the working dir
+  of the command (like when the command functions used to chdir into it)
+  """
+  return os.path.join(cmndWorkingDir or "", outFile)
+
+
 def runSysCmndInterface(cmnd, outFile=None, rtnOutput=False, extraEnv=None, \
   workingDir="", getStdErr=False \
   ):
@@ -386,15 +473,18 @@ def runSysCmndInterface(cmnd, outFile=None, rtnOutput=False, extraEnv=None, \
     print("\nDUMP SYS CMND: " + cmnd + "\n")
   if outFile!=None and rtnOutput==True:
     raise Exception("Error, both outFile and rtnOutput can not be true!") 
-  if g_sysCmndInterceptor.doProcessInterceptedCmnd(cmnd):
-    (cmndReturn, cmndOutput) = g_sysCmndInterceptor.nextInterceptedCmndStruct(cmnd)
+  cmndWorkingDir = getCmndWorkingDir(workingDir)
+  interceptedCmndReturnAndOutput = \
+    g_sysCmndInterceptor.processInterceptedCmnd(cmnd)
+  if interceptedCmndReturnAndOutput:
+    (cmndReturn, cmndOutput) = interceptedCmndReturnAndOutput
     if rtnOutput:
       if cmndOutput==None:
         raise Exception("Error, the command '"+cmnd+"' gave None output when" \
                         " non-null output was expected!")
       return (cmndOutput, cmndReturn)
     if outFile:
-      writeStrToFile(outFile, cmndOutput)  
+      writeStrToFile(getCmndOutFilePath(outFile, cmndWorkingDir), cmndOutput)
     return cmndReturn
   # Else, fall through
   if extraEnv:
@@ -402,34 +492,32 @@ def runSysCmndInterface(cmnd, outFile=None, rtnOutput=False, extraEnv=None, \
     fullEnv.update(extraEnv)
   else:
     fullEnv = None
-  pwd = None
-  if workingDir:
-    pwd = os.getcwd()
-    os.chdir(workingDir)
   rtnObject = None
-  try:
-    if rtnOutput:
-      if getStdErr:
-        child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
-          stderr = subprocess.STDOUT, env=fullEnv)
-      else:
-        child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
-          env=fullEnv)
-      data = child.stdout.read()
-      #print("data = '" + str(data) + "'")
-      child.wait()
-      rtnCode = child.returncode
-      #print("rtnCode = '" + str(rtnCode) + "'")
-      rtnObject = (data, rtnCode)
+  if rtnOutput:
+    if getStdErr:
+      child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
+        stderr = subprocess.STDOUT, env=fullEnv, cwd=cmndWorkingDir)
     else:
-      outFileHandle = None
-      if outFile:
-        outFileHandle = open(outFile, 'w')
+      child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
+        env=fullEnv, cwd=cmndWorkingDir)
+    data = child.stdout.read()
+    #print("data = '" + str(data) + "'")
+    child.stdout.close()
+    child.wait()
+    rtnCode = child.returncode
+    #print("rtnCode = '" + str(rtnCode) + "'")
+    rtnObject = (data, rtnCode)
+  else:
+    outFileHandle = None
+    if outFile:
+      outFileHandle = open(getCmndOutFilePath(outFile, cmndWorkingDir), 'w')
+    try:
       rtnCode = subprocess.call(cmnd, shell=True, stderr=subprocess.STDOUT,
-        stdout=outFileHandle, env=fullEnv)
-      rtnObject = rtnCode
-  finally:
-    if pwd: os.chdir(pwd)
+        stdout=outFileHandle, env=fullEnv, cwd=cmndWorkingDir)
+    finally:
+      if outFileHandle:
+        outFileHandle.close()
+    rtnObject = rtnCode
   return rtnObject
 
 
@@ -486,12 +574,217 @@ def echoRunSysCmnd(cmnd, throwExcept=True, outFile=None, msg=None,
   return rtn
 
 
+class CmndOutputCache:
+  """
+  Memoization cache for the output of shell commands that are pure lookups
+  (e.g. 'which <exec>' or 'git config --get <var>') used by
+  getCmndOutput(..., cacheOutput=True).
+
+  Entries are keyed by the command, the working directory, getStdErr and the
+  values of a selected set of env vars (PATH and HOME by default) and are kept
+  in an in-process LRU cache with at most maxEntries entries.  If a cache file
+  is set (see setCacheFile() or the env var
+  GENERAL_SCRIPT_SUPPORT_CMND_OUTPUT_CACHE_FILE), entries are also read from
+  and written to that file and are reused across runs for up to ttlSec
+  seconds.  Use invalidate() to remove entries after an action that changes
+  the output of a cached command.  Only the output of commands that succeed
+  is cached by getCmndOutput() (e.g. 'which <exec>' must be run again after
+  <exec> is installed).
+  """
+
+  defaultKeyEnvVars = ("PATH", "HOME")
+
+  def __init__(self, maxEntries=256):
+    self.__lock = threading.RLock()
+    self.__enabled = True
+    self.__maxEntries = maxEntries
+    self.__cacheFile = None
+    self.__ttlSec = None
+    self.__clearMemory()
+
+  def setEnabled(self, enabled):
+    with self.__lock:
+      self.__enabled = enabled
+
+  def isEnabled(self):
+    return self.__enabled
+
+  def setMaxEntries(self, maxEntries):
+    with self.__lock:
+      self.__maxEntries = maxEntries
+      self.__evictEntries()
+
+  def setCacheFile(self, cacheFile, ttlSec=3600.0):
+    """Set the on-disk cache file (or unset with None)"""
+    with self.__lock:
+      if cacheFile:
+        cacheFile = os.path.abspath(cacheFile)
+      self.__cacheFile = cacheFile
+      self.__ttlSec = ttlSec
+      self.__cacheFileDict = None
+
+  def getCacheFile(self):
+    return self.__cacheFile
+
+  def getKey(self, cmnd, workingDir="", getStdErr=False, keyEnvVars=None):
+    if keyEnvVars is None:
+      keyEnvVars = self.defaultKeyEnvVars
+    keyList = [cmnd, os.path.abspath(getCurrentWorkingDir() if not workingDir
+      else getThreadPath(workingDir)), str(getStdErr)]
+    for envVar in sorted(keyEnvVars):
+      keyList.append(envVar+"="+os.environ.get(envVar, ""))
+    return "\n".join(keyList)
+
+  def get(self, key):
+    """Return (data, errCode) for key or None if not cached"""
+    with self.__lock:
+      if not self.__enabled:
+        return None
+      dataAndErrCode = self.__memoryDict.get(key)
+      if dataAndErrCode is None:
+        cacheFileDict = self.__getCacheFileDict()
+        if key in cacheFileDict:
+          (timeStamp, dataStr, errCode) = cacheFileDict[key]
+          if time.time() - timeStamp <= self.__ttlSec:
+            dataAndErrCode = (self.__dataFromStr(dataStr), errCode)
+            self.__memoryDict[key] = dataAndErrCode
+            self.__evictEntries()
+      if dataAndErrCode is not None:
+        self.__useCounter += 1
+        self.__lastUseDict[key] = self.__useCounter
+      return dataAndErrCode
+
+  def set(self, key, data, errCode):
+    with self.__lock:
+      if not self.__enabled:
+        return
+      self.__useCounter += 1
+      self.__memoryDict[key] = (data, errCode)
+      self.__lastUseDict[key] = self.__useCounter
+      self.__evictEntries()
+      if self.__cacheFile:
+        cacheFileDict = self.__getCacheFileDict()
+        cacheFileDict[key] = (time.time(), self.__dataToStr(data), errCode)
+        self.__writeCacheFileDict()
+
+  def invalidate(self, cmndRegex=None):
+    """Remove the entries for commands matching cmndRegex (or all entries)"""
+    with self.__lock:
+      def keyMatches(key):
+        return cmndRegex is None or re.match(cmndRegex, key.split("\n")[0])
+      for key in list(self.__memoryDict.keys()):
+        if keyMatches(key):
+          del self.__memoryDict[key]
+          del self.__lastUseDict[key]
+      if self.__cacheFile:
+        cacheFileDict = self.__getCacheFileDict()
+        numEntries = len(cacheFileDict)
+        for key in list(cacheFileDict.keys()):
+          if keyMatches(key):
+            del cacheFileDict[key]
+        if len(cacheFileDict) != numEntries:
+          self.__writeCacheFileDict()
+
+  def clear(self):
+    self.invalidate()
+
+  def __clearMemory(self):
+    self.__memoryDict = {}
+    self.__lastUseDict = {}
+    self.__useCounter = 0
+    self.__cacheFileDict = None
+
+  def __evictEntries(self):
+    while len(self.__memoryDict) > self.__maxEntries:
+      (lastUse, key) = min([ (lastUse, key) for (key, lastUse) in
+        self.__lastUseDict.items() ])
+      del self.__memoryDict[key]
+      del self.__lastUseDict[key]
+
+  # Command output (str in Python 2 and bytes in Python 3) is stored as latin-1
+  # in the JSON cache file so that it round trips exactly
+  def __dataToStr(self, data):
+    return data.decode("latin-1")
+
+  def __dataFromStr(self, dataStr):
+    return dataStr.encode("latin-1")
+
+  def __getCacheFileDict(self):
+    if not self.__cacheFile:
+      return {}
+    if self.__cacheFileDict is None:
+      import json
+      self.__cacheFileDict = {}
+      try:
+        cacheFileDict = json.loads(open(self.__cacheFile, 'r').read())
+      except (IOError, ValueError):
+        cacheFileDict = {} # Missing or corrupted cache file, just start over
+      if not isinstance(cacheFileDict, dict):
+        cacheFileDict = {} # Not written by this class, just start over
+      # Drop the expired entries (and the ones with the wrong format)
+      now = time.time()
+      for (key, entry) in cacheFileDict.items():
+        if isinstance(entry, list) and len(entry) == 3 and \
+          isinstance(entry[0], (int, float)) and \
+          isinstance(entry[1], type(u"")) and isinstance(entry[2], int) and \
+          now - entry[0] <= self.__ttlSec \
+          :
+          self.__cacheFileDict[key] = entry
+    return self.__cacheFileDict
+
+  def __writeCacheFileDict(self):
+    import json
+    # Write to a temp file and rename so that concurrent runs never read a
+    # partially written file
+    tmpCacheFile = self.__cacheFile+"."+str(os.getpid())+".tmp"
+    try:
+      tmpCacheFileHandle = open(tmpCacheFile, 'w')
+      try:
+        tmpCacheFileHandle.write(json.dumps(self.__cacheFileDict))
+      finally:
+        tmpCacheFileHandle.close()
+      os.rename(tmpCacheFile, self.__cacheFile)
+    except (IOError, OSError) as e:
+      # The on-disk cache is just an optimization so don't fail on it
+      print("\nWARNING: Could not write the command output cache file '" +
+        self.__cacheFile + "': " + str(e))
+
+
+g_cmndOutputCache = CmndOutputCache()
+
+# Cache command output across runs?
+cmndOutputCacheFile = os.environ.get(
+  "GENERAL_SCRIPT_SUPPORT_CMND_OUTPUT_CACHE_FILE","")
+if cmndOutputCacheFile:
+  g_cmndOutputCache.setCacheFile(cmndOutputCacheFile, float(os.environ.get(
+    "GENERAL_SCRIPT_SUPPORT_CMND_OUTPUT_CACHE_TTL_SEC","3600")))
+
+
 def getCmndOutput(cmnd, stripTrailingSpaces=False, throwOnError=True, workingDir="", \
-  getStdErr=False, rtnCode=False \
+  getStdErr=False, rtnCode=False, cacheOutput=False, cacheKeyEnvVars=None \
   ):
-  """Run a shell command and return its output"""
-  (data, errCode) = runSysCmndInterface(cmnd, rtnOutput=True, workingDir=workingDir,
-    getStdErr=getStdErr)
+  """
+  Run a shell command and return its output.
+
+  If cacheOutput=True, the command is treated as a pure lookup and its output
+  is memoized in g_cmndOutputCache (see CmndOutputCache), keyed by the
+  command, workingDir, getStdErr and the env vars in cacheKeyEnvVars.  The
+  output of a command that fails is not cached.
+  """
+  cacheKey = None
+  if cacheOutput and not g_sysCmndInterceptor.doProcessInterceptedCmnd(cmnd):
+    cacheKey = g_cmndOutputCache.getKey(cmnd, workingDir, getStdErr,
+      cacheKeyEnvVars)
+  cachedDataAndErrCode = None
+  if cacheKey:
+    cachedDataAndErrCode = g_cmndOutputCache.get(cacheKey)
+  if cachedDataAndErrCode:
+    (data, errCode) = cachedDataAndErrCode
+  else:
+    (data, errCode) = runSysCmndInterface(cmnd, rtnOutput=True,
+      workingDir=workingDir, getStdErr=getStdErr)
+    if cacheKey and errCode == 0:
+      g_cmndOutputCache.set(cacheKey, data, errCode)
   if errCode != 0:
     if throwOnError:
       raise RuntimeError('%s failed w/ exit code %d:\n\n%s' % (cmnd, errCode, data))
@@ -503,6 +796,333 @@ def getCmndOutput(cmnd, stripTrailingSpaces=False, throwOnError=True, workingDir
   return dataToReturn
 
 
+class SysCmndOutputLines(object):
+  """
+  Iterable over the lines of output of a shell command as they are written.
+
+  Unlike getCmndOutput(), the output is never held in memory all at once so
+  this can be used to monitor and filter the output of long-running commands
+  (e.g. configure and make) as they run.  Each line is also written to the
+  file outFile (if set) and to stdout (if echoOutput=True) as it is read.
+  The command is intercepted by g_sysCmndInterceptor in the same way as for
+  runSysCmndInterface().  After the iteration is done, self.rtnCode holds the
+  return code of the command.  If the iteration is stopped early, the command
+  is killed.
+
+  Each line is yielded as a str (with the newline) for filtering as text.  In
+  Python 3 it is decoded as UTF-8 with the invalid bytes replaced by U+FFFD so
+  that output in any encoding never stops the command, while outFile and
+  stdout get the raw bytes.  (Use getCmndOutput() to get the raw bytes of the
+  whole output.)
+  """
+
+  def __init__(self, cmnd, outFile=None, echoOutput=False, extraEnv=None,
+    workingDir="", getStdErr=True \
+    ):
+    self.cmnd = cmnd
+    self.outFile = outFile
+    self.echoOutput = echoOutput
+    self.extraEnv = extraEnv
+    self.workingDir = workingDir
+    self.getStdErr = getStdErr
+    self.rtnCode = None
+
+  def __iter__(self):
+    if g_dumpAllSysCmnds:
+      print("\nDUMP SYS CMND: " + self.cmnd + "\n")
+    cmndWorkingDir = getCmndWorkingDir(self.workingDir)
+    outFileHandle = None
+    if self.outFile:
+      outFileHandle = open(getCmndOutFilePath(self.outFile, cmndWorkingDir),
+        'wb')
+    try:
+      interceptedCmndReturnAndOutput = \
+        g_sysCmndInterceptor.processInterceptedCmnd(self.cmnd)
+      if interceptedCmndReturnAndOutput:
+        (cmndReturn, cmndOutput) = interceptedCmndReturnAndOutput
+        if cmndOutput:
+          for line in cmndOutput.splitlines(True):
+            if sys.version_info < (3,):
+              self._teeLine(line, outFileHandle)
+            else:
+              self._teeLine(line.encode("utf-8"), outFileHandle)
+            yield line
+        self.rtnCode = cmndReturn
+        return
+      # Else, fall through
+      if self.extraEnv:
+        fullEnv = os.environ.copy()
+        fullEnv.update(self.extraEnv)
+      else:
+        fullEnv = None
+      if self.getStdErr:
+        stderr = subprocess.STDOUT
+      else:
+        stderr = None
+      child = subprocess.Popen(self.cmnd, shell=True, stdout=subprocess.PIPE,
+        stderr=stderr, env=fullEnv, cwd=cmndWorkingDir)
+      try:
+        for lineBytes in iter(child.stdout.readline, b("")):
+          self._teeLine(lineBytes, outFileHandle)
+          if sys.version_info < (3,):
+            yield lineBytes
+          else:
+            yield lineBytes.decode("utf-8", "replace")
+        child.stdout.close()
+        self.rtnCode = child.wait()
+      finally:
+        if child.poll() is None:
+          # The iteration was stopped early so the rest of the output is not
+          # wanted
+          child.kill()
+          child.stdout.close()
+          child.wait()
+    finally:
+      if outFileHandle:
+        outFileHandle.close()
+
+  def _teeLine(self, lineBytes, outFileHandle):
+    if outFileHandle:
+      outFileHandle.write(lineBytes)
+    if self.echoOutput:
+      if sys.version_info < (3,):
+        sys.stdout.write(lineBytes)
+      else:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(lineBytes)
+      sys.stdout.flush()
+
+
+def runSysCmndStreaming(cmnd, lineFunc=None, throwExcept=True, outFile=None,
+  echoOutput=False, workingDir="", extraEnv=None, getStdErr=True \
+  ):
+  """
+  Run a shell command and call lineFunc(line) for each line of its output as
+  it is written (see SysCmndOutputLines) and return the return code
+  (optionally throwing on failure)
+  """
+  sys.stdout.flush()
+  sys.stderr.flush()
+  cmndOutputLines = SysCmndOutputLines(cmnd, outFile=outFile,
+    echoOutput=echoOutput, extraEnv=extraEnv, workingDir=workingDir,
+    getStdErr=getStdErr)
+  for line in cmndOutputLines:
+    if lineFunc:
+      lineFunc(line)
+  rtnCode = cmndOutputLines.rtnCode
+  if rtnCode != 0 and throwExcept:
+    raise RuntimeError("Error, the command '%s' failed with error code %d"
+                       % (cmnd, rtnCode))
+  return rtnCode
+
+
+class SysCmndJob:
+  """
+  Spec of a shell command run by runSysCmndsParallel().  The output of the
+  command (stdout and stderr) is written to outFile (if set) or else to the
+  console.  If timeout is not None, then the command (and all of the
+  processes that it started) is killed after that many seconds.
+  """
+
+  def __init__(self, cmnd, workingDir="", extraEnv=None, outFile=None,
+    timeout=None \
+    ):
+    self.cmnd = cmnd
+    self.workingDir = workingDir
+    self.extraEnv = extraEnv
+    self.outFile = outFile
+    self.timeout = timeout
+
+  def __str__(self):
+    return "{cmnd='"+self.cmnd+"', workingDir='"+self.workingDir+"'," \
+      " outFile='"+str(self.outFile)+"', timeout="+str(self.timeout)+"}"
+
+
+class SysCmndJobResult:
+  """
+  Result of a SysCmndJob run by runSysCmndsParallel().  The rtnCode is None if
+  the job was not run (i.e. skipped after a failure with keepGoing=False) and
+  timedOut is True if the job was killed after its timeout.
+  """
+
+  def __init__(self, job, rtnCode=None, timeSec=0.0, timedOut=False):
+    self.job = job
+    self.rtnCode = rtnCode
+    self.timeSec = timeSec
+    self.timedOut = timedOut
+
+  def failed(self):
+    return self.rtnCode != 0
+
+  def __str__(self):
+    return "{cmnd='"+self.job.cmnd+"', rtnCode="+str(self.rtnCode)+"," \
+      " timeSec="+("%.2f" % self.timeSec)+", timedOut="+str(self.timedOut)+"}"
+
+
+def runSysCmndJob(job, cmndWorkingDir=None):
+  """
+  Run the (not intercepted) command of a SysCmndJob and return its result.  A
+  job with a timeout is run in its own process group so that all of the
+  processes started by the command (and not just the shell) are killed after
+  the timeout.
+  """
+  if job.extraEnv:
+    fullEnv = os.environ.copy()
+    fullEnv.update(job.extraEnv)
+  else:
+    fullEnv = None
+  outFileHandle = None
+  if job.outFile:
+    outFileHandle = open(getCmndOutFilePath(job.outFile, cmndWorkingDir), 'w')
+  t1 = time.time()
+  timedOut = [False]
+  useProcessGroup = job.timeout is not None and hasattr(os, "setsid")
+  if not useProcessGroup:
+    newSessionArgs = {}
+  elif sys.version_info >= (3, 2):
+    # Unlike preexec_fn, this is safe when there are threads (which there are
+    # when called from runSysCmndsParallel())
+    newSessionArgs = { "start_new_session" : True }
+  else:
+    newSessionArgs = { "preexec_fn" : os.setsid }
+  try:
+    try:
+      child = subprocess.Popen(job.cmnd, shell=True, stdout=outFileHandle,
+        stderr=subprocess.STDOUT, env=fullEnv, cwd=cmndWorkingDir,
+        **newSessionArgs)
+    except OSError:
+      return SysCmndJobResult(job, 1, time.time()-t1)
+    timer = None
+    if job.timeout is not None:
+      def killJob():
+        timedOut[0] = True
+        try:
+          if useProcessGroup:
+            os.killpg(child.pid, signal.SIGKILL)
+          else:
+            child.kill()
+        except OSError:
+          pass # Already done
+      timer = threading.Timer(job.timeout, killJob)
+      timer.start()
+    try:
+      rtnCode = child.wait()
+    finally:
+      if timer:
+        timer.cancel()
+  finally:
+    if outFileHandle:
+      outFileHandle.close()
+  return SysCmndJobResult(job, rtnCode, time.time()-t1, timedOut[0])
+
+
+def runSysCmndsParallel(jobsList, numParallel=4, keepGoing=True,
+  verbose=True \
+  ):
+  """
+  Run a list of shell commands (SysCmndJob objects or command strings) with
+  at most numParallel running at the same time and return the list of
+  SysCmndJobResult objects (in the same order as jobsList).
+
+  The jobs are started in the order of jobsList and the commands are
+  intercepted by g_sysCmndInterceptor in that order (for unit testing).  With
+  keepGoing=False, no more jobs are started after the first failed job (but
+  the jobs that are already running are allowed to finish, like for 'make'
+  without '-k').
+  """
+  if numParallel < 1:
+    raise Exception("Error, numParallel="+str(numParallel)+" is invalid!"
+      "  Must be >= 1.")
+  jobsList = [ (job if isinstance(job, SysCmndJob) else SysCmndJob(job)) \
+    for job in jobsList ]
+  jobResultsList = [ SysCmndJobResult(job) for job in jobsList ]
+  sys.stdout.flush()
+  sys.stderr.flush()
+  jobsDoneCond = threading.Condition()
+  numRunningJobs = [0]
+  sawFailedJob = [False]
+
+  def runOneJob(job_i, cmndWorkingDir):
+    try:
+      jobResult = runSysCmndJob(jobsList[job_i], cmndWorkingDir)
+    except Exception:
+      jobResult = SysCmndJobResult(jobsList[job_i], 1)
+    jobsDoneCond.acquire()
+    try:
+      jobResultsList[job_i] = jobResult
+      if jobResult.failed():
+        sawFailedJob[0] = True
+      numRunningJobs[0] -= 1
+      jobsDoneCond.notify_all()
+    finally:
+      jobsDoneCond.release()
+
+  jobThreadsList = []
+  for job_i in range(len(jobsList)):
+    job = jobsList[job_i]
+    # Wait for a free slot
+    jobsDoneCond.acquire()
+    try:
+      while numRunningJobs[0] >= numParallel:
+        jobsDoneCond.wait(0.1)  # Timeout allows Ctrl-C to interrupt the wait
+      if sawFailedJob[0] and not keepGoing:
+        break
+      numRunningJobs[0] += 1
+    finally:
+      jobsDoneCond.release()
+    if verbose:
+      print("\nRunning (job "+str(job_i+1)+" of "+str(len(jobsList))+"): "
+        + job.cmnd + "\n")
+      if job.workingDir:
+        print("  Running in working directory: " + job.workingDir + " ...\n")
+      if job.outFile:
+        print("  Writing console output to file " + job.outFile + " ...")
+      sys.stdout.flush()
+    if g_dumpAllSysCmnds:
+      print("\nDUMP SYS CMND: " + job.cmnd + "\n")
+    cmndWorkingDir = getCmndWorkingDir(job.workingDir)
+    interceptedCmndReturnAndOutput = \
+      g_sysCmndInterceptor.processInterceptedCmnd(job.cmnd)
+    if interceptedCmndReturnAndOutput:
+      (cmndReturn, cmndOutput) = interceptedCmndReturnAndOutput
+      if job.outFile:
+        writeStrToFile(getCmndOutFilePath(job.outFile, cmndWorkingDir),
+          cmndOutput)
+      jobsDoneCond.acquire()
+      try:
+        jobResultsList[job_i] = SysCmndJobResult(job, cmndReturn)
+        if cmndReturn != 0:
+          sawFailedJob[0] = True
+        numRunningJobs[0] -= 1
+      finally:
+        jobsDoneCond.release()
+      continue
+    # Else, fall through
+    jobThread = threading.Thread(target=runOneJob,
+      args=(job_i, cmndWorkingDir))
+    jobThread.daemon = True
+    jobThread.start()
+    jobThreadsList.append(jobThread)
+
+  for jobThread in jobThreadsList:
+    while jobThread.is_alive():
+      jobThread.join(0.1)
+
+  if verbose:
+    for jobResult in jobResultsList:
+      if jobResult.rtnCode is None:
+        statusStr = "not run"
+      elif jobResult.timedOut:
+        statusStr = "timed out after %.2f sec" % jobResult.timeSec
+      else:
+        statusStr = "return code %d in %.2f sec" % (jobResult.rtnCode,
+          jobResult.timeSec)
+      print("  " + jobResult.job.cmnd + ": " + statusStr)
+    sys.stdout.flush()
+
+  return jobResultsList
+
+
 def pidStillRunning(pid):
   #print("\npid = '" + pid + "'")
   cmnd = "kill -s 0 "+pid
@@ -550,20 +1170,28 @@ def normalizePath(path):
 
 
 def echoChDir(dirName, verbose=True):
+  """
+  Change the current directory.  When called from a thread other than the
+  main thread, only the working directory of that thread is changed (see
+  setThreadWorkingDir()).
+  """
   if verbose:
     print("\nChanging current directory to \'" + dirName + "\'")
-  if not os.path.isdir(dirName):
+  if not os.path.isdir(getThreadPath(dirName)):
     raise OSError("Error, the directory \'"+dirName+"\' does not exist in the" \
-      + " base directory \'"+os.getcwd()+"\"!" )
-  os.chdir(dirName)
+      + " base directory \'"+getCurrentWorkingDir()+"\"!" )
+  if threading.current_thread() is g_mainThread:
+    os.chdir(dirName)
+  else:
+    setThreadWorkingDir(dirName)
   if verbose:
-    print("\nCurrent directory is \'" + os.getcwd() + "\'\n")
+    print("\nCurrent directory is \'" + getCurrentWorkingDir() + "\'\n")
 
 
 def createDir(dirName, cdIntoDir=False, verbose=False):
   """Create a directory if it does not exist"""
-  if os.path.exists(dirName):
-    if not os.path.isdir(dirName):
+  if os.path.exists(getThreadPath(dirName)):
+    if not os.path.isdir(getThreadPath(dirName)):
       errMsg = "\nError the path '" + dirName + \
                "'already exists but it is not a directory!"
       if verbose: print(errMsg)
@@ -571,7 +1199,7 @@ def createDir(dirName, cdIntoDir=False, verbose=False):
     if verbose: print("\nThe directory " + dirName + "already exists!")
   else:
     if verbose: print("\nCreating directory " + dirName + " ...")
-    os.mkdir(dirName)
+    os.mkdir(getThreadPath(dirName))
   if cdIntoDir:
     echoChDir(dirName, verbose=verbose)
 
@@ -584,7 +1212,7 @@ def createDirsFromPath(path):
     currDir = "/"
   for dir in pathList:
     currDir = os.path.join(currDir, dir)
-    if currDir and not os.path.exists(currDir):
+    if currDir and not os.path.exists(getThreadPath(currDir)):
       #print("\ncurrDir = " + currDir)
       createDir(currDir)
 
@@ -599,23 +1227,23 @@ def expandDirsDict(trilinosDirsDict_inout):
 
 
 def removeIfExists(fileName):
-  if os.path.exists(fileName):
+  if os.path.exists(getThreadPath(fileName)):
     echoRunSysCmnd("rm "+fileName)
 
 
 def removeDirIfExists(dirName, verbose=False):
-  if os.path.exists(dirName):
+  if os.path.exists(getThreadPath(dirName)):
     if verbose:
       print("Removing existing directory '" + dirName + "' ...")
     echoRunSysCmnd("rm -rf "+dirName)
 
 
 def writeStrToFile(fileName, fileBodyStr):
-  open(fileName, 'w').write(fileBodyStr)
+  open(getThreadPath(fileName), 'w').write(fileBodyStr)
 
 
 def readStrFromFile(fileName):
-  return open(fileName, 'r').read()
+  return open(getThreadPath(fileName), 'r').read()
 
 
 def getFileNamesWithFileTag( baseDir, fileTag ):
@@ -631,7 +1259,7 @@ def getFileNameFromGlob( baseDir, fileNameGlob ):
 
 
 def isEmptyDir( absDir ):
-  return (len(os.listdir(absDir)) == 0)
+  return (len(os.listdir(getThreadPath(absDir))) == 0)
 
 
 def getDirSizeInGb(dir):
@@ -698,7 +1326,8 @@ def getRelativePathFrom1to2(absPath1, absPath2):
 
 
 def getExecBaseDir(execName):
-  whichOutput = getCmndOutput("type -p "+execName, True, False)
+  whichOutput = getCmndOutput("type -p "+execName, True, False,
+    cacheOutput=True)
   # Handle the outpue 'execName is execFullPath' output
   execFullPath = whichOutput.split(' ')[-1]
   #print("\nexecFullPath = " + execFullPath)
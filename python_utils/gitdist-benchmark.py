@@ -0,0 +1,418 @@
+#!/usr/bin/env python
+
+#
+# Benchmark the performance of the gitdist script
+#
+
+usageHelp = r"""gitdist-benchmark.py [OPTIONS]
+
+Time the gitdist script (in the same directory as this script) and print the
+results as JSON so that they can be saved and compared to catch performance
+regressions.
+
+The startup benchmark times importing the gitdist module and running
+'gitdist --dist-help=overview' in a fresh python process and counts the
+number of subprocesses that are run while importing gitdist (which should be
+zero).  With --max-startup-ms=<ms>, this script returns non-zero if the median
+time to import gitdist is larger than <ms> or if any subprocesses were run
+while importing gitdist.
+
+The workspace benchmark creates a synthetic workspace in a temp directory (or
+under --workspace-dir=<dir>) with a base repo BaseRepo/ and the extra repos
+BaseRepo/ExtraRepo<i>/ (--num-repos repos in total).  Each repo gets
+--num-commits commits, --num-modified modified tracked files and
+--num-untracked untracked files.  Every other extra repo has no upstream and
+the rest push to local bare repos under remotes/ (with one extra local
+commit so that they are ahead of their tracking branch).  It then times:
+
+  repoStatus:  gitdist dist-repo-status
+  modOnly:     gitdist --dist-mod-only log -1 --pretty=format:%h
+  versionFile: gitdist --dist-version-file=RepoVersion.txt \
+                 log -1 --pretty=format:%h _VERSION_
+  fanOut:      gitdist rev-parse HEAD
+
+each with --dist-parallel=1 ('serial') and --dist-parallel=<N> ('parallel')
+and --dist-no-cache, and dist-repo-status and --dist-mod-only also with the
+repo stats cache filled in by a previous run ('cached').  Before the 'cached'
+runs, the mtimes of all of the files in the workspace are set to 100 seconds
+ago since gitdist does not cache the stats of a repo with a file that just
+changed.  The workspace is removed at the end unless --keep-workspace is
+passed in.
+"""
+
+import sys
+import os
+import subprocess
+import json
+import time
+import shutil
+import tempfile
+
+from optparse import OptionParser
+
+
+gitdistDir = os.path.dirname(os.path.realpath(os.path.abspath(__file__)))
+gitdistPath = os.path.join(gitdistDir, "gitdist.py")
+
+
+# Python code run in a fresh process to time the import of gitdist and count
+# the subprocesses that are created while importing it
+importGitdistTimingCode = r"""
+import sys, time, json, subprocess
+numPopens = [0]
+origPopenInit = subprocess.Popen.__init__
+def countingPopenInit(self, *args, **kwargs):
+  numPopens[0] += 1
+  origPopenInit(self, *args, **kwargs)
+subprocess.Popen.__init__ = countingPopenInit
+sys.path.insert(0, sys.argv[1])
+t1 = time.time()
+import gitdist
+t2 = time.time()
+print(json.dumps({"importMs" : (t2-t1)*1000.0, "numSubprocesses" : numPopens[0]}))
+"""
+
+
+def getMedian(valuesList):
+  sortedValues = sorted(valuesList)
+  numValues = len(sortedValues)
+  if numValues % 2 == 1:
+    return sortedValues[numValues//2]
+  return (sortedValues[numValues//2-1] + sortedValues[numValues//2]) / 2.0
+
+
+def getTimingStats(timesList):
+  return {
+    "min" : min(timesList),
+    "median" : getMedian(timesList),
+    "max" : max(timesList),
+    }
+
+
+# Run a command and return its wall clock time in ms (with the output
+# discarded)
+def getCmndTimeMs(cmndArray, workingDir=None):
+  devNull = open(os.devnull, 'w')
+  try:
+    t1 = time.time()
+    subprocess.call(cmndArray, stdout=devNull, stderr=devNull, cwd=workingDir)
+    t2 = time.time()
+  finally:
+    devNull.close()
+  return (t2-t1)*1000.0
+
+
+def benchmarkStartup(numRuns):
+  importTimes = []
+  maxNumSubprocesses = 0
+  for run_i in range(numRuns):
+    output = subprocess.Popen(
+      [sys.executable, "-c", importGitdistTimingCode, gitdistDir],
+      stdout=subprocess.PIPE).communicate()[0]
+    runResults = json.loads(output.decode("utf-8"))
+    importTimes.append(runResults["importMs"])
+    maxNumSubprocesses = max(maxNumSubprocesses, runResults["numSubprocesses"])
+  helpTimes = []
+  for run_i in range(numRuns):
+    helpTimes.append(getCmndTimeMs(
+      [sys.executable, gitdistPath, "--dist-help=overview"]))
+  return {
+    "importGitdistMs" : getTimingStats(importTimes),
+    "numImportSubprocesses" : maxNumSubprocesses,
+    "gitdistHelpMs" : getTimingStats(helpTimes),
+    }
+
+
+# Run a git command in repoDir with a fixed author and committer (so that the
+# workspace does not depend on the user's git config)
+def runGitCmnd(repoDir, gitArgsArray):
+  devNull = open(os.devnull, 'w')
+  try:
+    subprocess.check_call(
+      ["git", "-c", "user.name=Gitdist Benchmark",
+       "-c", "user.email=gitdist-benchmark@example.com",
+       "-c", "init.defaultBranch=master", "-c", "advice.detachedHead=false"]
+      + gitArgsArray,
+      cwd=repoDir, stdout=devNull)
+  finally:
+    devNull.close()
+
+
+def getGitCmndOutput(repoDir, gitArgsArray):
+  output = subprocess.Popen(["git"] + gitArgsArray, cwd=repoDir,
+    stdout=subprocess.PIPE).communicate()[0]
+  return output.decode("utf-8").strip()
+
+
+def writeFile(filePath, fileStr):
+  fileObj = open(filePath, 'w')
+  try:
+    fileObj.write(fileStr)
+  finally:
+    fileObj.close()
+
+
+# Fill in the repo in repoDir with numCommits commits that each change
+# numFiles files under src/
+def createRepoCommits(repoDir, numCommits, numFiles):
+  srcDir = os.path.join(repoDir, "src")
+  if not os.path.exists(srcDir):
+    os.mkdir(srcDir)
+  for commit_i in range(numCommits):
+    for file_i in range(numFiles):
+      writeFile(os.path.join(srcDir, "file"+str(file_i)+".txt"),
+        "File "+str(file_i)+" changed in commit "+str(commit_i)+"\n")
+    runGitCmnd(repoDir, ["add", "-A", "src"])
+    runGitCmnd(repoDir, ["commit", "-q", "-m", "Commit "+str(commit_i)])
+
+
+# Create a repo in repoDir that has an upstream in the bare repo remoteDir (if
+# not None)
+def createSyntheticRepo(repoDir, remoteDir, numCommits, numFiles):
+  if remoteDir:
+    runGitCmnd(os.path.dirname(remoteDir),
+      ["init", "-q", "--bare", os.path.basename(remoteDir)])
+    runGitCmnd(os.path.dirname(repoDir),
+      ["init", "-q", os.path.basename(repoDir)])
+    runGitCmnd(repoDir, ["remote", "add", "origin", remoteDir])
+    createRepoCommits(repoDir, numCommits, numFiles)
+    runGitCmnd(repoDir, ["push", "-q", "-u", "origin", "master"])
+    createRepoCommits(repoDir, 1, numFiles)  # One local commit ahead
+  else:
+    runGitCmnd(os.path.dirname(repoDir),
+      ["init", "-q", os.path.basename(repoDir)])
+    createRepoCommits(repoDir, numCommits, numFiles)
+
+
+# Create the synthetic workspace under workspaceDir and return the path of its
+# base repo
+def createSyntheticWorkspace(workspaceDir, numRepos, numCommits, numModified,
+  numUntracked \
+  ):
+  remotesDir = os.path.join(workspaceDir, "remotes")
+  os.mkdir(remotesDir)
+  baseRepoDir = os.path.join(workspaceDir, "BaseRepo")
+  numFiles = max(numModified, 1)
+  numCommits = max(numCommits, 1)
+  extraReposList = \
+    [ "ExtraRepo"+str(repo_i) for repo_i in range(1, max(numRepos, 1)) ]
+  createSyntheticRepo(baseRepoDir, os.path.join(remotesDir, "BaseRepo.git"),
+    numCommits, numFiles)
+  writeFile(os.path.join(baseRepoDir, ".gitignore"), "/ExtraRepo*/\n")
+  writeFile(os.path.join(baseRepoDir, ".gitdist"),
+    "".join([ repo+"\n" for repo in ["."] + extraReposList ]))
+  runGitCmnd(baseRepoDir, ["add", ".gitignore", ".gitdist"])
+  runGitCmnd(baseRepoDir, ["commit", "-q", "-m", "Add .gitignore and .gitdist"])
+  for repo_i in range(len(extraReposList)):
+    repo = extraReposList[repo_i]
+    if repo_i % 2 == 0:
+      remoteDir = os.path.join(remotesDir, repo+".git")
+    else:
+      remoteDir = None
+    createSyntheticRepo(os.path.join(baseRepoDir, repo), remoteDir,
+      numCommits, numFiles)
+  for repoDir in [baseRepoDir] + \
+    [ os.path.join(baseRepoDir, repo) for repo in extraReposList ] \
+    :
+    for file_i in range(numModified):
+      writeFile(os.path.join(repoDir, "src", "file"+str(file_i)+".txt"),
+        "File "+str(file_i)+" modified\n")
+    for file_i in range(numUntracked):
+      writeFile(os.path.join(repoDir, "src", "untracked"+str(file_i)+".txt"),
+        "Untracked file "+str(file_i)+"\n")
+  # Write a repo version file with the current version of each repo
+  repoVersionFileStr = ""
+  for repo in ["BaseRepo"] + extraReposList:
+    if repo == "BaseRepo":
+      repoVersionFileStr += "*** Base Git Repo: BaseRepo\n"
+      repoDir = baseRepoDir
+    else:
+      repoVersionFileStr += "*** Git Repo: "+repo+"\n"
+      repoDir = os.path.join(baseRepoDir, repo)
+    repoVersionFileStr += getGitCmndOutput(repoDir,
+      ["log", "-1", "--pretty=format:%h [%ad] <%ae>%n%s"]) + "\n"
+  writeFile(os.path.join(workspaceDir, "RepoVersion.txt"), repoVersionFileStr)
+  return baseRepoDir
+
+
+# Set the mtimes of all of the files and dirs under topDir
+def setTreeMtime(topDir, mtime):
+  for (dirPath, dirNames, fileNames) in os.walk(topDir):
+    for path in [dirPath] + \
+      [ os.path.join(dirPath, fileName) for fileName in fileNames ] \
+      :
+      os.utime(path, (mtime, mtime))
+
+
+# Set the mtimes of all of the files in the workspace to secondsAgo in the
+# past.  The repo stats cache of gitdist is not filled in for a repo with a
+# file that changed in the last second (which is everything in a workspace
+# that was just created).  The index of each repo is refreshed for the new
+# mtimes and then its .git dir is set to be newer than its worktree so that
+# git does not rewrite the index because of racy timestamps.
+def backdateWorkspace(workspaceDir, secondsAgo):
+  mtime = time.time() - secondsAgo
+  repoDirsList = []
+  for (dirPath, dirNames, fileNames) in os.walk(workspaceDir):
+    if ".git" in dirNames:
+      repoDirsList.append(dirPath)
+  setTreeMtime(workspaceDir, mtime)
+  for repoDir in repoDirsList:
+    runGitCmnd(repoDir, ["update-index", "-q", "--refresh"])
+  for repoDir in repoDirsList:
+    setTreeMtime(os.path.join(repoDir, ".git"), mtime + 10)
+
+
+# Time the gitdist commands in the workspace (see usageHelp)
+def benchmarkWorkspace(options):
+  if options.workspaceDir:
+    workspaceDir = os.path.abspath(options.workspaceDir)
+    if not os.path.exists(workspaceDir):
+      os.makedirs(workspaceDir)
+    if os.listdir(workspaceDir):
+      print("Error, the workspace directory '"+workspaceDir+"' is not empty!")
+      sys.exit(1)
+  else:
+    workspaceDir = tempfile.mkdtemp(prefix="gitdist-benchmark-")
+  try:
+    t1 = time.time()
+    baseRepoDir = createSyntheticWorkspace(workspaceDir, options.numRepos,
+      options.numCommits, options.numModified, options.numUntracked)
+    t2 = time.time()
+    versionFileArg = \
+      "--dist-version-file="+os.path.join(workspaceDir, "RepoVersion.txt")
+    gitdistCmndsList = [
+      ("repoStatus", ["dist-repo-status"], True),
+      ("modOnly", ["--dist-mod-only", "log", "-1", "--pretty=format:%h"], True),
+      ("versionFile",
+        [versionFileArg, "log", "-1", "--pretty=format:%h", "_VERSION_"],
+        False),
+      ("fanOut", ["rev-parse", "HEAD"], False),
+      ]
+    parallelArg = "--dist-parallel="+str(options.numParallel)
+    timesDict = {}
+    for (cmndName, gitdistArgsArray, hasCachedPath) in gitdistCmndsList:
+      pathsList = [
+        ("serial", ["--dist-parallel=1", "--dist-no-cache"]),
+        ("parallel", [parallelArg, "--dist-no-cache"]),
+        ]
+      if hasCachedPath:
+        pathsList.append(("cached", [parallelArg]))
+      cmndTimesDict = {}
+      for (pathName, pathArgsArray) in pathsList:
+        cmndArray = [sys.executable, gitdistPath] + pathArgsArray \
+          + gitdistArgsArray
+        if pathName == "cached":
+          backdateWorkspace(workspaceDir, 100)
+          getCmndTimeMs(cmndArray, baseRepoDir)  # Fill in the cache
+        cmndTimes = []
+        for run_i in range(options.numRuns):
+          cmndTimes.append(getCmndTimeMs(cmndArray, baseRepoDir))
+        cmndTimesDict[pathName] = getTimingStats(cmndTimes)
+      timesDict[cmndName] = cmndTimesDict
+    return {
+      "numRepos" : max(options.numRepos, 1),
+      "numCommits" : max(options.numCommits, 1),
+      "numModified" : options.numModified,
+      "numUntracked" : options.numUntracked,
+      "numParallel" : options.numParallel,
+      "createWorkspaceMs" : (t2-t1)*1000.0,
+      "gitVersion" : getGitCmndOutput(workspaceDir, ["--version"]),
+      "timesMs" : timesDict,
+      }
+  finally:
+    if options.keepWorkspace:
+      sys.stderr.write("Kept the workspace '"+workspaceDir+"'\n")
+    else:
+      shutil.rmtree(workspaceDir, ignore_errors=True)
+
+
+benchmarkNames = [ "startup", "workspace" ]
+
+
+clp = OptionParser(usage=usageHelp)
+
+clp.add_option(
+  "--benchmarks", dest="benchmarks", type="string",
+  default=",".join(benchmarkNames),
+  help="Comma-separated list of the benchmarks to run out of " \
+  +str(benchmarkNames)+". (default='"+",".join(benchmarkNames)+"')" )
+
+clp.add_option(
+  "--num-runs", dest="numRuns", type="int", default=10,
+  help="Number of times to run each timed operation.  The min, median, and" \
+  +" max times are reported. (default=10)" )
+
+clp.add_option(
+  "--max-startup-ms", dest="maxStartupMs", type="float", default=0.0,
+  help="If > 0, then return non-zero if the median time to import gitdist" \
+  +" (ms) is larger than this or if any subprocesses are run while importing" \
+  +" gitdist. (default=0.0)" )
+
+clp.add_option(
+  "--num-repos", dest="numRepos", type="int", default=10,
+  help="Number of repos in the synthetic workspace (including the base" \
+  +" repo). (default=10)" )
+
+clp.add_option(
+  "--num-commits", dest="numCommits", type="int", default=5,
+  help="Number of commits in each repo of the synthetic workspace." \
+  +" (default=5)" )
+
+clp.add_option(
+  "--num-modified", dest="numModified", type="int", default=2,
+  help="Number of modified tracked files in each repo of the synthetic" \
+  +" workspace. (default=2)" )
+
+clp.add_option(
+  "--num-untracked", dest="numUntracked", type="int", default=2,
+  help="Number of untracked files in each repo of the synthetic workspace." \
+  +" (default=2)" )
+
+clp.add_option(
+  "--num-parallel", dest="numParallel", type="int", default=4,
+  help="Number of repos processed at the same time for the 'parallel' and" \
+  +" 'cached' paths (i.e. gitdist --dist-parallel=<N>). (default=4)" )
+
+clp.add_option(
+  "--workspace-dir", dest="workspaceDir", type="string", default="",
+  help="Empty (or non-existing) directory to create the synthetic workspace" \
+  +" in.  (default='' which creates a temp directory)" )
+
+clp.add_option(
+  "--keep-workspace", dest="keepWorkspace", action="store_true",
+  default=False,
+  help="Do not remove the synthetic workspace at the end." )
+
+(options, args) = clp.parse_args()
+
+benchmarksList = [ name.strip() for name in options.benchmarks.split(",")
+  if name.strip() ]
+for benchmarkName in benchmarksList:
+  if not benchmarkName in benchmarkNames:
+    print("Error, --benchmarks='"+options.benchmarks+"' has the invalid"
+      " benchmark '"+benchmarkName+"' (valid are "+str(benchmarkNames)+")!")
+    sys.exit(1)
+
+results = { "python" : sys.version.split()[0] }
+if "startup" in benchmarksList:
+  results["startup"] = benchmarkStartup(options.numRuns)
+if "workspace" in benchmarksList:
+  results["workspace"] = benchmarkWorkspace(options)
+
+print(json.dumps(results, indent=2, sort_keys=True))
+
+rtnCode = 0
+if options.maxStartupMs > 0.0 and "startup" in results:
+  startupResults = results["startup"]
+  if startupResults["numImportSubprocesses"] > 0:
+    print("\nError, importing gitdist ran "
+      + str(startupResults["numImportSubprocesses"]) + " subprocesses!")
+    rtnCode = 1
+  if startupResults["importGitdistMs"]["median"] > options.maxStartupMs:
+    print("\nError, median import time of gitdist "
+      + ("%.1f" % startupResults["importGitdistMs"]["median"]) + " ms > "
+      + str(options.maxStartupMs) + " ms!")
+    rtnCode = 1
+
+sys.exit(rtnCode)
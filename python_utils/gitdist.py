@@ -38,8 +38,11 @@ distRepoStatusLegend = r"""Legend:
 * Branch: Current branch (or detached HEAD)
 * Tracking Branch: Tracking branch (or empty if no tracking branch exists)
 * C: Number local commits w.r.t. tracking branch (empty if zero or no TB)
+* B: Number commits in tracking branch not in local branch (i.e. behind)
+  (empty if zero or no TB or if git is too old to support this)
 * M: Number of tracked modified (uncommitted) files (empty if zero)
-* ?: Number of untracked, non-ignored files (empty if zero)
+* ?: Number of untracked, non-ignored files (empty if zero, '-' if not
+  counted because of the status profile 'no-untracked')
 """
 
 
@@ -50,6 +53,11 @@ helpTopics = [
   'repo-versions',
   'aliases', 
   'default-branch',
+  'repo-dependencies',
+  'dist-clone',
+  'dist-maintenance',
+  'dist-grep',
+  'dist-log',
   'move-to-base-dir',
   'usage-tips',
   'script-dependencies',
@@ -70,8 +78,16 @@ helpTopicDefaultIdx = 0;
 helpTopicsDict = {}
 
 
+
 helpUsageHeader = r"""gitdist [gitdist arguments] <raw-git-command> [git arguments]
        gitdist [gitdist arguments] dist-repo-status
+       gitdist [gitdist arguments] dist-discover
+       gitdist [gitdist arguments] dist-daemon
+       gitdist [gitdist arguments] dist-clone
+       gitdist [gitdist arguments] dist-maintenance
+       gitdist [gitdist arguments] dist-version-snapshot
+       gitdist [gitdist arguments] dist-grep [git grep arguments]
+       gitdist [gitdist arguments] dist-log [git log arguments]
 
 Run git over a set of git repos in a multi-repository git project (see
 --dist-help=overview --help).  This script also includes other tools like
@@ -290,6 +306,27 @@ have to manually do any extra setup for every new set of local clones of the
 repos.  But if the file .gitdist is present, then it will override the file
 .gitdist.default as described above (which allows customization of what git
 repos are processed at any time).
+
+Instead of creating the file .gitdist by hand, one can run:
+
+  $ gitdist dist-discover [--dist-discover-ignore=<glob0>,<glob1>,...]
+
+in the base repo directory.  This finds all of the git repos under the
+current directory (i.e. directories containing a .git directory or file,
+including nested repos), merges them into the list of repos in the existing
+.gitdist or .gitdist.default file, writes that to the file .gitdist, and
+prints the list.  The repos that are already listed keep their place, default
+branch and attributes (and the listed repos that were not found, e.g. not
+cloned yet, are kept and printed in a note).  The new repos are added at the
+end (with the base repo '.' first).  Directories matching any of
+the globs in --dist-discover-ignore (matched against the directory name and
+the path relative to the base directory, e.g. 'BUILD*') are not searched.
+The subdirectories of the base directory are searched at the same time (see
+--dist-parallel).  The list of subdirectories of each directory is saved in
+a cache file (the file 'gitdist-discover-cache' in the base repo's .git/
+directory, or '.gitdist-discover-cache') so that running dist-discover again
+only reads the directories whose modification time changed (unless
+--dist-no-cache is passed in).
 """
 helpTopicsDict.update( { 'repo-selection-and-setup' : repoSelectionAndSetupHelp } )
 
@@ -306,14 +343,14 @@ in OVERVIEW (see --dist-help=overview), running:
 
 outputs a table like:
 
-  ----------------------------------------------------------------------
-  | ID | Repo Dir              | Branch | Tracking Branch | C | M  | ? |
-  |----|-----------------------|--------|-----------------|---|----|---|
-  |  0 | BaseRepo (Base)       | dummy  |                 |   |    |   |
-  |  1 | ExtraRepo1            | master | origin/master   | 1 |  2 |   |
-  |  2 | ExtraRepo1/ExtraRepo2 | HEAD   |                 |   | 25 | 4 |
-  |  3 | ExtraRepo3            | master | origin/master   |   |    |   |
-  ----------------------------------------------------------------------
+  --------------------------------------------------------------------------
+  | ID | Repo Dir              | Branch | Tracking Branch | C | B | M  | ? |
+  |----|-----------------------|--------|-----------------|---|---|----|---|
+  |  0 | BaseRepo (Base)       | dummy  |                 |   |   |    |   |
+  |  1 | ExtraRepo1            | master | origin/master   | 1 |   |  2 |   |
+  |  2 | ExtraRepo1/ExtraRepo2 | HEAD   |                 |   |   | 25 | 4 |
+  |  3 | ExtraRepo3            | master | origin/master   |   | 3 |    |   |
+  --------------------------------------------------------------------------
 
 If the option --dist-legend is also passed in, the output will include:
 
@@ -325,12 +362,12 @@ One can also show the status of only changed repos with the command:
 
 which produces a table like:
 
-  ----------------------------------------------------------------------
-  | ID | Repo Dir              | Branch | Tracking Branch | C | M  | ? |
-  |----|-----------------------|--------|-----------------|---|----|---|
-  |  1 | ExtraRepo1            | master | origin/master   | 1 |  2 |   |
-  |  2 | ExtraRepo1/ExtraRepo2 | HEAD   |                 |   | 25 | 4 |
-  ----------------------------------------------------------------------
+  --------------------------------------------------------------------------
+  | ID | Repo Dir              | Branch | Tracking Branch | C | B | M  | ? |
+  |----|-----------------------|--------|-----------------|---|---|----|---|
+  |  1 | ExtraRepo1            | master | origin/master   | 1 |   |  2 |   |
+  |  2 | ExtraRepo1/ExtraRepo2 | HEAD   |                 |   |   | 25 | 4 |
+  --------------------------------------------------------------------------
 
 (see the alias 'gitdist-mod-status' in --dist-help=aliases).
 
@@ -341,6 +378,109 @@ local git repos by filtering out rows for repos that have no changes
 w.r.t. their tracking branches.  This allows one to get the status on a few
 repos with changes out of a large number of local repos (i.e. 10s and even
 100s of local git repos).
+
+The status of several repos is gathered at the same time so that the table
+for a large number of repos is produced in about the time it takes to get the
+status of the slowest repo.  With git 2.11+, the status of each repo is
+gathered with a single 'git status --porcelain=v2 --branch' command (with
+older versions of git, several git commands are run for each repo).  The
+number of repos processed at the same time can be set with
+--dist-parallel=<N> (where --dist-parallel=1 gets the status of one repo at a
+time).
+
+The status of each repo is also saved in a cache file (the file
+'gitdist-cache' in the base repo's .git/ directory, or '.gitdist-cache' if the
+base dir is not a git repo).  The next time, the status of a repo is only
+recomputed if the signature of the repo changed (i.e. the timestamps of the
+index, config and info/exclude files and of the top directory of the
+worktree, HEAD, and the SHA1s of HEAD and of the tracking branch).  Getting
+the status of unchanged repos therefore does not run any git commands, and
+checking the signature takes the same time for any size of repo.  The
+trade-off is that editing a tracked file in place, or adding or removing an
+untracked file below the top directory of the worktree, does not change the
+signature (git only updates the index when it runs).  The cached status of
+such a repo is used until its index, HEAD, refs or top directory change
+(e.g. after 'git add', 'git commit' or a git command that refreshes the
+index).  To always recompute the status of every repo, pass in
+--dist-no-cache.
+
+In worktrees with many untracked directories (e.g. build directories that are
+not ignored), 'git status' spends most of its time reading the untracked
+directories.  The status profile (set for all repos with
+--dist-status-profile=<profile> and for a single repo with the attribute
+'status=<profile>' in .gitdist, see --dist-help=repo-dependencies) can be:
+
+  default:      Run 'git status' as is (the default)
+  fast:         Run 'git -c core.untrackedCache=true [-c core.fsmonitor=true]
+                status' which saves the state of the untracked directories in
+                the index and uses the builtin file system monitor daemon if
+                the version of git has it
+  no-untracked: Same as 'fast' but also pass in '-uno' to not look for
+                untracked files at all (shown as '-' in the '?' column)
+
+(see also --dist-help=dist-maintenance which enables the untracked cache
+permanently in each repo).  The profile of a repo is part of the key of its
+entry in the cache.
+
+For tools that ask for the status of the repos every few seconds (e.g. IDEs
+and shell prompts), one can start a daemon in the base repo dir with:
+
+  $ gitdist dist-daemon &
+
+which gets the status of all of the repos and then keeps it up to date as
+files change.  On Linux, the daemon is told about changes to the git dirs, to
+all of the directories of the worktrees, and to the global git config and
+excludes files using inotify.  At most 8192 directories are watched in total
+so that large build trees in a worktree don't use up the inotify watches of
+the user.  The repos that don't fit, and all repos where inotify can't be
+used, are checked every few seconds using the same signature as the cache
+above (with the same trade-off).  The daemon answers requests on the Unix domain socket
+'gitdist-daemon.sock' (in the base repo's .git/ directory, or
+'.gitdist-daemon.sock') and dist-repo-status and --dist-mod-only
+automatically get the status of the repos from the daemon when it is
+running (unless --dist-no-cache is passed in).  Requests are answered right
+away with the status of the repos that are known to be current while the
+status of the changed repos is updated in the background (the status of the
+repos that are still being updated is gotten by gitdist itself).  The daemon
+runs git with GIT_OPTIONAL_LOCKS=0 so that it never locks the index of a
+repo while one is using it, except for the repos with the status profile
+'fast' where 'git status' must briefly lock the index to save the untracked
+cache.  To stop the daemon, use Ctrl-C or kill it.
+
+To keep the table open in a terminal (instead of running dist-repo-status in
+a 'watch' loop), use:
+
+  $ gitdist dist-repo-status --dist-live [--dist-live-interval=<sec>]
+
+which gets the status of all of the repos once and then, every <sec> seconds
+(default 2), only gets the status again for the repos whose signature changed
+(see the cache above, or takes it from the dist-daemon if it is running) and
+only redraws the lines of the table that changed.  The signatures and the
+status of the repos are kept in memory, so the cache file is only read when
+starting and written when quitting (and not at all with --dist-no-cache).
+With --dist-mod-only, only the repos with local changes are shown.  To stop
+it, use Ctrl-C.
+
+For use by other tools, the status of the repos can be printed in a
+machine-readable format instead of a table with:
+
+  $ gitdist dist-repo-status --dist-format=jsonl
+
+which prints one JSON object per repo like:
+
+  {"branch": "master", "id": 1, "numBehind": 0, "numCommits": 1,
+   "numModified": 2, "numUntracked": 0, "repoDir": "ExtraRepo1",
+   "repoName": "ExtraRepo1", "trackingBranch": "origin/master"}
+
+(all on one line) or with --dist-format=csv which prints a header line
+followed by one line per repo with the same fields.  The line for each repo is
+printed as soon as its status is ready so the lines may not be in the order
+of the repo IDs.  The field 'repoDir' is the repo dir as listed in .gitdist
+('.' for the base repo) and the other fields are the same as the table
+columns (an empty string means no tracking branch).  The counts are integers,
+or null (an empty field for csv) if they are not known (e.g. 'numCommits' and
+'numBehind' without a tracking branch, and 'numUntracked' with the status
+profile 'no-untracked').
 """
 helpTopicsDict.update( { 'dist-repo-status' : distRepoStatusHelp } )
 
@@ -382,6 +522,15 @@ or two lines per repo using (for example):
   $ gitdist --dist-no-color log -1 --pretty=format:"%h [%ad] <%ae>" \
     | grep -v "^$" &> RepoVersion.txt
 
+A repo version file with two lines per repo (listing just the full SHA1 of
+HEAD of each repo) can be written much faster (e.g. in CI) using:
+
+  $ gitdist dist-version-snapshot > RepoVersion.txt
+
+which reads the SHA1s directly from the files in each repo's .git/ directory
+(and only runs 'git rev-parse HEAD', in several repos at the same time, for
+the repos where the files can't be read directly).
+
 This allows checking out consistent versions of the set git repos, diffing two
 consistent versions of the set of git repos, etc.
 
@@ -510,6 +659,206 @@ If no branch name is specified for any given repository in the
 helpTopicsDict.update( { 'default-branch' : defaultBranchHelp } )
 
 
+repoDependenciesHelp = r"""
+REPO DEPENDENCIES:
+
+Each line of the .gitdist[.default] file can also have optional
+'<name>=<value>' attributes after the repo dir (and the default branch if
+given).  The attribute 'after=<repo0>,<repo1>,...' says that the git command
+must be run in the repo only after it is done in the listed repos and the
+attribute 'group=<group>' puts the repo in a group so that 'after=<group>'
+means after all of the repos in that group.  For example:
+
+    . master
+    ExtraRepo1 develop group=core
+    ExtraRepo1/ExtraRepo2 group=core
+    ExtraRepo3 after=core
+    ExtraRepo4 after=.,ExtraRepo3
+
+The repos are then processed in topological levels.  The first level is the
+repos with no dependencies (i.e. '.', ExtraRepo1, and ExtraRepo1/ExtraRepo2
+above) and each later level is the repos that only depend on repos in the
+earlier levels (i.e. ExtraRepo3 and then ExtraRepo4 above).  The repos in
+each level are processed in the order that they are listed.  With
+--dist-parallel=<N>, the repos in each level are processed at the same time
+and the next level is only started after all of the repos in the level are
+done.  Without --dist-parallel, the repos are processed one at a time in the
+order of the levels.  If the git command fails in a repo, then it is not run
+in the repos that depend on it (directly or indirectly) and those repos are
+listed as skipped.  If any repo was skipped, then gitdist lists the repos
+where the git command failed or was skipped and returns a non-zero exit
+status (with --dist-parallel, it always does that if the git command failed
+in any of the repos).
+
+Dependencies on repos that are not processed (e.g. because of
+--dist-not-repos or --dist-mod-only) are ignored.  An unknown repo or group
+in 'after=' or a cycle in the dependencies is an error.  The dependencies do
+not change the order of the repos for dist-repo-status.
+"""
+helpTopicsDict.update( { 'repo-dependencies' : repoDependenciesHelp } )
+
+
+distCloneHelp = r"""
+CLONING THE REPOS:
+
+If the lines of the .gitdist[.default] file have the attribute
+'url=<remote-url>' (see --dist-help=repo-dependencies), for example:
+
+    . master
+    ExtraRepo1 develop url=git@some.url:ExtraRepo1.git
+    ExtraRepo1/ExtraRepo2 url=git@some.url:ExtraRepo2.git
+    ExtraRepo3 url=git@some.url:ExtraRepo3.git
+
+then after cloning the base repo, the extra repos can be cloned with:
+
+  $ cd BaseRepo/
+  $ gitdist dist-clone
+
+This clones the listed repos that do not exist yet several at a time (see
+--dist-parallel) with a nested repo (e.g. ExtraRepo1/ExtraRepo2) being
+cloned after the repo containing it.  A repo with a default branch other than
+'master' in .gitdist (e.g. 'develop' for ExtraRepo1) is cloned with that
+branch checked out (i.e. 'git clone --branch develop').  The other repos are
+cloned with the branch of the remote HEAD checked out.
+
+To avoid downloading the same objects again for every new set of local
+clones, gitdist keeps a bare mirror of each remote repo in a machine-wide
+cache directory (set with --dist-clone-cache-dir=<dir> or the env var
+GITDIST_CLONE_CACHE_DIR, default '~/.cache/gitdist/mirrors').  The mirror of
+a remote repo is created or updated (with 'git fetch --prune') and then the
+repo is cloned with 'git clone --reference <mirror>' so that only the objects
+missing from the mirror are downloaded from the remote repo.  The clone then
+borrows the objects from the mirror (using the git alternates file) so the
+mirrors are set to never prune objects.  To get independent clones that copy
+the objects from the mirror instead, pass in --dist-dissociate (which runs
+'git clone --dissociate').  To not use the mirrors at all, pass in
+--dist-no-cache.
+
+Large repos that are only partly needed can be given a clone profile with the
+attributes 'clone=<profile>' and 'sparse=<dir0>,<dir1>,...', for example:
+
+    ExtraRepo3 url=git@some.url:ExtraRepo3.git clone=blobless sparse=src,cmake
+
+where <profile> is one of:
+
+  full:     Clone all of the objects (the default)
+  blobless: Partial clone with 'git clone --filter=blob:none' (file contents
+            are only downloaded when they are checked out or needed)
+  treeless: Partial clone with 'git clone --filter=tree:0' (also downloads
+            the trees only when needed; best for builds that don't look at
+            the history)
+
+and 'sparse=' clones with 'git clone --sparse' and then runs 'git
+sparse-checkout set <dir0> <dir1> ...' so that only the files in the top
+directory and under the listed directories are checked out (i.e. cone mode).
+The repos with a 'blobless' or 'treeless' profile are cloned directly from
+the remote repo and not through the mirrors (which hold all of the
+objects).  Git saves the filter in the repo's config so later 'gitdist fetch'
+and 'gitdist pull' commands also only download the filtered objects.  Running
+dist-clone again applies the profile to the existing repos that do not have
+it yet (i.e. it sets the partial clone filter for the later fetches of the
+remote 'origin' and sets up the sparse checkout).  (Note that the remote
+server must allow filters and that a local remote must be given as a
+'file://' url for a partial clone.)
+"""
+helpTopicsDict.update( { 'dist-clone' : distCloneHelp } )
+
+
+distMaintenanceHelp = r"""
+MAINTENANCE OF THE REPOS:
+
+Git commands like 'git status' and 'git log' (and therefore dist-repo-status)
+get slow in large repos that are never maintained.  Running:
+
+  $ gitdist dist-maintenance
+
+runs the following git commands in each repo:
+
+  git config core.untrackedCache true
+  git update-index --untracked-cache
+  git repack -d -q
+  git multi-pack-index write
+  git commit-graph write --reachable --changed-paths
+
+which enable the untracked cache (so 'git status' does not have to read all
+of the untracked directories every time), pack the loose objects into a new
+pack (without repacking the existing packs), write a multi-pack-index (so
+that objects are found quickly across all of the packs), and write a
+commit-graph with changed-path Bloom filters (so that walking the history
+and 'git log -- <path>' are much faster).  Several repos are maintained at the
+same time (see --dist-parallel, default '4').  The output of each repo is
+printed followed by a table of the times for the reference commands 'git
+status --porcelain' and 'git rev-list --count --max-count=10000 HEAD' (which
+walks at most the last 10000 commits) in each repo before and after the
+maintenance so that one can see the gain.  (Note that some of the steps need
+newer versions of git, e.g. git 2.27+ for '--changed-paths', and a step that
+fails is reported but the other steps are still run.)
+"""
+helpTopicsDict.update( { 'dist-maintenance' : distMaintenanceHelp } )
+
+
+distGrepHelp = r"""
+SEARCHING THE REPOS:
+
+Instead of 'gitdist grep <pattern>' (which runs 'git grep' in one repo at a
+time and prints the paths relative to each repo under the repo's header),
+one can run:
+
+  $ gitdist dist-grep [--dist-max-count=<N>] [git grep arguments]
+
+which runs 'git grep [git grep arguments]' in several repos at the same time
+(see --dist-parallel) and prints each line of the output as soon as it is
+read with the repo dir added to the front of the path (so that all of the
+paths are relative to the base dir, e.g. 'ExtraRepo1/src/file.cpp:12:...').
+The lines from different repos are therefore mixed together.  The 'git grep'
+options that print lines without the path in front (i.e. '-h',
+'--heading', '-O' and '-z' with '-l', '-L' or '--name-only') are not
+supported.  With --dist-max-count=<N>, only the first <N>
+lines in total (over all of the repos) are printed and the 'git grep'
+processes that are still running are killed (e.g. to just find out if and
+where something is used).  The exit code is 0 if any lines matched, 1 if no
+lines matched, and 2 if 'git grep' failed in any repo (like for 'git grep').
+"""
+helpTopicsDict.update( { 'dist-grep' : distGrepHelp } )
+
+
+# Default --format=<format> of each commit printed by dist-log
+defaultRepoLogFormat = "%h %ci %an: %s"
+
+
+distLogHelp = r"""
+MERGED LOG OF THE REPOS:
+
+To see what changed in all of the repos (e.g. today) as a single history,
+instead of reading the output of 'gitdist log' repo by repo, run:
+
+  $ gitdist dist-log [--dist-max-count=<N>] [git log arguments]
+
+which runs 'git log -z [git log arguments]' in all of the repos at the same
+time and prints the commits of all of the repos merged together by commit
+date (newest first) with the name of the repo in front, for example:
+
+  $ gitdist dist-log --since=midnight
+  [ExtraRepo1] 5fe1c2a 2013-09-23 11:34:59 -0400 author1: Second summary
+  [BaseRepo] e102e27 2013-09-23 10:12:03 -0400 author0: First summary
+  ...
+
+The format of each commit can be set with '--format=<format>' (or
+'--pretty=format:<format>') as for 'git log' (the default is
+'"""+defaultRepoLogFormat+r"""').  Of the named formats, only
+'--oneline', '--pretty=oneline' and '--pretty=reference' can be used (the
+others print several lines per commit and are an error).  The commits are
+read from the 'git log' processes only as they are printed so that commands
+like 'gitdist dist-log | head' stop right away and only a few commits are kept
+in memory even for long histories.  With --dist-max-count=<N>, only the first
+<N> commits over all of the repos are printed.  (Note that the commits of each
+repo are expected to be in the order of their commit dates, e.g. don't pass in
+'--reverse' or '--topo-order'.  Options like '--graph' that print other lines
+between the commits are reported as an error.)
+"""
+helpTopicsDict.update( { 'dist-log' : distLogHelp } )
+
+
 moveToBaseDirHelp = r"""
 MOVE TO BASE DIRECTORY:
 
@@ -702,6 +1051,30 @@ Other usage tips:
 
  - If one is not sure whether to run 'gitdist' or 'gitdist-mod', then just
    run 'gitdist' to be safe.
+
+ - Non-interactive git commands that talk to remotes like 'gitdist fetch' and
+   'gitdist pull' can be run in several repos at the same time with
+   'gitdist --dist-parallel=<N> <raw-git-command> [git arguments]'.  The
+   output for each repo is still printed in order.
+
+ - To find out which repos make a git command slow, pass in --dist-timing.
+   This prints a table of the wall time and exit code of the git command in
+   each repo (slowest first) after the output of the command.  The times are
+   also saved in a history file (the file 'gitdist-timing-history' in the base
+   repo's .git/ directory, or '.gitdist-timing-history') which is also
+   written when running with --dist-parallel=<N>.  With --dist-parallel=<N>,
+   the git command is started first in the repos where it took the longest
+   in the past so that one slow repo started last does not hold up the whole
+   run.
+
+ - Python scripts that would run gitdist and parse its output can instead
+   import the gitdist module and use its Workspace class which returns the
+   status of the repos and the output and exit code of a git command in each
+   repo as Python objects (without changing the current directory), e.g.:
+
+     workspace = gitdist.Workspace(<baseDir>, [ "--dist-mod-only" ])
+     reposAndStats = workspace.status()
+     repoCmndResults = workspace.run([ "fetch" ], parallel=8)
 """
 helpTopicsDict.update( { 'usage-tips' : usageTipsHelp } )
 
@@ -710,8 +1083,10 @@ scriptDependenciesHelp = r"""
 SCRIPT DEPENDENCIES:
 
 The Python script gitdist only depends on the Python 2.6+ standard modules
-'sys', 'os', 'subprocess', and 're'. Also, of course, it requires some
-compatible version of 'git' in your path (but gitdist works with several
+'sys', 'os', 'subprocess', 're', 'time', 'threading', 'struct', 'hashlib',
+'json', 'csv', 'fnmatch', 'socket', 'select', 'signal', 'errno', 'heapq', and
+'shutil' (and optionally 'ctypes' and 'curses'). Also, of course, it requires
+some compatible version of 'git' in your path (but gitdist works with several
 versions of git starting as far back as git 1.6+).
 """
 helpTopicsDict.update( { 'script-dependencies' : scriptDependenciesHelp } )
@@ -799,6 +1174,19 @@ import sys
 import os
 import subprocess
 import re
+import time
+import threading
+import struct
+import hashlib
+import json
+import csv
+import fnmatch
+import socket
+import select
+import signal
+import errno
+import heapq
+import shutil
 
 from optparse import OptionParser
 
@@ -871,10 +1259,15 @@ def filterWarnings(lines):
   return g
 
 
-# Get output from command
-def getCmndOutput(cmnd, rtnCode=False):
+# Get output from command (run in workingDir if not None)
+def getCmndOutput(cmnd, rtnCode=False, workingDir=None, extraEnv=None):
+  if extraEnv:
+    fullEnv = os.environ.copy()
+    fullEnv.update(extraEnv)
+  else:
+    fullEnv = None
   child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
-    stderr = subprocess.STDOUT)
+    stderr = subprocess.STDOUT, cwd=workingDir, env=fullEnv)
   output = child.stdout.read()
   child.wait()
   if rtnCode:
@@ -882,65 +1275,242 @@ def getCmndOutput(cmnd, rtnCode=False):
   return s(output)
 
 
-# Run a command and syncronize the output
+# Run a command and syncronize the output (returns the exit code)
 def runCmnd(options, cmnd):
   if options.debug:
     print("*** Running command: %s" % cmnd)
   if options.noOpt:
     print(cmnd)
-  else:
-    subprocess.Popen(cmnd, stdout=sys.stdout, stderr=sys.stderr).communicate()
-    print("")
+    return 0
+  child = subprocess.Popen(cmnd, stdout=sys.stdout, stderr=sys.stderr)
+  child.communicate()
+  print("")
+  return child.returncode
+
+
+# Find a command in the PATH (without running 'which') and return its full
+# path (or None)
+def findCommandInPath(cmnd):
+  if os.path.dirname(cmnd):
+    if os.path.isfile(cmnd) and os.access(cmnd, os.X_OK):
+      return cmnd
+    return None
+  for pathDir in os.environ.get("PATH", "").split(os.pathsep):
+    cmndPath = os.path.join(pathDir, cmnd)
+    if os.path.isfile(cmndPath) and os.access(cmndPath, os.X_OK):
+      return cmndPath
+  return None
 
 
 # Determine if a command exists:
 def commandExists(cmnd):
-  whichCmnd = getCmndOutput("which "+cmnd).strip()
-  #print("whichCmnd = %s" % whichCmnd)
-  if os.path.exists(whichCmnd):
+  if findCommandInPath(cmnd):
     return True
   return False
 
 
-# Get the terminal colors
-txtbld=getCmndOutput(r"tput bold")       # Bold
-txtblu=getCmndOutput(r"tput setaf 4")    # Blue
-txtred=getCmndOutput(r"tput setaf 1")    # Red
-txtrst=getCmndOutput(r"tput sgr0")       # Text reset
+# Get the terminal color strings { "bold" : ..., "blue" : ..., "red" : ...,
+# "reset" : ... } using the terminfo database through curses in this process
+# (or running 'tput' if curses is not available).  These are only looked up
+# the first time that color is actually printed.
+terminalColorsDict = None
+
+def getTerminalColorsDict():
+  global terminalColorsDict
+  if terminalColorsDict is not None:
+    return terminalColorsDict
+  terminalColorsDict = { "bold" : "", "blue" : "", "red" : "", "reset" : "" }
+  try:
+    import curses
+    curses.setupterm()
+    def tiGetStr(capName, *params):
+      capStr = curses.tigetstr(capName)
+      if not capStr:
+        return ""
+      if params:
+        capStr = curses.tparm(capStr, *params)
+      return s(capStr)
+    terminalColorsDict["bold"] = tiGetStr("bold")
+    terminalColorsDict["blue"] = tiGetStr("setaf", 4)
+    terminalColorsDict["red"] = tiGetStr("setaf", 1)
+    terminalColorsDict["reset"] = tiGetStr("sgr0")
+  except Exception:
+    # No curses module or no terminfo entry for TERM so try tput
+    for (colorName, tputArgs) in (("bold", "bold"), ("blue", "setaf 4"),
+      ("red", "setaf 1"), ("reset", "sgr0") \
+      ):
+      try:
+        child = subprocess.Popen("tput "+tputArgs, shell=True,
+          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output = child.communicate()[0]
+      except OSError:
+        break
+      if child.returncode != 0:
+        break
+      terminalColorsDict[colorName] = s(output)
+  return terminalColorsDict
 
 
 # Add color to the repo dirs printed out
 def addColorToRepoDir(useColor, strIn):
   if useColor:
-    return txtbld+txtblu+strIn+txtrst
+    colorsDict = getTerminalColorsDict()
+    return colorsDict["bold"]+colorsDict["blue"]+strIn+colorsDict["reset"]
   return strIn
 
 
 # Add color to the error messages printed out
 def addColorToErrorMsg(useColor, strIn):
   if useColor:
-    return txtred+strIn+txtrst
+    colorsDict = getTerminalColorsDict()
+    return colorsDict["red"]+strIn+colorsDict["reset"]
   return strIn
 
 
+# Names of the optional '<name>=<value>' attributes of the repos in the
+# .gitdist file (see --dist-help=repo-dependencies)
+gitdistFileAttrNames = [ "after", "group", "url", "clone", "sparse",
+  "status" ]
+
+# Values of the 'status=<profile>' attribute and --dist-status-profile (see
+# --dist-help=dist-repo-status)
+repoStatusProfiles = [ "default", "fast", "no-untracked" ]
+
+# Values of the 'clone=<profile>' attribute and the matching 'git clone
+# --filter=<filter-spec>' (see --dist-help=dist-clone)
+gitdistCloneProfileFilters = {
+  "full" : None,
+  "blobless" : "blob:none",
+  "treeless" : "tree:0",
+  }
+
+
 # Get the paths to all the repos gitdist will work on, along with any optional
-# default branches.
-def parseGitdistFile(gitdistfile):
+# default branches and the dict of the optional '<name>=<value>' attributes
+# for each repo.
+def parseGitdistFileWithAttrs(gitdistfile):
   reposFullList = []
   defaultBranchDict = {}
+  repoAttrsDict = {}
   with open(gitdistfile, 'r') as file:
     for line in file:
       entries = line.split()
-      reposFullList.append(entries[0])
-      if len(entries) > 1:
-        defaultBranchDict[entries[0]] = entries[1]
+      if not entries:
+        continue
+      repo = entries[0]
+      reposFullList.append(repo)
+      if len(entries) > 1 and not "=" in entries[1]:
+        defaultBranchDict[repo] = entries[1]
       else:
-        defaultBranchDict[entries[0]] = "master"
+        defaultBranchDict[repo] = "master"
+      repoAttrs = {}
+      for entry in entries[1:]:
+        if not "=" in entry:
+          continue
+        (attrName, attrValue) = entry.split("=", 1)
+        if not attrName in gitdistFileAttrNames:
+          raise Exception("Error, the attribute '" + entry + "' for the repo '"
+            + repo + "' in the file '" + gitdistfile + "' is not one of "
+            + str(gitdistFileAttrNames) + "!")
+        if attrName == "clone" and not attrValue in gitdistCloneProfileFilters:
+          raise Exception("Error, the attribute '" + entry + "' for the repo '"
+            + repo + "' in the file '" + gitdistfile + "' is not one of "
+            + str(sorted(gitdistCloneProfileFilters.keys())) + "!")
+        if attrName == "status" and not attrValue in repoStatusProfiles:
+          raise Exception("Error, the attribute '" + entry + "' for the repo '"
+            + repo + "' in the file '" + gitdistfile + "' is not one of "
+            + str(repoStatusProfiles) + "!")
+        repoAttrs[attrName] = attrValue
+      repoAttrsDict[repo] = repoAttrs
+  return (reposFullList, defaultBranchDict, repoAttrsDict)
+
+
+# Get the paths to all the repos gitdist will work on, along with any optional
+# default branches.
+def parseGitdistFile(gitdistfile):
+  (reposFullList, defaultBranchDict, repoAttrsDict) = \
+    parseGitdistFileWithAttrs(gitdistfile)
   return (reposFullList, defaultBranchDict)
 
 
-# Get the commandline options
-def getCommandlineOps():
+# Get the dict { <repo> : <list of repos it must run after> } from the
+# 'after=' and 'group=' attributes of the repos
+def getRepoDepsDict(reposFullList, repoAttrsDict):
+  groupReposDict = {}
+  for repo in reposFullList:
+    group = repoAttrsDict.get(repo, {}).get("group", "")
+    if group:
+      groupReposDict.setdefault(group, []).append(repo)
+  repoDepsDict = {}
+  for repo in reposFullList:
+    repoDeps = []
+    for afterName in repoAttrsDict.get(repo, {}).get("after", "").split(","):
+      if not afterName:
+        continue
+      if afterName in reposFullList:
+        repoDeps.append(afterName)
+      elif afterName in groupReposDict:
+        for groupRepo in groupReposDict[afterName]:
+          if groupRepo != repo:
+            repoDeps.append(groupRepo)
+      else:
+        raise Exception("Error, 'after=" + afterName + "' for the repo '" + repo
+          + "' is not a repo or a group!")
+    repoDepsDict[repo] = repoDeps
+  return repoDepsDict
+
+
+# Split the repos in reposList into levels where each repo only depends on
+# repos in earlier levels (ignoring dependencies that are not in reposList)
+# keeping the order of reposList in each level.  Returns the list of levels
+# where each level is a list of indexes into reposList.
+def getRepoDependencyLevels(reposList, repoDepsDict):
+  reposSet = set(reposList)
+  doneReposSet = set()
+  remainingRepoIdxs = list(range(len(reposList)))
+  repoLevelsList = []
+  while remainingRepoIdxs:
+    repoLevel = []
+    nextRemainingRepoIdxs = []
+    for repoIdx in remainingRepoIdxs:
+      repoIsReady = True
+      for repoDep in repoDepsDict.get(reposList[repoIdx], []):
+        if repoDep in reposSet and not repoDep in doneReposSet:
+          repoIsReady = False
+          break
+      if repoIsReady:
+        repoLevel.append(repoIdx)
+      else:
+        nextRemainingRepoIdxs.append(repoIdx)
+    if not repoLevel:
+      raise Exception("Error, the 'after=' dependencies of the repos "
+        + str([ reposList[repoIdx] for repoIdx in remainingRepoIdxs ])
+        + " have a cycle!")
+    for repoIdx in repoLevel:
+      doneReposSet.add(reposList[repoIdx])
+    repoLevelsList.append(repoLevel)
+    remainingRepoIdxs = nextRemainingRepoIdxs
+  return repoLevelsList
+
+
+# Get the list of the repos that a repo depends on where the git command
+# failed (or was skipped)
+def getFailedRepoDeps(repo, repoDepsDict, failedReposSet):
+  failedRepoDeps = []
+  for repoDep in repoDepsDict.get(repo, []):
+    if repoDep in failedReposSet:
+      failedRepoDeps.append(repoDep)
+  return failedRepoDeps
+
+
+def getSkippedRepoMsg(failedRepoDeps):
+  return "*** Skipped since the git command failed in: " \
+    + ", ".join(failedRepoDeps)
+
+
+# Get the optparse.OptionParser for the native gitdist command-line arguments
+# (i.e. --dist-xxx) and the list of their names (with --dist-help first)
+def getNativeArgsOptionParser():
 
   #
   # A) Define the native gitdist command-line arguments
@@ -958,14 +1528,25 @@ def getCommandlineOps():
   noOptName = "--dist-no-opt"
   modifiedOnlyName = "--dist-mod-only"
   legendName = "--dist-legend"
+  parallelArgName = "--dist-parallel"
+  noCacheArgName = "--dist-no-cache"
+  formatArgName = "--dist-format"
+  discoverIgnoreArgName = "--dist-discover-ignore"
+  timingArgName = "--dist-timing"
+  cloneCacheDirArgName = "--dist-clone-cache-dir"
+  dissociateArgName = "--dist-dissociate"
+  statusProfileArgName = "--dist-status-profile"
+  liveArgName = "--dist-live"
+  liveIntervalArgName = "--dist-live-interval"
+  maxCountArgName = "--dist-max-count"
 
   nativeArgNames = [ distHelpArgName, helpArgName, withGitArgName, \
     reposArgName, notReposArgName, \
     versionFileName, versionFile2Name, noColorArgName, debugArgName, noOptName, \
-    modifiedOnlyName, legendName ]
-
-  distRepoStatus = "dist-repo-status"
-  nativeCmndNames = [ distRepoStatus ]
+    modifiedOnlyName, legendName, parallelArgName, noCacheArgName, \
+    formatArgName, discoverIgnoreArgName, timingArgName, cloneCacheDirArgName,
+    dissociateArgName, statusProfileArgName, liveArgName, liveIntervalArgName,
+    maxCountArgName ]
 
   # Select a version of git (see above help documentation)
   defaultGit = "git" # Try system git
@@ -973,61 +1554,10 @@ def getCommandlineOps():
     defaultGit = "" # Give up and make the user specify
 
   #
-  # B) Pull the native commandline arguments out of the commandline
+  # B) Set up the commandline parser
   #
 
-  argv = sys.argv[1:]
-  nativeArgs = []
-  nativeCmnds = []
-  otherArgs = []
-  helpTopicArg = "" 
-
-  for arg in argv:
-    #print("\narg = '" + arg + "'")
-    matchedNativeArg = False
-    for nativeArgName in nativeArgNames:
-      #print("\nnativeArgName ='" + nativeArgName + "'")
-      currentArgName = arg[0:len(nativeArgName)]
-      #print("currentArgName = '" + currentArgName + "'")
-      if currentArgName == nativeArgName:
-        #print("\nMatches native arg!")
-        nativeArgs.append(arg)
-        matchedNativeArg = True
-        if currentArgName == distHelpArgName:
-          helpTopicArg = arg
-        break
-    matchedNativeCmnd = False
-    for nativeCmndName in nativeCmndNames:
-      if arg == nativeCmndName:
-        #print("\nMatches native cmnd!")
-        nativeCmnds.append(nativeCmndName)
-        matchedNativeCmnd = True
-        break
-    if not (matchedNativeArg or matchedNativeCmnd):
-      #print("\nDoes *not* match native arg!")
-      otherArgs.append(arg)
-    #print("\nnativeArgs = " + str(nativeArgs))
-    #print("otherArgs = " + str(otherArgs))
-
-  #print("\nnativeArgs = " + str(nativeArgs))
-  #print("nativeCmnds = " + str(nativeCmnds))
-  #print("otherArgs = " + str(otherArgs))
-
-  if len(nativeCmnds) == 0:
-    nativeCmnd = None
-  elif len(nativeCmnds) == 1:
-    nativeCmnd = nativeCmnds[0]
-  elif len(nativeCmnds) > 1:
-    raise Exception("Error: Can't have more than one dist-xxx command "+\
-      " but was passed in "+str(nativeCmnds))
-
-  #
-  # C) Set up the commandline parser and parse the native args
-  #
-
-  usageHelp = getUsageHelpStr(helpTopicArg)
-
-  clp = OptionParser(usage=usageHelp)
+  clp = OptionParser()
 
   addOptionParserChoiceOption(
     distHelpArgName, "helpTopic", [""]+helpTopics+["all"], 0,
@@ -1090,6 +1620,47 @@ def getCommandlineOps():
       " dist-repo-status (see --dist-help=dist-repo-status).",
     default=False )
 
+  clp.add_option(
+    liveArgName, dest="liveStatus", action="store_true",
+    help="If set, then the table of the special dist-repo-status command is" \
+      " kept up to date in the terminal (until Ctrl-C) by only getting the" \
+      " status of the repos that changed and only redrawing the lines that" \
+      " changed.  Only applicable with dist-repo-status (see" \
+      " --dist-help=dist-repo-status).",
+    default=False )
+
+  clp.add_option(
+    maxCountArgName, dest="maxCount", type="int", default=0,
+    help="If > 0, then the special dist-grep command stops after printing" \
+    +" this many lines (and dist-log after printing this many commits) in" \
+    +" total over all of the repos.  (See --dist-help=dist-grep and" \
+    +" --dist-help=dist-log.) (default=0)" )
+
+  clp.add_option(
+    liveIntervalArgName, dest="liveIntervalSec", type="float",
+    default=defaultLiveIntervalSec,
+    help="Number of seconds between the updates of the table for " \
+    +liveArgName+". (default="+str(defaultLiveIntervalSec)+")" )
+
+  addOptionParserChoiceOption(
+    statusProfileArgName, "statusProfile", repoStatusProfiles, 0,
+    "How the status of the repos is gathered for dist-repo-status and" \
+    +" --dist-mod-only.  With 'fast', 'git status' uses the untracked cache" \
+    +" and the builtin fsmonitor (if git has it).  With 'no-untracked', the" \
+    +" untracked files are also not counted (shown as '-').  The attribute" \
+    +" 'status=<profile>' in .gitdist sets the profile for just that repo." \
+    +"  (See --dist-help=dist-repo-status.)",
+    clp )
+
+  addOptionParserChoiceOption(
+    formatArgName, "statusFormat", repoStatFormats, 0,
+    "Format of the output of the special dist-repo-status command.  With" \
+    +" 'jsonl' (one JSON object per line) or 'csv' (with a header line), the" \
+    +" line for each repo is printed as soon as its status is ready (so the" \
+    +" lines may not be in the order of the repo IDs).  Only applicable with" \
+    +" dist-repo-status (see --dist-help=dist-repo-status).",
+    clp )
+
   clp.add_option(
     versionFileName, dest="versionFile", type="string",
     default="",
@@ -1121,6 +1692,135 @@ def getCommandlineOps():
     help="If set, then no git commands will be run but instead will just be printed.",
     default=False )
 
+  clp.add_option(
+    timingArgName, dest="printTiming", action="store_true",
+    help="If set, then a table of the wall time and exit code of the git"
+    +" command in each repo (slowest first) is printed at the end and the"
+    +" times are saved in the timing history file.  (See"
+    +" --dist-help=usage-tips.)",
+    default=False )
+
+  clp.add_option(
+    parallelArgName, dest="parallel", type="int", default=None,
+    help="Number of git repos to run the git command in at the same time."
+    +"  If > 1, then the output of each git command is buffered and printed"
+    +" in the same order as the repos are listed (i.e. in .gitdist) and"
+    +" gitdist returns a non-zero exit status if the git command failed in"
+    +" any of the repos.  Do not use for interactive git commands"
+    +" (e.g. 'commit' without '-m' or '-F').  This also sets the number of"
+    +" repos to get the status of at the same time for dist-repo-status and"
+    +" --dist-mod-only."
+    +" (default='1' for git commands, '"+str(defaultNumParallelRepoStats)+"'"
+    +" for getting repo status)"
+    )
+
+  clp.add_option(
+    noCacheArgName, dest="useCache", action="store_false",
+    help="If set, then the repo status for dist-repo-status and --dist-mod-only"
+    +" is always recomputed and the repo status cache file is not read or"
+    +" written (and the same for the directory cache for dist-discover)."
+    +"  (See --dist-help=dist-repo-status.)",
+    default=True )
+
+  clp.add_option(
+    discoverIgnoreArgName, dest="discoverIgnore", type="string", default="",
+    help="Comma-separated list of globs '<glob0>,<glob1>,...' for directories"
+    +" to not search for git repos with the special dist-discover command."
+    +"  Each glob is matched against the directory name and its path relative"
+    +" to the base directory.  (See --dist-help=repo-selection-and-setup.)"
+    +" (default='')"
+    )
+
+  clp.add_option(
+    cloneCacheDirArgName, dest="cloneCacheDir", type="string",
+    default=getDefaultCloneCacheDir(),
+    help="Directory of the bare mirrors of the remote repos used by the special"
+    +" dist-clone command.  (See --dist-help=dist-clone.)"
+    +" (default='"+getDefaultCloneCacheDir()+"')"
+    )
+
+  clp.add_option(
+    dissociateArgName, dest="dissociate", action="store_true",
+    help="If set, then dist-clone copies the objects from the mirrors in"
+    +" --dist-clone-cache-dir into the new clones instead of borrowing them."
+    +"  (See --dist-help=dist-clone.)",
+    default=False )
+
+  return (clp, nativeArgNames)
+
+
+# Get the commandline options
+def getCommandlineOps():
+
+  (clp, nativeArgNames) = getNativeArgsOptionParser()
+  distHelpArgName = nativeArgNames[0]
+
+  distRepoStatus = "dist-repo-status"
+  distDiscover = "dist-discover"
+  distDaemon = "dist-daemon"
+  distClone = "dist-clone"
+  distMaintenance = "dist-maintenance"
+  distVersionSnapshot = "dist-version-snapshot"
+  distGrep = "dist-grep"
+  distLog = "dist-log"
+  nativeCmndNames = [ distRepoStatus, distDiscover, distDaemon, distClone,
+    distMaintenance, distVersionSnapshot, distGrep, distLog ]
+
+  #
+  # A) Pull the native commandline arguments out of the commandline
+  #
+
+  argv = sys.argv[1:]
+  nativeArgs = []
+  nativeCmnds = []
+  otherArgs = []
+  helpTopicArg = "" 
+
+  for arg in argv:
+    #print("\narg = '" + arg + "'")
+    matchedNativeArg = False
+    for nativeArgName in nativeArgNames:
+      #print("\nnativeArgName ='" + nativeArgName + "'")
+      currentArgName = arg[0:len(nativeArgName)]
+      #print("currentArgName = '" + currentArgName + "'")
+      if currentArgName == nativeArgName:
+        #print("\nMatches native arg!")
+        nativeArgs.append(arg)
+        matchedNativeArg = True
+        if currentArgName == distHelpArgName:
+          helpTopicArg = arg
+        break
+    matchedNativeCmnd = False
+    for nativeCmndName in nativeCmndNames:
+      if arg == nativeCmndName:
+        #print("\nMatches native cmnd!")
+        nativeCmnds.append(nativeCmndName)
+        matchedNativeCmnd = True
+        break
+    if not (matchedNativeArg or matchedNativeCmnd):
+      #print("\nDoes *not* match native arg!")
+      otherArgs.append(arg)
+    #print("\nnativeArgs = " + str(nativeArgs))
+    #print("otherArgs = " + str(otherArgs))
+
+  #print("\nnativeArgs = " + str(nativeArgs))
+  #print("nativeCmnds = " + str(nativeCmnds))
+  #print("otherArgs = " + str(otherArgs))
+
+  if len(nativeCmnds) == 0:
+    nativeCmnd = None
+  elif len(nativeCmnds) == 1:
+    nativeCmnd = nativeCmnds[0]
+  elif len(nativeCmnds) > 1:
+    raise Exception("Error: Can't have more than one dist-xxx command "+\
+      " but was passed in "+str(nativeCmnds))
+
+  #
+  # B) Parse the native args
+  #
+
+  clp.set_usage(getUsageHelpStr(helpTopicArg))
+
   (options, args) = clp.parse_args(nativeArgs)
 
   debugFromEnv = os.environ.get("GITDIST_DEBUG_OVERRIDE")
@@ -1128,7 +1828,7 @@ def getCommandlineOps():
     options.debug = True
 
   #
-  # D) Print --dist-topic=<topic-name>, check for valid usage
+  # C) Print --dist-topic=<topic-name>, check for valid usage
   #
 
   if options.helpTopic:
@@ -1146,8 +1846,27 @@ def getCommandlineOps():
                              "Can't find git, please set --dist-use-git"))
     sys.exit(1)
 
+  if options.liveIntervalSec <= 0.0:
+    print(addColorToErrorMsg(options.useColor,
+                             "Error, --dist-live-interval="
+                             +str(options.liveIntervalSec)
+                             +" is invalid!  Must be > 0."))
+    sys.exit(1)
+
+  if options.parallel != None and options.parallel < 1:
+    print(addColorToErrorMsg(options.useColor,
+                             "Error, --dist-parallel="+str(options.parallel)
+                             +" is invalid!  Must be >= 1."))
+    sys.exit(1)
+
+  if options.maxCount < 0:
+    print(addColorToErrorMsg(options.useColor,
+                             "Error, --dist-max-count="+str(options.maxCount)
+                             +" is invalid!  Must be >= 0."))
+    sys.exit(1)
+
   #
-  # E) Change to top-level git directory (in case of nested git repos)
+  # D) Change to top-level git directory (in case of nested git repos)
   #
 
   moveToBaseDir = os.environ.get("GITDIST_MOVE_TO_BASE_DIR")
@@ -1195,23 +1914,49 @@ def getCommandlineOps():
     sys.exit(1)
 
   #
-  # F) Get the list of extra repos
+  # E) Get the list of extra repos
+  #
+
+  try:
+    (reposFullList, defaultBranchDict, repoAttrsDict, notReposFullList) = \
+      getReposFullList(options)
+  except Exception as e:
+    print(str(e))
+    sys.exit(1)
+
+  #
+  # F) Return
   #
 
+  return (options, nativeCmnd, otherArgs, reposFullList, defaultBranchDict,
+    notReposFullList, repoAttrsDict)
+
+
+# Get (reposFullList, defaultBranchDict, repoAttrsDict, notReposFullList) for
+# the base dir baseDir from --dist-repos and --dist-not-repos or the .gitdist
+# file (throws if the .gitdist file is not valid)
+def getReposFullList(options, baseDir="."):
+
+  repoAttrsDict = {}
   if options.repos:
     reposFullList = options.repos.split(",")
     defaultBranchDict = {}
     for repo in reposFullList:
       defaultBranchDict[repo] = "master"
   else:
-    if os.path.exists(".gitdist"):
+    if os.path.exists(os.path.join(baseDir, ".gitdist")):
       gitdistfile = ".gitdist"
-    elif os.path.exists(".gitdist.default"):
+    elif os.path.exists(os.path.join(baseDir, ".gitdist.default")):
       gitdistfile = ".gitdist.default"
     else:
       gitdistfile = None
     if gitdistfile:
-      (reposFullList, defaultBranchDict) = parseGitdistFile(gitdistfile)
+      if baseDir != ".":
+        gitdistfile = os.path.join(baseDir, gitdistfile)
+      (reposFullList, defaultBranchDict, repoAttrsDict) = \
+        parseGitdistFileWithAttrs(gitdistfile)
+      getRepoDependencyLevels(reposFullList,
+        getRepoDepsDict(reposFullList, repoAttrsDict))
     else:
       reposFullList = ["."] # The default is the base repo
       defaultBranchDict = {".": "master"}
@@ -1223,12 +1968,7 @@ def getCommandlineOps():
   else:
     notReposFullList = []
 
-  #
-  # G) Return
-  #
-
-  return (options, nativeCmnd, otherArgs, reposFullList, defaultBranchDict,
-    notReposFullList)
+  return (reposFullList, defaultBranchDict, repoAttrsDict, notReposFullList)
 
 
 # Requote commandline arguments into an array
@@ -1246,8 +1986,13 @@ def requoteCmndLineArgsIntoArray(inArgs):
   return argsArray
 
 
-# Get a data-structure for a set of repos from a string
-def getRepoVersionDictFromRepoVersionFileString(repoVersionFileStr):
+# Get a data-structure for a set of repos from a string (where the repo named
+# baseRepoNameIn, or the global baseRepoName if None, is the base repo '.')
+def getRepoVersionDictFromRepoVersionFileString(repoVersionFileStr,
+  baseRepoNameIn=None \
+  ):
+  if baseRepoNameIn is None:
+    baseRepoNameIn = baseRepoName
   repoVersionFileStrList = repoVersionFileStr.splitlines()
   repoVersionDict = {}
   len_repoVersionFileStrList = len(repoVersionFileStrList)
@@ -1264,7 +2009,7 @@ def getRepoVersionDictFromRepoVersionFileString(repoVersionFileStr):
       repoSha1 = repoVersionLine.split(" ")[0].strip()
       #print("repoSha1 = '" + repoSha1 + "'")
       #print("baseRepoName = '"+baseRepoName+"'")
-      repoDirToEnter = ("." if repoDir == baseRepoName else repoDir)
+      repoDirToEnter = ("." if repoDir == baseRepoNameIn else repoDir)
       #print("repoDirToEnter = '" + repoDirToEnter + "'")
       repoVersionDict.update({repoDirToEnter : repoSha1})
     else:
@@ -1282,14 +2027,59 @@ def getRepoVersionDictFromRepoVersionFileString(repoVersionFileStr):
 
 
 # Get a data-structure for a set of repos from a file
-def getRepoVersionDictFromRepoVersionFile(repoVersionFileName):
+def getRepoVersionDictFromRepoVersionFile(repoVersionFileName,
+  baseRepoNameIn=None \
+  ):
   if repoVersionFileName:
     repoVersionFileStr = open(repoVersionFileName, 'r').read()
-    return getRepoVersionDictFromRepoVersionFileString(repoVersionFileStr)
+    return getRepoVersionDictFromRepoVersionFileString(repoVersionFileStr,
+      baseRepoNameIn)
   else:
     None
 
 
+# Get the SHA1 of HEAD of each repo in reposList reading the repo's files
+# directly where possible and running 'git rev-parse HEAD' for the other repos
+# (several at a time).  Returns the list of SHA1s (None if HEAD could not be
+# resolved).
+def getReposHeadSha1s(options, reposList, baseDir):
+  headSha1sList = []
+  gitReposIdxs = []
+  for repoIdx in range(len(reposList)):
+    headSha1 = GitRepoRefReader(
+      os.path.join(baseDir, reposList[repoIdx])).getHeadSha1()
+    if not headSha1 or not re.match("^[0-9a-f]{40,64}$", headSha1):
+      headSha1 = None
+      gitReposIdxs.append(repoIdx)
+    headSha1sList.append(headSha1)
+  def getGitHeadSha1(repoIdx):
+    (output, rtnCode) = getCmndOutput(options.useGit + " rev-parse HEAD",
+      rtnCode=True, workingDir=os.path.join(baseDir, reposList[repoIdx]))
+    output = output.strip()
+    if rtnCode != 0 or not re.match("^[0-9a-f]{40,64}$", output):
+      return None
+    return output
+  for (gitRepoIdx, headSha1) in parallelMap(getGitHeadSha1, gitReposIdxs,
+    getNumParallelRepoStats(options), inOrder=False) \
+    :
+    headSha1sList[gitReposIdxs[gitRepoIdx]] = headSha1
+  return headSha1sList
+
+
+# Get the repo version file string (with two lines per repo) for the repos in
+# reposList with the SHA1s in headSha1sList (see --dist-help=repo-versions)
+def getRepoVersionSnapshotStr(reposList, baseRepoName, headSha1sList):
+  repoVersionFileStr = ""
+  for repoIdx in range(len(reposList)):
+    repo = reposList[repoIdx]
+    if repo == ".":
+      repoVersionFileStr += "*** Base Git Repo: " + baseRepoName + "\n"
+    else:
+      repoVersionFileStr += "*** Git Repo: " + repo + "\n"
+    repoVersionFileStr += headSha1sList[repoIdx] + "\n"
+  return repoVersionFileStr
+
+
 def assertAndGetRepoVersionFromDict(repoDirName, repoVersionDict):
   if repoVersionDict:
     
@@ -1347,38 +2137,2047 @@ def replaceDefaultBranchInCmndLineArgs(cmndLineArgsArray, repoDirName, \
   return cmndLineArgsArrayDefaultBranch
 
 
-# Generate the command line arguments
-def runRepoCmnd(options, cmndLineArgsArray, repoDirName, baseDir, \
+# Generate the git command array to run for a repo
+def getRepoCmndArray(options, cmndLineArgsArray, repoDirName, \
   repoVersionDict, repoVersionDict2, defaultBranchDict \
   ):
   cmndLineArgsArrayRepo = replaceRepoVersionInCmndLineArgs(cmndLineArgsArray, \
     repoDirName, repoVersionDict, repoVersionDict2)
   cmndLineArgsArrayDefaultBranch = replaceDefaultBranchInCmndLineArgs( \
     cmndLineArgsArrayRepo, repoDirName, defaultBranchDict)
-  egCmndArray = [ options.useGit ] + cmndLineArgsArrayDefaultBranch
-  runCmnd(options, egCmndArray)
+  return [ options.useGit ] + cmndLineArgsArrayDefaultBranch
 
 
-# Get the name of the base directory
-def getBaseDirNameFromPath(dirPath):
-  dirPathArray = dirPath.split("/")
-  return dirPathArray[-1]
+# Generate the command line arguments
+def runRepoCmnd(options, cmndLineArgsArray, repoDirName, baseDir, \
+  repoVersionDict, repoVersionDict2, defaultBranchDict \
+  ):
+  egCmndArray = getRepoCmndArray(options, cmndLineArgsArray, repoDirName, \
+    repoVersionDict, repoVersionDict2, defaultBranchDict)
+  return runCmnd(options, egCmndArray)
 
 
-# Get the name of the base repo to insert into the table
-def getBaseRepoTblName(baseRepoName):
-  return baseRepoName+" (Base)"
+#
+# Support for running git commands in several repos at the same time
+#
 
 
-# Determine if the extra repo should be processed or not
-def repoExistsAndNotExcluded(options, extraRepo, notReposList):
-  if not os.path.isdir(extraRepo): return False
-  if extraRepo in notReposList: return False
-  return True
+# Default number of repos to get the status of at the same time
+defaultNumParallelRepoStats = 8
+
+
+# Get the number of repos to run the git command in at the same time
+def getNumParallelRepoCmnds(options):
+  if options.parallel:
+    return options.parallel
+  return 1
+
+
+# Get the number of repos to get the status of at the same time
+def getNumParallelRepoStats(options):
+  if options.parallel:
+    return options.parallel
+  return defaultNumParallelRepoStats
+
+
+# Run func(item) for each item in itemsList using at most numWorkers threads
+# and yield (itemIdx, result) for each item.  If inOrder=True, the results are
+# yielded in the same order as itemsList, each one as soon as it and all of
+# the results before it are done (so that the caller can print them in order
+# while the rest are still running).  If inOrder=False, each result is
+# yielded as soon as it is done.
+def parallelMap(func, itemsList, numWorkers, inOrder=True, launchOrder=None):
+  numItems = len(itemsList)
+  if launchOrder is None:
+    launchOrder = range(numItems)
+  results = [None] * numItems
+  excInfos = [None] * numItems
+  isDone = [False] * numItems
+  doneItemIdxs = []
+  nextItemIdx = [0]
+  cond = threading.Condition()
+
+  def worker():
+    while True:
+      cond.acquire()
+      try:
+        if nextItemIdx[0] >= numItems:
+          return
+        itemIdx = launchOrder[nextItemIdx[0]]
+        nextItemIdx[0] += 1
+      finally:
+        cond.release()
+      result = None
+      excInfo = None
+      try:
+        result = func(itemsList[itemIdx])
+      except Exception:
+        excInfo = sys.exc_info()
+      cond.acquire()
+      try:
+        results[itemIdx] = result
+        excInfos[itemIdx] = excInfo
+        isDone[itemIdx] = True
+        doneItemIdxs.append(itemIdx)
+        cond.notify_all()
+      finally:
+        cond.release()
+
+  workers = []
+  for i in range(min(numWorkers, numItems)):
+    workerThread = threading.Thread(target=worker)
+    workerThread.daemon = True
+    workerThread.start()
+    workers.append(workerThread)
+
+  for yield_i in range(numItems):
+    cond.acquire()
+    try:
+      if inOrder:
+        itemIdx = yield_i
+        while not isDone[itemIdx]:
+          cond.wait(0.1)  # Timeout allows Ctrl-C to interrupt the wait
+      else:
+        while len(doneItemIdxs) <= yield_i:
+          cond.wait(0.1)
+        itemIdx = doneItemIdxs[yield_i]
+    finally:
+      cond.release()
+    if excInfos[itemIdx]:
+      raise excInfos[itemIdx][1]
+    yield (itemIdx, results[itemIdx])
+
+
+# Same as parallelMap() but just yield the results in order
+def parallelMapInOrder(func, itemsList, numWorkers, launchOrder=None):
+  for (itemIdx, result) in parallelMap(func, itemsList, numWorkers,
+    launchOrder=launchOrder) \
+    :
+    yield result
+
+
+# Run a git command in the given repo dir (using cwd and not os.chdir()) and
+# return (output, rtnCode) with stderr merged into the buffered output
+def getRepoCmndOutput(options, egCmndArray, repoDirPath):
+  if options.noOpt:
+    return (str(egCmndArray)+"\n", 0)
+  try:
+    child = subprocess.Popen(egCmndArray, cwd=repoDirPath,
+      stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = child.communicate()[0]
+  except OSError as e:
+    return (str(e)+"\n", 1)
+  return (s(output), child.returncode)
+
+
+# Get the '*** [Base ]Git Repo: <repoName>' header printed for each repo
+def getRepoHeaderStr(options, repo, repoName):
+  return "*** " + ("Base " if repo=="." else "") + "Git Repo: " \
+    + addColorToRepoDir(options.useColor, repoName)
+
+
+# Run the git command in a set of repos in parallel and print the output for
+# each repo in order.  The input repoDataList is a list of (repo, repoName,
+# repoStats).  If repoCmndTimingHistory != None, then the git command is
+# started first in the repos where it took the longest before.  If
+# repoDepsDict != None, then the repos are run in the topological levels of
+# their dependencies (one level at a time).  Returns (failedRepoNames,
+# repoCmndTimingsList) where failedRepoNames includes the skipped repos and
+# repoCmndTimingsList is the list of (repo, repoName, wallTimeSec, rtnCode)
+# in the order that the output was printed.
+def runRepoCmndsInParallel(options, cmndLineArgsArray, repoDataList, baseDir, \
+  repoVersionDict, repoVersionDict2, defaultBranchDict, \
+  repoCmndTimingHistory=None, repoDepsDict=None \
+  ):
 
+  def runOneRepoCmnd(repoData):
+    repo = repoData[0]
+    egCmndArray = getRepoCmndArray(options, cmndLineArgsArray, repo, \
+      repoVersionDict, repoVersionDict2, defaultBranchDict)
+    startTime = time.time()
+    (output, rtnCode) = getRepoCmndOutput(options, egCmndArray,
+      os.path.join(baseDir, repo))
+    return (repoData, egCmndArray, output, rtnCode, time.time() - startTime)
+
+  if repoDepsDict:
+    repoLevelsList = getRepoDependencyLevels(
+      [ repoData[0] for repoData in repoDataList ], repoDepsDict)
+  else:
+    repoLevelsList = [ list(range(len(repoDataList))) ]
+
+  failedRepoNames = []
+  failedReposSet = set()
+  repoCmndTimingsList = []
+  for repoLevel in repoLevelsList:
+
+    # Skip the repos that depend on repos where the git command failed
+    levelRepoDataList = []
+    skippedRepoDepsDict = {}
+    for repoIdx in repoLevel:
+      repo = repoDataList[repoIdx][0]
+      failedRepoDeps = getFailedRepoDeps(repo, repoDepsDict, failedReposSet)
+      if failedRepoDeps:
+        skippedRepoDepsDict[repo] = failedRepoDeps
+        failedReposSet.add(repo)
+      else:
+        levelRepoDataList.append(repoDataList[repoIdx])
 
-# Get the tracking branch for a repo
-def getLocalBranch(options, getCmndOutputFunc):
+    if repoCmndTimingHistory:
+      launchOrder = repoCmndTimingHistory.getLongestFirstOrder(
+        [ os.path.join(baseDir, repoData[0]) for repoData in levelRepoDataList ],
+        getRepoCmndTimingName(cmndLineArgsArray) )
+    else:
+      launchOrder = None
+
+    levelResultsIter = parallelMapInOrder(runOneRepoCmnd, levelRepoDataList,
+      getNumParallelRepoCmnds(options), launchOrder)
+    for repoIdx in repoLevel:
+      (repo, repoName, repoStats) = repoDataList[repoIdx]
+      print("")
+      print(getRepoHeaderStr(options, repo, repoName))
+      if repo in skippedRepoDepsDict:
+        print(getSkippedRepoMsg(skippedRepoDepsDict[repo]))
+        print("")
+        sys.stdout.flush()
+        failedRepoNames.append(repoName)
+        continue
+      (repoData, egCmndArray, output, rtnCode, wallTimeSec) = \
+        next(levelResultsIter)
+      if options.debug:
+        print("*** Tracking branch for git repo '" + repoName + "' = '" +
+              getRepoTrackingBranch(options, repoStats, os.path.join(baseDir, repo))
+              + "'")
+        print("*** Running command: %s" % egCmndArray)
+      sys.stdout.write(output)
+      print("")
+      sys.stdout.flush()
+      if rtnCode != 0:
+        failedRepoNames.append(repoName)
+        failedReposSet.add(repo)
+      repoCmndTimingsList.append((repo, repoName, wallTimeSec, rtnCode))
+
+  return (failedRepoNames, repoCmndTimingsList)
+
+
+#
+# Clone the repos listed in .gitdist (i.e. dist-clone)
+#
+
+
+# Default number of repos to clone at the same time
+defaultNumParallelRepoClones = 4
+
+
+def getNumParallelRepoClones(options):
+  if options.parallel:
+    return options.parallel
+  return defaultNumParallelRepoClones
+
+
+# Get the default machine-wide directory for the mirrors of the remote repos
+def getDefaultCloneCacheDir():
+  cloneCacheDir = os.environ.get("GITDIST_CLONE_CACHE_DIR", "")
+  if cloneCacheDir:
+    return cloneCacheDir
+  cacheHomeDir = os.environ.get("XDG_CACHE_HOME", "")
+  if not cacheHomeDir:
+    cacheHomeDir = os.path.join(os.path.expanduser("~"), ".cache")
+  return os.path.join(cacheHomeDir, "gitdist", "mirrors")
+
+
+# Get the url of a repo to clone (making a local path relative to the base
+# dir absolute so that it gets the same mirror from any base dir)
+def getRepoCloneUrl(repoUrl, baseDir):
+  if not "://" in repoUrl and os.path.isdir(os.path.join(baseDir, repoUrl)):
+    return os.path.abspath(os.path.join(baseDir, repoUrl))
+  return repoUrl
+
+
+# Get the path of the bare mirror of a remote repo in the clone cache dir
+def getRepoMirrorDir(cloneCacheDir, repoUrl):
+  urlName = os.path.basename(repoUrl.rstrip("/").split(":")[-1])
+  if urlName.endswith(".git"):
+    urlName = urlName[:-4]
+  urlName = re.sub("[^A-Za-z0-9._-]", "_", urlName)
+  return os.path.join(cloneCacheDir,
+    urlName + "-" + hashlib.md5(b(repoUrl)).hexdigest()[0:12] + ".git")
+
+
+# Create or update the bare mirror of a remote repo and return (output,
+# rtnCode)
+def updateRepoMirror(options, repoUrl, mirrorDir):
+  if os.path.isdir(mirrorDir):
+    return getRepoCmndOutput(options,
+      [options.useGit, "fetch", "--prune", "--quiet", "origin"], mirrorDir)
+  mirrorParentDir = os.path.dirname(mirrorDir)
+  if not os.path.isdir(mirrorParentDir) and not options.noOpt:
+    try:
+      os.makedirs(mirrorParentDir)
+    except OSError:
+      pass  # Created at the same time by another process?
+  # Clone to a tmp dir first so that other processes never see a partial
+  # mirror
+  tmpMirrorDir = mirrorDir + "." + str(os.getpid()) + ".tmp"
+  (output, rtnCode) = getRepoCmndOutput(options,
+    [options.useGit, "clone", "--mirror", "--quiet", repoUrl, tmpMirrorDir],
+    None)
+  if rtnCode != 0 or options.noOpt:
+    return (output, rtnCode)
+  # The clones borrow objects from the mirror so never prune them
+  (configOutput, rtnCode) = getRepoCmndOutput(options,
+    [options.useGit, "config", "gc.pruneExpire", "never"], tmpMirrorDir)
+  output += configOutput
+  try:
+    os.rename(tmpMirrorDir, mirrorDir)
+  except OSError:
+    shutil.rmtree(tmpMirrorDir, True)  # Another process created it first
+  return (output, rtnCode)
+
+
+# Get the 'git clone --filter=<filter-spec>' for the clone profile of a repo
+# (or None for a full clone)
+def getRepoCloneFilter(repoAttrs):
+  return gitdistCloneProfileFilters[repoAttrs.get("clone", "full")]
+
+
+# Get the list of the sparse checkout directories of a repo (or [] for a full
+# checkout)
+def getRepoSparseDirs(repoAttrs):
+  return [ sparseDir for sparseDir in repoAttrs.get("sparse", "").split(",") \
+    if sparseDir ]
+
+
+# Get the command to clone a repo (borrowing the objects from the mirror of
+# the remote repo if mirrorDir != None) for the clone profile of the repo and
+# checking out its default branch (if not 'master', which is the default when
+# no branch is given in .gitdist, so the remote HEAD is checked out then)
+def getRepoCloneCmndArray(options, repoUrl, repo, mirrorDir, repoAttrs=None,
+  defaultBranch="master" \
+  ):
+  if repoAttrs is None:
+    repoAttrs = {}
+  cloneCmndArray = [ options.useGit, "clone" ]
+  if defaultBranch != "master":
+    cloneCmndArray.extend([ "--branch", defaultBranch ])
+  if mirrorDir:
+    cloneCmndArray.extend([ "--reference", mirrorDir ])
+    if options.dissociate:
+      cloneCmndArray.append("--dissociate")
+  cloneFilter = getRepoCloneFilter(repoAttrs)
+  if cloneFilter:
+    cloneCmndArray.append("--filter=" + cloneFilter)
+  if getRepoSparseDirs(repoAttrs):
+    cloneCmndArray.append("--sparse")
+  cloneCmndArray.extend([ repoUrl, repo ])
+  return cloneCmndArray
+
+
+# Apply the clone profile of an existing repo that does not have it yet (or
+# the sparse checkout of a new repo cloned with '--sparse') and return
+# (output, rtnCode)
+def applyRepoCloneProfile(options, repoDir, repoAttrs):
+  output = ""
+  cloneFilter = getRepoCloneFilter(repoAttrs)
+  if cloneFilter:
+    (currentFilter, rtnCode) = getRepoCmndOutput(options,
+      [options.useGit, "config", "--get", "remote.origin.partialclonefilter"],
+      repoDir)
+    if currentFilter.strip() != cloneFilter:
+      for (configName, configValue) in (
+        ("remote.origin.promisor", "true"),
+        ("remote.origin.partialclonefilter", cloneFilter) ) \
+        :
+        (configOutput, rtnCode) = getRepoCmndOutput(options,
+          [options.useGit, "config", configName, configValue], repoDir)
+        output += configOutput
+        if rtnCode != 0:
+          return (output, rtnCode)
+  sparseDirs = getRepoSparseDirs(repoAttrs)
+  if sparseDirs:
+    (currentSparseDirs, rtnCode) = getRepoCmndOutput(options,
+      [options.useGit, "sparse-checkout", "list"], repoDir)
+    sparseCmndArgsList = []
+    if rtnCode != 0:
+      sparseCmndArgsList.append(["init", "--cone"])  # Not a sparse checkout yet
+    if rtnCode != 0 or currentSparseDirs.split() != sparseDirs:
+      sparseCmndArgsList.append(["set"] + sparseDirs)
+    for sparseCmndArgs in sparseCmndArgsList:
+      (sparseOutput, rtnCode) = getRepoCmndOutput(options,
+        [options.useGit, "sparse-checkout"] + sparseCmndArgs, repoDir)
+      output += sparseOutput
+      if rtnCode != 0:
+        return (output, rtnCode)
+  return (output, 0)
+
+
+# Get the dict { <repo> : <list of listed repos containing it> } so that
+# nested repos are cloned after the repos that contain them
+def getRepoNestingDepsDict(reposList):
+  repoNestingDepsDict = {}
+  for repo in reposList:
+    repoNestingDepsDict[repo] = [ otherRepo for otherRepo in reposList \
+      if otherRepo != "." and repo.startswith(otherRepo.rstrip("/") + "/") ]
+  return repoNestingDepsDict
+
+
+# Clone the repos in reposList that do not exist yet (concurrently, nested
+# repos after the repos that contain them) and return the list of the repos
+# that could not be cloned
+def cloneRepos(options, reposList, defaultBranchDict, repoAttrsDict, baseDir):
+
+  reposToCloneList = []
+  failedReposList = []
+  for repo in reposList:
+    repoAttrs = repoAttrsDict.get(repo, {})
+    if os.path.exists(os.path.join(baseDir, repo)):
+      print("*** Not cloning existing repo '" + repo + "'")
+      if getRepoCloneFilter(repoAttrs) or getRepoSparseDirs(repoAttrs):
+        (output, rtnCode) = applyRepoCloneProfile(options,
+          os.path.join(baseDir, repo), repoAttrs)
+        sys.stdout.write(output)
+        if rtnCode != 0:
+          print(addColorToErrorMsg(options.useColor, "*** Error, failed to"
+            + " apply the clone profile to the repo '" + repo + "'!"))
+          failedReposList.append(repo)
+    elif not repoAttrsDict.get(repo, {}).get("url", ""):
+      print(addColorToErrorMsg(options.useColor, "*** Error, can't clone repo"
+        + " '" + repo + "' since it does not have a 'url=<remote-url>' in"
+        + " .gitdist!"))
+      failedReposList.append(repo)
+    else:
+      reposToCloneList.append(repo)
+  sys.stdout.flush()
+
+  if options.useCache and options.cloneCacheDir:
+    cloneCacheDir = os.path.abspath(os.path.expanduser(options.cloneCacheDir))
+  else:
+    cloneCacheDir = None
+  mirrorLocksDict = {}  # Only one thread updates each mirror at a time
+
+  def cloneOneRepo(repo):
+    repoAttrs = repoAttrsDict[repo]
+    repoUrl = getRepoCloneUrl(repoAttrs["url"], baseDir)
+    output = ""
+    mirrorDir = None
+    if cloneCacheDir and not getRepoCloneFilter(repoAttrs):
+      mirrorDir = getRepoMirrorDir(cloneCacheDir, repoUrl)
+      mirrorLock = mirrorLocksDict.setdefault(mirrorDir, threading.Lock())
+      mirrorLock.acquire()
+      try:
+        (mirrorOutput, mirrorRtnCode) = updateRepoMirror(options, repoUrl,
+          mirrorDir)
+      finally:
+        mirrorLock.release()
+      output += mirrorOutput
+      if mirrorRtnCode != 0:
+        output += "*** Warning, failed to update the mirror '" + mirrorDir \
+          + "' so cloning without it!\n"
+      if not os.path.isdir(mirrorDir) and not options.noOpt:
+        mirrorDir = None
+    cloneCmndArray = getRepoCloneCmndArray(options, repoUrl, repo, mirrorDir,
+      repoAttrs, defaultBranchDict.get(repo, "master"))
+    (cloneOutput, rtnCode) = getRepoCmndOutput(options, cloneCmndArray, baseDir)
+    output += cloneOutput
+    if rtnCode == 0 and getRepoSparseDirs(repoAttrs):
+      (profileOutput, rtnCode) = applyRepoCloneProfile(options,
+        os.path.join(baseDir, repo), repoAttrs)
+      output += profileOutput
+    return (cloneCmndArray, output, rtnCode)
+
+  repoNestingDepsDict = getRepoNestingDepsDict(reposList)
+  for repoLevel in getRepoDependencyLevels(reposToCloneList, repoNestingDepsDict):
+    levelReposList = []
+    for repoIdx in repoLevel:
+      repo = reposToCloneList[repoIdx]
+      if getFailedRepoDeps(repo, repoNestingDepsDict, set(failedReposList)):
+        print("*** Not cloning repo '" + repo + "' since the repo containing"
+          + " it could not be cloned")
+        failedReposList.append(repo)
+      else:
+        levelReposList.append(repo)
+    for (repoIdx, (cloneCmndArray, output, rtnCode)) in \
+      parallelMap(cloneOneRepo, levelReposList,
+        getNumParallelRepoClones(options)) \
+      :
+      repo = levelReposList[repoIdx]
+      print("")
+      print("*** Cloning repo: " + addColorToRepoDir(options.useColor, repo))
+      if options.debug:
+        print("*** Running command: %s" % cloneCmndArray)
+      sys.stdout.write(output)
+      sys.stdout.flush()
+      if rtnCode != 0:
+        failedReposList.append(repo)
+
+  return failedReposList
+
+
+#
+# Maintenance of the repos (i.e. dist-maintenance)
+#
+
+
+# The git commands run by dist-maintenance in each repo (in order)
+repoMaintenanceStepsArgs = [
+  [ "config", "core.untrackedCache", "true" ],
+  [ "update-index", "--untracked-cache" ],
+  [ "repack", "-d", "-q" ],
+  [ "multi-pack-index", "write" ],
+  [ "commit-graph", "write", "--reachable", "--changed-paths" ],
+  ]
+
+# The git commands that are timed before and after dist-maintenance (the
+# history walk is bounded so that it is cheap in repos with a long history)
+repoMaintenanceRefCmndsArgs = [
+  ("status", [ "status", "--porcelain" ]),
+  ("rev-list", [ "rev-list", "--count", "--max-count=10000", "HEAD" ]),
+  ]
+
+# Default number of repos to run dist-maintenance in at the same time
+defaultNumParallelRepoMaintenance = 4
+
+
+def getNumParallelRepoMaintenance(options):
+  if options.parallel:
+    return options.parallel
+  return defaultNumParallelRepoMaintenance
+
+
+# Run a command in a repo with the output thrown away and return its wall time
+# in seconds (or 0.0 with --dist-no-opt)
+def getRepoCmndTimeSec(options, egCmndArray, repoDirPath):
+  if options.noOpt:
+    return 0.0
+  devNull = open(os.devnull, 'w')
+  try:
+    startTime = time.time()
+    subprocess.call(egCmndArray, cwd=repoDirPath, stdout=devNull,
+      stderr=devNull)
+    return time.time() - startTime
+  finally:
+    devNull.close()
+
+
+# Get the dict { <refCmndName> : <timeSec> } of the times of the reference git
+# commands in a repo (running each once first so that the file system cache
+# is the same before and after the maintenance)
+def getRepoMaintenanceRefTimes(options, repoDirPath):
+  refCmndTimesDict = {}
+  for (refCmndName, refCmndArgs) in repoMaintenanceRefCmndsArgs:
+    refCmndArray = [ options.useGit ] + refCmndArgs
+    getRepoCmndTimeSec(options, refCmndArray, repoDirPath)
+    refCmndTimesDict[refCmndName] = \
+      getRepoCmndTimeSec(options, refCmndArray, repoDirPath)
+  return refCmndTimesDict
+
+
+# Run the maintenance steps in a repo and return (output, failedStepsList,
+# refCmndTimesBeforeDict, refCmndTimesAfterDict)
+def runRepoMaintenance(options, repoDirPath):
+  refCmndTimesBeforeDict = getRepoMaintenanceRefTimes(options, repoDirPath)
+  output = ""
+  failedStepsList = []
+  for stepArgs in repoMaintenanceStepsArgs:
+    stepCmndArray = [ options.useGit ] + stepArgs
+    (stepOutput, rtnCode) = getRepoCmndOutput(options, stepCmndArray,
+      repoDirPath)
+    output += stepOutput
+    if rtnCode != 0:
+      failedStepsList.append("git " + " ".join(stepArgs))
+  refCmndTimesAfterDict = getRepoMaintenanceRefTimes(options, repoDirPath)
+  return (output, failedStepsList, refCmndTimesBeforeDict,
+    refCmndTimesAfterDict)
+
+
+class RepoMaintenanceTable:
+
+  def __init__(self):
+    self.tableData = [ { "label" : "Repo Dir", "align" : "L", "fields" : [] } ]
+    for (refCmndName, refCmndArgs) in repoMaintenanceRefCmndsArgs:
+      for beforeAfter in ("Before", "After"):
+        self.tableData.append(
+          { "label" : refCmndName + " " + beforeAfter + " (sec)",
+            "align" : "R", "fields" : [] } )
+
+  def insertRepoMaintenance(self, repoDir, refCmndTimesBeforeDict,
+    refCmndTimesAfterDict \
+    ):
+    self.tableData[0]["fields"].append(repoDir)
+    fieldIdx = 1
+    for (refCmndName, refCmndArgs) in repoMaintenanceRefCmndsArgs:
+      for refCmndTimesDict in (refCmndTimesBeforeDict, refCmndTimesAfterDict):
+        self.tableData[fieldIdx]["fields"].append(
+          "%.3f" % refCmndTimesDict[refCmndName])
+        fieldIdx += 1
+
+  def getTableData(self):
+    return self.tableData
+
+
+# Run dist-maintenance in all of the repos (several at a time) printing the
+# output for each repo in order and then the table of the times.  Returns the
+# list of the repos where a step failed.
+def runReposMaintenance(options, reposList, baseDir, baseRepoName):
+  def runOneRepoMaintenance(repo):
+    return runRepoMaintenance(options, os.path.join(baseDir, repo))
+  repoMaintenanceTable = RepoMaintenanceTable()
+  failedRepoNames = []
+  for (repoIdx, (output, failedStepsList, refCmndTimesBeforeDict,
+      refCmndTimesAfterDict)) in \
+    parallelMap(runOneRepoMaintenance, reposList,
+      getNumParallelRepoMaintenance(options)) \
+    :
+    repo = reposList[repoIdx]
+    repoName = getRepoName(repo, baseRepoName)
+    print("")
+    print(getRepoHeaderStr(options, repo, repoName))
+    sys.stdout.write(output)
+    for failedStep in failedStepsList:
+      print(addColorToErrorMsg(options.useColor,
+        "*** Error, '" + failedStep + "' failed!"))
+    sys.stdout.flush()
+    if failedStepsList:
+      failedRepoNames.append(repoName)
+    repoMaintenanceTable.insertRepoMaintenance(repoName,
+      refCmndTimesBeforeDict, refCmndTimesAfterDict)
+  print("")
+  print("Wall time of the reference git commands before and after the"
+    + " maintenance:\n")
+  print(createAsciiTable(repoMaintenanceTable.getTableData()))
+  sys.stdout.flush()
+  return failedRepoNames
+
+
+#
+# Searching the repos (i.e. dist-grep)
+#
+
+
+# Write a string (or bytes as is) to stdout and return False if the reader of
+# stdout went away (e.g. 'gitdist dist-grep ... | head') after which the rest
+# of the output (including at exit) is thrown away
+def writeToStdout(outStr):
+  try:
+    if sys.version_info >= (3,) and isinstance(outStr, bytes):
+      sys.stdout.flush()
+      sys.stdout.buffer.write(outStr)
+      sys.stdout.buffer.flush()
+    else:
+      sys.stdout.write(outStr)
+      sys.stdout.flush()
+  except IOError as e:
+    if e.errno != errno.EPIPE:
+      raise
+    devNull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devNull, sys.stdout.fileno())
+    os.close(devNull)
+    return False
+  return True
+
+
+# Short and long 'git grep' options that take the next arg as their value
+grepShortArgsWithValue = "efABCm"
+grepLongArgsWithValue = [ "--max-depth", "--context", "--after-context",
+  "--before-context", "--max-count", "--threads" ]
+
+
+# Get the error message for the 'git grep' args that print lines that do not
+# start with a path (which dist-grep adds the repo dir to) or "" if there are
+# none
+def getUnsupportedGrepArgsMsg(grepArgsArray):
+  unsupportedArgsList = []
+  nullSepArgsList = []
+  fileListArgsList = []
+  argIdx = 0
+  while argIdx < len(grepArgsArray):
+    grepArg = grepArgsArray[argIdx]
+    argIdx += 1
+    if grepArg == "--":
+      break
+    elif grepArg.startswith("--"):
+      if grepArg in grepLongArgsWithValue:
+        argIdx += 1
+      elif grepArg in ("--no-filename", "--heading") or \
+        grepArg.startswith("--open-files-in-pager") \
+        :
+        unsupportedArgsList.append(grepArg)
+      elif grepArg == "--null":
+        nullSepArgsList.append(grepArg)
+      elif grepArg in ("--files-with-matches", "--name-only",
+        "--files-without-match") \
+        :
+        fileListArgsList.append(grepArg)
+    elif grepArg.startswith("-") and len(grepArg) > 1:
+      # One or more short options (e.g. '-il' or '-A3')
+      for char_i in range(1, len(grepArg)):
+        shortArgChar = grepArg[char_i]
+        if shortArgChar in grepShortArgsWithValue:
+          if char_i == len(grepArg) - 1:
+            argIdx += 1
+          break
+        elif shortArgChar in "hO":
+          unsupportedArgsList.append("-" + shortArgChar)
+          if shortArgChar == "O":
+            break  # The rest is the pager
+        elif shortArgChar == "z":
+          nullSepArgsList.append("-z")
+        elif shortArgChar in "lL":
+          fileListArgsList.append("-" + shortArgChar)
+  if nullSepArgsList and fileListArgsList:
+    # The paths are separated by null chars instead of newlines
+    unsupportedArgsList.append(nullSepArgsList[0] + " with "
+      + fileListArgsList[0])
+  if unsupportedArgsList:
+    return "Error, the 'git grep' args " + str(unsupportedArgsList) \
+      + " are not supported by dist-grep since the lines would not start" \
+      + " with the path!"
+  return ""
+
+
+# Get the line of 'git grep' output from a repo with the repo dir added to the
+# path at the front (or in 'Binary file <path> matches').  The line and
+# linePrefix are bytes since the files may have any encoding.
+def addRepoDirToGrepLine(line, linePrefix):
+  binaryFilePrefix = b("Binary file ")
+  binaryFileSuffix = b(" matches\n")
+  if line.startswith(binaryFilePrefix) and line.endswith(binaryFileSuffix):
+    return binaryFilePrefix + linePrefix + line[len(binaryFilePrefix):]
+  return linePrefix + line
+
+
+# Run 'git grep <grepArgsArray>' in all of the repos (several at a time) and
+# print each line (as the raw bytes) as soon as it is read with the repo dir
+# added to the front (so that the paths are relative to the base dir).  If maxCount > 0, then
+# stop after printing maxCount lines in total and kill the 'git grep'
+# processes that are still running.  Returns 0 if any lines matched, 1 if no
+# lines matched and 2 if 'git grep' failed in any repo.
+def runReposGrep(options, grepArgsArray, reposList, baseDir, maxCount=0):
+  outputLock = threading.Lock()
+  numLinesPrinted = [0]
+  stopGrep = [False]
+  runningChildsList = []
+
+  def stopAllGreps():
+    stopGrep[0] = True
+    for runningChild in runningChildsList:
+      try:
+        runningChild.kill()
+      except OSError:
+        None  # Already done
+
+  def grepOneRepo(repo):
+    outputLock.acquire()
+    try:
+      if stopGrep[0]:
+        return None
+      child = subprocess.Popen([ options.useGit, "grep" ] + grepArgsArray,
+        cwd=os.path.join(baseDir, repo), stdout=subprocess.PIPE)
+      runningChildsList.append(child)
+    finally:
+      outputLock.release()
+    if repo == ".":
+      linePrefix = b("")
+    else:
+      linePrefix = fsEncodePath(repo + "/")
+    for line in iter(child.stdout.readline, b("")):
+      outputLock.acquire()
+      try:
+        if stopGrep[0]:
+          break
+        if line.rstrip(b("\n")) in (b(""), b("--")):
+          # Separator between files (see --break) or between the context
+          # lines of different matches
+          if not writeToStdout(line):
+            stopAllGreps()
+          continue
+        if not writeToStdout(addRepoDirToGrepLine(line, linePrefix)):
+          stopAllGreps()
+          break
+        numLinesPrinted[0] += 1
+        if maxCount and numLinesPrinted[0] >= maxCount:
+          stopAllGreps()
+      finally:
+        outputLock.release()
+    child.stdout.close()
+    child.wait()
+    outputLock.acquire()
+    try:
+      runningChildsList.remove(child)
+      if stopGrep[0]:
+        return None  # May have been killed
+    finally:
+      outputLock.release()
+    return child.returncode
+
+  failedGrep = False
+  for (repoIdx, rtnCode) in parallelMap(grepOneRepo, reposList,
+    getNumParallelRepoStats(options), inOrder=False) \
+    :
+    if rtnCode is not None and rtnCode > 1:
+      failedGrep = True
+  if failedGrep:
+    return 2
+  if numLinesPrinted[0] > 0:
+    return 0
+  return 1
+
+
+#
+# Merged log of the repos (i.e. dist-log)
+#
+
+
+# Yield the records separated by null chars (e.g. from 'git log -z') read
+# from the file object a chunk at a time (i.e. without reading all of it)
+def readNullSepRecords(fileObj, chunkSize=65536):
+  pendingBytes = b("")
+  while True:
+    chunkBytes = os.read(fileObj.fileno(), chunkSize)
+    if not chunkBytes:
+      break
+    recordsBytesList = (pendingBytes + chunkBytes).split(b("\0"))
+    pendingBytes = recordsBytesList.pop()
+    for recordBytes in recordsBytesList:
+      yield s(recordBytes)
+  if pendingBytes:
+    yield s(pendingBytes)
+
+
+# The one-line named 'git log' formats (i.e. --pretty=<name>) as --format
+# strings that dist-log can use (the other named formats print several lines
+# per commit)
+repoLogNamedFormatsDict = {
+  "oneline" : "%H %s",
+  "reference" : "%h (%s, %as)",
+  }
+
+
+# Get the --format string for the value of --pretty=<value> or
+# --format=<value>
+def getRepoLogFormatFromValue(logArg, formatValue):
+  for formatPrefix in ("format:", "tformat:"):
+    if formatValue.startswith(formatPrefix):
+      return formatValue[len(formatPrefix):]
+  if formatValue in repoLogNamedFormatsDict:
+    return repoLogNamedFormatsDict[formatValue]
+  if "%" in formatValue:
+    return formatValue  # Same as tformat:<format>
+  raise Exception("Error, the 'git log' arg '" + logArg + "' is not supported"
+    + " by dist-log!  Use --format=<format> with a one-line format or one of"
+    + " " + str(sorted(repoLogNamedFormatsDict.keys())) + ".")
+
+
+# Split the 'git log' args into (logFormat, otherLogArgsArray) where
+# logFormat is from --format=<format>, --pretty=<format> or --oneline (or
+# defaultRepoLogFormat) since dist-log passes in its own --format.  Throws
+# for the named formats that print several lines per commit.
+def getRepoLogFormatAndArgs(logArgsArray):
+  logFormat = defaultRepoLogFormat
+  otherLogArgsArray = []
+  for arg_i in range(len(logArgsArray)):
+    logArg = logArgsArray[arg_i]
+    if logArg == "--":
+      otherLogArgsArray.extend(logArgsArray[arg_i:])  # Paths
+      break
+    elif logArg == "--oneline":
+      logFormat = "%h %s"
+    elif logArg.startswith("--format=") or logArg.startswith("--pretty="):
+      logFormat = getRepoLogFormatFromValue(logArg, logArg.split("=", 1)[1])
+    elif logArg == "--pretty":
+      logFormat = getRepoLogFormatFromValue(logArg, "medium")
+    else:
+      otherLogArgsArray.append(logArg)
+  return (logFormat, otherLogArgsArray)
+
+
+# Run 'git log' in all of the repos at the same time and print the commits
+# merged by commit date (newest first) with '[<repoName>] ' in front of each
+# commit.  The commits are merged with a heap holding the next commit of each
+# repo, so each commit is only read from its 'git log' process when the
+# commit before it from the same repo is printed.  If maxCount > 0, then stop
+# after printing maxCount commits.  Returns the list of the repos where 'git
+# log' failed.
+def runReposLog(options, logArgsArray, reposList, baseDir, baseRepoName,
+  maxCount=0 \
+  ):
+  (logFormat, otherLogArgsArray) = getRepoLogFormatAndArgs(logArgsArray)
+  egCmndArray = [ options.useGit, "log", "-z", "--format=%ct%x01"+logFormat ] \
+    + otherLogArgsArray
+  childsList = []
+  commitsIterList = []
+  for repo in reposList:
+    child = subprocess.Popen(egCmndArray, cwd=os.path.join(baseDir, repo),
+      stdout=subprocess.PIPE)
+    childsList.append(child)
+    commitsIterList.append(readNullSepRecords(child.stdout))
+  commitsHeap = []
+  badRecordsDict = {}  # { <repoIdx> : <first record that is not a commit> }
+  def pushNextCommit(repoIdx):
+    for commitRecord in commitsIterList[repoIdx]:
+      (commitTimeStr, sep, commitStr) = commitRecord.lstrip("\n").partition(
+        "\x01")
+      try:
+        commitTime = int(commitTimeStr)
+      except ValueError:
+        # Don't read the rest of the commits from this repo
+        badRecordsDict[repoIdx] = commitRecord
+        return
+      heapq.heappush(commitsHeap, (-commitTime, repoIdx, commitStr))
+      return
+  for repoIdx in range(len(reposList)):
+    pushNextCommit(repoIdx)
+  numCommitsPrinted = 0
+  stoppedEarly = False
+  while commitsHeap:
+    (negCommitTime, repoIdx, commitStr) = heapq.heappop(commitsHeap)
+    repoName = getRepoName(reposList[repoIdx], baseRepoName)
+    if not writeToStdout("[" + repoName + "] " + commitStr + "\n"):
+      stoppedEarly = True
+      break
+    numCommitsPrinted += 1
+    if maxCount and numCommitsPrinted >= maxCount:
+      stoppedEarly = True
+      break
+    pushNextCommit(repoIdx)
+  failedRepoNames = []
+  for repoIdx in range(len(reposList)):
+    child = childsList[repoIdx]
+    repoName = getRepoName(reposList[repoIdx], baseRepoName)
+    if (stoppedEarly or repoIdx in badRecordsDict) and child.poll() is None:
+      # Don't read the rest of the commits from this repo
+      try:
+        child.kill()
+      except OSError:
+        None  # Already done
+      child.stdout.close()
+      child.wait()
+    else:
+      child.stdout.close()
+      child.wait()
+      if child.returncode != 0:
+        failedRepoNames.append(repoName)
+        continue
+    if repoIdx in badRecordsDict:
+      sys.stderr.write(addColorToErrorMsg(options.useColor,
+        "Error, could not read the commit time from the 'git log' output '"
+        + badRecordsDict[repoIdx][:80].replace("\x01", " ")
+        + "' in the repo '" + repoName + "'!")
+        + "\n")
+      failedRepoNames.append(repoName)
+  return failedRepoNames
+
+
+#
+# Timing of the git command in each repo (i.e. --dist-timing)
+#
+
+
+# Get the name that the times of a git command are saved under in the timing
+# history (i.e. the git command name like 'fetch')
+def getRepoCmndTimingName(cmndLineArgsArray):
+  if cmndLineArgsArray:
+    return cmndLineArgsArray[0]
+  return ""
+
+
+# History of the wall times of the git commands in each repo that is saved in
+# the file 'gitdist-timing-history'
+class RepoCmndTimingHistory:
+
+  version = 1
+
+  # Number of past times kept for each repo and git command
+  maxNumTimes = 5
+
+  def __init__(self, historyFilePath):
+    self.historyFilePath = historyFilePath
+    self.reposDict = {}
+    self.isModified = False
+    historyDict = readJsonCacheFile(historyFilePath, self.version)
+    if historyDict and isinstance(historyDict.get("repos"), dict):
+      self.reposDict = historyDict["repos"]
+
+  # Get the expected wall time of the git command in the repo (i.e. the mean
+  # of the past times for the git command, or for any git command if that
+  # git command was not run before) or None if it was never run
+  def getExpectedTimeSec(self, repoDir, cmndName):
+    repoCmndsDict = self.reposDict.get(os.path.abspath(repoDir), None)
+    if not isinstance(repoCmndsDict, dict) or not repoCmndsDict:
+      return None
+    timesList = repoCmndsDict.get(cmndName, None)
+    if not timesList:
+      timesList = []
+      for cmndTimesList in repoCmndsDict.values():
+        timesList.extend(cmndTimesList)
+    if not timesList:
+      return None
+    return sum(timesList) / float(len(timesList))
+
+  # Get the order to start the git command in the repos (longest expected
+  # time first and the repos never run before first of all since their time
+  # is unknown)
+  def getLongestFirstOrder(self, repoDirsList, cmndName):
+    def getSortKey(repoIdx):
+      expectedTimeSec = self.getExpectedTimeSec(repoDirsList[repoIdx], cmndName)
+      if expectedTimeSec is None:
+        return (0, 0.0, repoIdx)
+      return (1, -expectedTimeSec, repoIdx)
+    return sorted(range(len(repoDirsList)), key=getSortKey)
+
+  def addTime(self, repoDir, cmndName, wallTimeSec):
+    repoCmndsDict = self.reposDict.setdefault(os.path.abspath(repoDir), {})
+    timesList = repoCmndsDict.get(cmndName, [])
+    timesList.append(round(wallTimeSec, 3))
+    repoCmndsDict[cmndName] = timesList[-self.maxNumTimes:]
+    self.isModified = True
+
+  def write(self):
+    if not self.isModified:
+      return
+    writeJsonCacheFile(self.historyFilePath,
+      { "version" : self.version, "repos" : self.reposDict })
+    self.isModified = False
+
+
+class RepoCmndTimingTable:
+
+  def __init__(self):
+    self.repoCmndTimingsList = []
+
+  def insertRepoCmndTiming(self, repoDir, wallTimeSec, rtnCode):
+    self.repoCmndTimingsList.append((repoDir, wallTimeSec, rtnCode))
+
+  def getTotalRepoTimeSec(self):
+    return sum([ timing[1] for timing in self.repoCmndTimingsList ])
+
+  # Get the table data with the slowest repos first
+  def getTableData(self):
+    tableData = [
+      { "label" : "Repo Dir", "align" : "L", "fields" : [] },
+      { "label" : "Wall Time (sec)", "align" : "R", "fields" : [] },
+      { "label" : "Exit Code", "align" : "R", "fields" : [] },
+      ]
+    for (repoDir, wallTimeSec, rtnCode) in \
+      sorted(self.repoCmndTimingsList, key=lambda timing: -timing[1]) \
+      :
+      tableData[0]["fields"].append(repoDir)
+      tableData[1]["fields"].append("%.2f" % wallTimeSec)
+      tableData[2]["fields"].append(str(rtnCode))
+    return tableData
+
+
+# Get the name of the base directory
+def getBaseDirNameFromPath(dirPath):
+  dirPathArray = dirPath.split("/")
+  return dirPathArray[-1]
+
+
+# Get the name of the base repo to insert into the table
+def getBaseRepoTblName(baseRepoName):
+  return baseRepoName+" (Base)"
+
+
+# Determine if the extra repo (relative to baseDir) should be processed or not
+def repoExistsAndNotExcluded(options, extraRepo, notReposList, baseDir="."):
+  if not os.path.isdir(os.path.join(baseDir, extraRepo)): return False
+  if extraRepo in notReposList: return False
+  return True
+
+
+#
+# Pure-Python reader for the branch and ref info in a git repo's files
+#
+# This reads HEAD, config, the loose refs and packed-refs directly so that
+# getting branch names does not need to run any git commands.  Any layout
+# that is not understood (e.g. config include files, the reftable backend,
+# unusual fetch refspecs) results in None being returned so that the caller
+# can fall back on running git.
+#
+
+
+# Read a small text file and return its stripped contents (or None)
+def readGitFileStr(filePath):
+  try:
+    fileHandle = open(filePath, 'r')
+    try:
+      return fileHandle.read().strip()
+    finally:
+      fileHandle.close()
+  except (IOError, OSError):
+    return None
+
+
+# Parse a git config file into a dict { (section, subsection, key) : [values] }
+# (section and key are lower case).  Returns None for unsupported features.
+def parseGitConfigFileStr(configFileStr):
+  configDict = {}
+  section = None
+  subsection = None
+  reSectionLine = re.compile(r'^\[\s*([A-Za-z0-9.-]+)\s*(?:"((?:[^"\\]|\\.)*)")?\s*\]$')
+  for line in configFileStr.splitlines():
+    line = line.strip()
+    if not line or line[0] in "#;":
+      continue
+    if line[0] == "[":
+      sectionMatch = reSectionLine.match(re.sub(r'\]\s*[#;].*$', ']', line))
+      if not sectionMatch:
+        return None
+      section = sectionMatch.group(1).lower()
+      subsection = sectionMatch.group(2)
+      if subsection is None and "." in section:
+        # Deprecated [section.subsection] syntax
+        (section, subsection) = section.split(".", 1)
+      elif subsection is not None:
+        subsection = re.sub(r'\\(.)', r'\1', subsection)
+      if section in ("include", "includeif"):
+        return None
+      continue
+    if section is None or line.endswith("\\"):
+      return None
+    keyValue = line.split("=", 1)
+    key = keyValue[0].strip().lower()
+    if len(keyValue) == 1:
+      value = "true"
+    else:
+      value = keyValue[1].strip()
+      if '"' in value or "\\" in value:
+        if not re.match(r'^"[^"\\]*"$', value):
+          return None
+        value = value[1:-1]
+      else:
+        value = re.split(r'\s*[#;]', value)[0]
+    configDict.setdefault((section, subsection, key), []).append(value)
+  return configDict
+
+
+# Abbreviate a full ref name like 'rev-parse --abbrev-ref' (or None)
+def abbreviateRefName(refName):
+  for refPrefix in ("refs/heads/", "refs/remotes/", "refs/tags/"):
+    if refName.startswith(refPrefix):
+      return refName[len(refPrefix):]
+  return None
+
+
+# Map a ref on a remote to the local remote-tracking ref using the remote's
+# fetch refspecs (or None)
+def mapRefThroughFetchRefspecs(remoteRefName, fetchRefspecs):
+  for refspec in fetchRefspecs:
+    if refspec.startswith("^"):
+      continue  # Negative refspec
+    refspec = refspec.lstrip("+")
+    if refspec.count(":") != 1:
+      continue
+    (src, dst) = refspec.split(":")
+    if src.endswith("/*") and dst.endswith("/*") and src.count("*") == 1 \
+      and dst.count("*") == 1 \
+      :
+      if remoteRefName.startswith(src[:-1]):
+        return dst[:-1] + remoteRefName[len(src)-1:]
+    elif "*" in src or "*" in dst:
+      return None
+    elif src == remoteRefName:
+      return dst
+  return None
+
+
+class GitRepoRefReader:
+
+  def __init__(self, repoDir):
+    self.repoDir = repoDir
+    self.gitDir = None
+    self.commonDir = None
+    self.packedRefsDict = None
+    self.configDict = None
+    dotGitPath = os.path.join(repoDir, ".git")
+    if os.path.isdir(dotGitPath):
+      gitDir = dotGitPath
+    elif os.path.isfile(dotGitPath):
+      # Worktree or submodule with a '.git' file 'gitdir: <path>'
+      dotGitFileStr = readGitFileStr(dotGitPath)
+      if not dotGitFileStr or not dotGitFileStr.startswith("gitdir:"):
+        return
+      gitDir = os.path.join(repoDir, dotGitFileStr[len("gitdir:"):].strip())
+    else:
+      return
+    commonDirStr = readGitFileStr(os.path.join(gitDir, "commondir"))
+    if commonDirStr:
+      commonDir = os.path.join(gitDir, commonDirStr)
+    else:
+      commonDir = gitDir
+    if os.path.exists(os.path.join(commonDir, "reftable")) or \
+      os.path.exists(os.path.join(gitDir, "config.worktree")) \
+      :
+      return  # Not supported
+    if not os.path.isfile(os.path.join(gitDir, "HEAD")):
+      return
+    self.gitDir = gitDir
+    self.commonDir = commonDir
+
+  def isSupported(self):
+    return self.gitDir is not None
+
+  # Return the symbolic ref or SHA1 in HEAD as ("ref", <refName>) or ("sha",
+  # <sha1>) (or None)
+  def getHead(self):
+    if not self.isSupported():
+      return None
+    headStr = readGitFileStr(os.path.join(self.gitDir, "HEAD"))
+    if not headStr:
+      return None
+    if headStr.startswith("ref:"):
+      return ("ref", headStr[len("ref:"):].strip())
+    return ("sha", headStr)
+
+  def getPackedRefsDict(self):
+    if self.packedRefsDict is None:
+      self.packedRefsDict = {}
+      packedRefsStr = readGitFileStr(os.path.join(self.commonDir, "packed-refs"))
+      if packedRefsStr:
+        for line in packedRefsStr.splitlines():
+          if not line or line[0] in "#^":
+            continue
+          lineArray = line.split()
+          if len(lineArray) == 2:
+            self.packedRefsDict[lineArray[1]] = lineArray[0]
+    return self.packedRefsDict
+
+  # Resolve a full ref name like 'refs/heads/master' to a SHA1 (or None if
+  # the ref does not exist)
+  def resolveRef(self, refName, maxDepth=5):
+    if not self.isSupported() or maxDepth == 0:
+      return None
+    refStr = readGitFileStr(os.path.join(self.commonDir, refName))
+    if refStr is None:
+      refStr = self.getPackedRefsDict().get(refName, None)
+    if refStr and refStr.startswith("ref:"):
+      return self.resolveRef(refStr[len("ref:"):].strip(), maxDepth-1)
+    return refStr
+
+  # Return the SHA1 that HEAD points to (or None)
+  def getHeadSha1(self):
+    head = self.getHead()
+    if not head:
+      return None
+    if head[0] == "ref":
+      return self.resolveRef(head[1])
+    return head[1]
+
+  def getConfigDict(self):
+    if self.configDict is None:
+      configFileStr = readGitFileStr(os.path.join(self.commonDir, "config"))
+      if configFileStr is None:
+        return None
+      self.configDict = parseGitConfigFileStr(configFileStr)
+    return self.configDict
+
+  # Get the local branch like 'rev-parse --abbrev-ref HEAD' (or None)
+  def getLocalBranch(self):
+    head = self.getHead()
+    if not head:
+      return None
+    if head[0] == "sha":
+      return "HEAD"  # Detached head
+    if not head[1].startswith("refs/heads/"):
+      return None
+    return head[1][len("refs/heads/"):]
+
+  # Get the tracking branch like 'rev-parse --abbrev-ref --symbolic-full-name
+  # @{u}' returning "" if there is no tracking branch (or None)
+  def getTrackingBranch(self):
+    localBranch = self.getLocalBranch()
+    if localBranch is None:
+      return None
+    if localBranch == "HEAD":
+      return ""
+    configDict = self.getConfigDict()
+    if configDict is None:
+      return None
+    remoteList = configDict.get(("branch", localBranch, "remote"), [])
+    mergeList = configDict.get(("branch", localBranch, "merge"), [])
+    if not remoteList or not mergeList:
+      return ""
+    (remote, mergeRef) = (remoteList[-1], mergeList[-1])
+    if len(mergeList) > 1 or not mergeRef.startswith("refs/"):
+      return None
+    if remote == ".":
+      trackingRef = mergeRef
+    else:
+      fetchRefspecs = configDict.get(("remote", remote, "fetch"), None)
+      if not fetchRefspecs:
+        return None
+      trackingRef = mapRefThroughFetchRefspecs(mergeRef, fetchRefspecs)
+      if not trackingRef:
+        return None
+    if not self.resolveRef(trackingRef):
+      return ""  # Tracking branch is configured but does not exist
+    return abbreviateRefName(trackingRef)
+
+
+#
+# Signature of the state of a repo's files for the repo status cache
+#
+
+
+# Get the lstat() signature of a path as the tuple (mtime, size, mode, inode)
+# (or None if the path does not exist)
+def getPathStatSig(pathName):
+  try:
+    pathStat = os.lstat(pathName)
+  except OSError:
+    return None
+  return (pathStat.st_mtime, pathStat.st_size, pathStat.st_mode,
+          pathStat.st_ino)
+
+
+# Get the newest mtime in a list of signatures from getPathStatSig()
+def getNewestStatSigMtime(statSigsList):
+  newestMtime = 0.0
+  for statSig in statSigsList:
+    if statSig and statSig[0] > newestMtime:
+      newestMtime = statSig[0]
+  return newestMtime
+
+
+# Get a cheap signature of the state of the repo in repoDir for the repo
+# status cache made of the lstat() of the index, config and info/exclude files
+# and of the top directory of the worktree, and of HEAD and the SHA1s of HEAD
+# and of the tracking branch.  Computing it takes the same time for any size of
+# repo.
+#
+# NOTE: Editing a tracked file in place, or adding or removing an untracked
+# file below the top directory of the worktree, does not change the signature
+# since git only updates the index when it runs.  Such changes are only seen
+# after the index, HEAD, a ref or the top directory change (or with
+# --dist-no-cache).
+#
+# Returns (signature, newestMtime), or None if the repo layout is not
+# supported.
+def getRepoStatusSignature(repoDir):
+  refReader = GitRepoRefReader(repoDir)
+  if not refReader.isSupported():
+    return None
+  trackingBranch = refReader.getTrackingBranch()
+  if trackingBranch is None:
+    return None
+  refsSigStr = str(refReader.getHead()) + " " + \
+    str(refReader.getHeadSha1()) + " " + trackingBranch
+  if trackingBranch:
+    refsSigStr += " " + \
+      str(refReader.resolveRef("refs/remotes/"+trackingBranch)) + " " + \
+      str(refReader.resolveRef("refs/heads/"+trackingBranch))
+  statSigsList = []
+  for pathName in [os.path.join(refReader.gitDir, "index"),
+                   os.path.join(refReader.commonDir, "config"),
+                   os.path.join(refReader.commonDir, "info", "exclude"),
+                   repoDir] \
+                   :
+    statSigsList.append(getPathStatSig(pathName))
+  signature = hashlib.md5(b(refsSigStr + "\n" + repr(statSigsList)))
+  return (signature.hexdigest(), getNewestStatSigMtime(statSigsList))
+
+
+#
+# Cache of the repo stats for dist-repo-status and --dist-mod-only
+#
+
+
+# Get the path of a gitdist cache file for the base dir (in the base repo's
+# git dir if it exists so that it does not show up as an untracked file)
+def getGitdistCacheFilePath(baseDir, cacheFileName):
+  baseRefReader = GitRepoRefReader(baseDir)
+  if baseRefReader.isSupported():
+    return os.path.join(baseRefReader.gitDir, cacheFileName)
+  return os.path.join(baseDir, "."+cacheFileName)
+
+
+# Get the path of the repo stats cache file for the base dir
+def getRepoStatsCacheFilePath(baseDir):
+  return getGitdistCacheFilePath(baseDir, "gitdist-cache")
+
+
+# Read a JSON cache file and return its dict (or None if it does not exist, is
+# corrupted, or has a different version)
+def readJsonCacheFile(cacheFilePath, version):
+  cacheFileStr = readGitFileStr(cacheFilePath)
+  if not cacheFileStr:
+    return None
+  try:
+    cacheDict = json.loads(cacheFileStr)
+  except ValueError:
+    return None
+  if not isinstance(cacheDict, dict) or cacheDict.get("version") != version:
+    return None
+  return cacheDict
+
+
+# Write a JSON cache file (atomically, ignoring errors like read-only dirs)
+def writeJsonCacheFile(cacheFilePath, cacheDict):
+  tmpCacheFilePath = cacheFilePath + "." + str(os.getpid()) + ".tmp"
+  try:
+    tmpFileHandle = open(tmpCacheFilePath, 'w')
+    try:
+      tmpFileHandle.write(json.dumps(cacheDict, sort_keys=True))
+    finally:
+      tmpFileHandle.close()
+    os.rename(tmpCacheFilePath, cacheFilePath)
+  except (IOError, OSError):
+    if os.path.exists(tmpCacheFilePath):
+      os.remove(tmpCacheFilePath)
+
+
+# Repo stats keyed on the repo status signature (only kept in memory if
+# cacheFilePath is None)
+class RepoStatsCache:
+
+  version = 2
+
+  def __init__(self, cacheFilePath):
+    self.cacheFilePath = cacheFilePath
+    self.reposDict = {}
+    self.isModified = False
+    if cacheFilePath:
+      cacheDict = readJsonCacheFile(cacheFilePath, self.version)
+    else:
+      cacheDict = None
+    if cacheDict and isinstance(cacheDict.get("repos"), dict):
+      self.reposDict = cacheDict["repos"]
+    # Else, no or corrupted cache file so just recompute everything
+
+  # Return the cached RepoStatsStruct if the signature matches (or None)
+  def getRepoStats(self, repoKey, signature):
+    repoEntry = self.reposDict.get(repoKey, None)
+    if repoEntry and repoEntry.get("signature") == signature:
+      try:
+        return repoStatsFromDict(repoEntry["stats"])
+      except (KeyError, TypeError):
+        return None
+    return None
+
+  def setRepoStats(self, repoKey, signature, repoStats):
+    self.reposDict[repoKey] = \
+      { "signature" : signature, "stats" : repoStats.toDict() }
+    self.isModified = True
+
+  # Write the cache file (atomically, ignoring errors like read-only dirs)
+  def write(self):
+    if not self.isModified or not self.cacheFilePath:
+      return
+    writeJsonCacheFile(self.cacheFilePath,
+      { "version" : self.version, "repos" : self.reposDict })
+    self.isModified = False
+
+
+# Get the repo stats for the repo in repoDir using the cache (if not None)
+def getRepoStatsUsingCache(options, repoDir, repoStatsCache,
+  statusProfile="default" \
+  ):
+  if not repoStatsCache:
+    return getRepoStats(options, repoDir=repoDir, statusProfile=statusProfile)
+  signatureStartTime = time.time()
+  signatureAndMtime = getRepoStatusSignature(repoDir)
+  if not signatureAndMtime:
+    return getRepoStats(options, repoDir=repoDir, statusProfile=statusProfile)
+  (signature, newestMtime) = signatureAndMtime
+  signature += "-" + statusProfile  # Different stats for different profiles
+  repoKey = os.path.abspath(repoDir)
+  repoStats = repoStatsCache.getRepoStats(repoKey, signature)
+  if repoStats:
+    return repoStats
+  repoStats = getRepoStats(options, repoDir=repoDir,
+    statusProfile=statusProfile)
+  if newestMtime < signatureStartTime - 1.0:
+    repoStatsCache.setRepoStats(repoKey, signature, repoStats)
+  # Else, a file changed too recently to be sure that a later change within
+  # the file system timestamp resolution would change the signature.
+  return repoStats
+
+
+#
+# Daemon that keeps the repo stats up to date (i.e. dist-daemon)
+#
+
+
+# Time between checks of the repos that are not watched with inotify (sec)
+daemonPollIntervalSec = 2.0
+
+# Time without any file changes before the daemon updates the changed repos
+daemonQuietTimeSec = 0.2
+
+# Max number of inotify watches for all of the repos of the daemon (the repos
+# that don't fit are polled instead)
+daemonMaxNumInotifyWatches = 8192
+
+
+# Get the path of the socket of the repo stats daemon for the base dir
+def getRepoStatsDaemonSocketPath(baseDir):
+  return getGitdistCacheFilePath(baseDir, "gitdist-daemon.sock")
+
+
+# Read a line (without the newline) from a socket
+def readSocketLine(sock):
+  data = b("")
+  while b("\n") not in data:
+    dataChunk = sock.recv(65536)
+    if not dataChunk:
+      break
+    data += dataChunk
+  return s(data.split(b("\n"))[0])
+
+
+# Ask the repo stats daemon for the stats of the repos in repoDirsList
+# (absolute paths) and return the dict { <repoDir> : <RepoStatsStruct> } for
+# the repos that the daemon knows about with the status profile in
+# statusProfilesDict ('default' if not listed) (or {} if the daemon is not
+# running)
+def queryRepoStatsDaemon(socketPath, repoDirsList, statusProfilesDict=None,
+  timeoutSec=30.0 \
+  ):
+  if statusProfilesDict is None:
+    statusProfilesDict = {}
+  if not os.path.exists(socketPath):
+    return {}
+  daemonSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    try:
+      daemonSocket.settimeout(timeoutSec)
+      daemonSocket.connect(socketPath)
+      daemonSocket.sendall(b(json.dumps({ "repos" : repoDirsList }) + "\n"))
+      replyDict = json.loads(readSocketLine(daemonSocket))
+      reposStatsDicts = replyDict["repos"]
+      daemonStatusProfilesDict = replyDict.get("statusProfiles", {})
+      repoStatsDict = {}
+      for repoDir in repoDirsList:
+        repoStatsDictEntry = reposStatsDicts.get(repoDir, None)
+        if repoStatsDictEntry and \
+          daemonStatusProfilesDict.get(repoDir, "default") == \
+            statusProfilesDict.get(repoDir, "default") \
+          :
+          repoStatsDict[repoDir] = repoStatsFromDict(repoStatsDictEntry)
+      return repoStatsDict
+    except (socket.error, ValueError, KeyError, TypeError, AttributeError):
+      return {}  # Daemon is not running or is broken so just ignore it
+  finally:
+    daemonSocket.close()
+
+
+# Get the list of the files outside of the repo for refReader that can change
+# which files 'git status' reports as untracked (i.e. the global git config
+# files and the global excludes file)
+def getGlobalGitExcludesFiles(refReader):
+  homeDir = os.path.expanduser("~")
+  xdgConfigHome = os.environ.get("XDG_CONFIG_HOME", "")
+  if not xdgConfigHome:
+    xdgConfigHome = os.path.join(homeDir, ".config")
+  globalConfigFile = os.environ.get("GIT_CONFIG_GLOBAL", "")
+  if not globalConfigFile:
+    globalConfigFile = os.path.join(homeDir, ".gitconfig")
+  # Git reads the XDG config file first so ~/.gitconfig wins
+  configFilesList = [os.path.join(xdgConfigHome, "git", "config"),
+    globalConfigFile]
+  excludesFile = os.path.join(xdgConfigHome, "git", "ignore")
+  configDictsList = []
+  for configFile in configFilesList:
+    configFileStr = readGitFileStr(configFile)
+    if configFileStr:
+      configDictsList.append(parseGitConfigFileStr(configFileStr))
+  configDictsList.append(refReader.getConfigDict())
+  for configDict in configDictsList:
+    if configDict:
+      excludesFileList = configDict.get(("core", None, "excludesfile"), None)
+      if excludesFileList:
+        excludesFile = os.path.expanduser(excludesFileList[-1])
+  return configFilesList + [excludesFile]
+
+
+# Get the list of all of the directories in the worktree of a repo (tracked,
+# untracked, and ignored, but not the git dir or nested git repos which 'git
+# status' skips).  The paths are bytes.  Returns None if the worktree has more
+# than maxNumDirs (if not None) directories (without walking the rest of it).
+def getWorktreeDirsList(repoDir, maxNumDirs=None):
+  dotGitName = b(".git")
+  worktreeDirsList = []
+  repoDirBytes = fsEncodePath(repoDir)
+  for (dirPath, subdirNamesList, fileNamesList) in os.walk(repoDirBytes):
+    if dirPath != repoDirBytes and \
+      (dotGitName in subdirNamesList or dotGitName in fileNamesList) \
+      :
+      del subdirNamesList[:]  # Nested git repo
+      continue
+    if maxNumDirs is not None and len(worktreeDirsList) >= maxNumDirs:
+      return None
+    if dotGitName in subdirNamesList:
+      subdirNamesList.remove(dotGitName)
+    subdirNamesList.sort()  # Same order every time
+    worktreeDirsList.append(dirPath)
+  return worktreeDirsList
+
+
+def fsEncodePath(pathName):
+  if sys.version_info < (3,):
+    return pathName
+  return os.fsencode(pathName)
+
+
+# Get the list of (dirPath, isGitDir) for the directories to watch for changes
+# that could change the output of 'git status' for the repo in repoDir (i.e.
+# the git dirs, the refs dirs, and all of the directories of the worktree, see
+# getWorktreeDirsList()) or None if the repo layout is not supported or if
+# there are more than maxNumDirs directories.  The paths are bytes.
+def getRepoWatchDirs(repoDir, maxNumDirs):
+  refReader = GitRepoRefReader(repoDir)
+  if not refReader.isSupported():
+    return None
+  watchDirsList = []
+  gitDirsList = [refReader.gitDir]
+  if refReader.commonDir != refReader.gitDir:
+    gitDirsList.append(refReader.commonDir)
+  gitDirsList.append(os.path.join(refReader.commonDir, "info"))
+  for (refsDir, subdirNamesList, fileNamesList) in \
+    os.walk(os.path.join(refReader.commonDir, "refs")) \
+    :
+    gitDirsList.append(refsDir)
+  for gitDir in gitDirsList:
+    watchDirsList.append((fsEncodePath(gitDir), True))
+  worktreeDirsList = getWorktreeDirsList(repoDir,
+    maxNumDirs - len(watchDirsList))
+  if worktreeDirsList is None:
+    return None
+  for worktreeDir in worktreeDirsList:
+    watchDirsList.append((worktreeDir, False))
+  return watchDirsList
+
+
+# Wrapper for the Linux inotify API using ctypes (isSupported() returns False
+# if inotify is not available)
+class InotifyWatcher:
+
+  IN_MODIFY = 0x2
+  IN_ATTRIB = 0x4
+  IN_CLOSE_WRITE = 0x8
+  IN_MOVED_FROM = 0x40
+  IN_MOVED_TO = 0x80
+  IN_CREATE = 0x100
+  IN_DELETE = 0x200
+  IN_DELETE_SELF = 0x400
+  IN_MOVE_SELF = 0x800
+  IN_Q_OVERFLOW = 0x4000
+  IN_IGNORED = 0x8000
+  IN_ONLYDIR = 0x1000000
+  IN_DONT_FOLLOW = 0x2000000
+  IN_NONBLOCK = 0x800
+  IN_CLOEXEC = 0x80000
+
+  watchMask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+    IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | \
+    IN_ONLYDIR | IN_DONT_FOLLOW
+
+  def __init__(self):
+    self.libc = None
+    self.fd = -1
+    try:
+      import ctypes
+      import ctypes.util
+      self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+      self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+    except (ImportError, OSError, AttributeError):
+      self.fd = -1
+
+  def isSupported(self):
+    return self.fd >= 0
+
+  def fileno(self):
+    return self.fd
+
+  # Watch a directory (given as bytes) and return the watch descriptor (or -1
+  # if the directory can't be watched, e.g. out of inotify watches)
+  def addWatch(self, dirPath):
+    return self.libc.inotify_add_watch(self.fd, dirPath, self.watchMask)
+
+  def removeWatch(self, wd):
+    self.libc.inotify_rm_watch(self.fd, wd)
+
+  # Return the list of (watchDescriptor, mask, name) for the pending events
+  def readEvents(self):
+    eventsList = []
+    while True:
+      try:
+        data = os.read(self.fd, 65536)
+      except OSError:
+        break  # No more events (EAGAIN)
+      if not data:
+        break
+      pos = 0
+      while pos + 16 <= len(data):
+        (wd, mask, cookie, nameLen) = struct.unpack_from("iIII", data, pos)
+        name = data[pos+16:pos+16+nameLen].rstrip(b("\0"))
+        eventsList.append((wd, mask, name))
+        pos += 16 + nameLen
+    return eventsList
+
+  def close(self):
+    if self.fd >= 0:
+      os.close(self.fd)
+      self.fd = -1
+
+
+# Daemon that keeps the stats for a set of repos up to date and answers
+# requests for them from queryRepoStatsDaemon() on a Unix domain socket.
+#
+# The main thread only waits for file changes and new connections.  Each
+# request is answered in its own thread and the stats of the changed repos are
+# recomputed in an update thread so that a slow repo never blocks a request.
+# A request only gets the stats of the repos that are known to be current (the
+# other repos are returned as None and queryRepoStatsDaemon() leaves them out
+# so the client gets their status itself).
+class RepoStatsDaemon:
+
+  def __init__(self, options, baseDir, reposList, socketPath,
+    repoAttrsDict=None \
+    ):
+    if repoAttrsDict is None:
+      repoAttrsDict = {}
+    self.options = options
+    self.socketPath = socketPath
+    self.repoDirsList = []
+    self.statusProfilesDict = {}
+    for repo in reposList:
+      repoDir = os.path.abspath(os.path.join(baseDir, repo))
+      self.repoDirsList.append(repoDir)
+      self.statusProfilesDict[repoDir] = \
+        getRepoStatusProfile(options, repoAttrsDict.get(repo, {}))
+    self.repoDirsSet = set(self.repoDirsList)
+    # All of the data below is protected by self.lock
+    self.lock = threading.Lock()
+    self.repoStatsDict = {}
+    self.dirtyRepoDirsSet = set(self.repoDirsList)
+    self.updatingRepoDirsSet = set()
+    self.polledRepoDirsSet = set()
+    self.polledSignaturesDict = {}
+    self.watchDescriptorsDict = {}  # { <wd> : { <repoDir> : <isGitDir> } }
+    self.repoWatchDescriptorsDict = {}  # { <repoDir> : set(<wd>) }
+    self.globalWatchDescriptorsDict = {}
+    self.inotifyWatcher = InotifyWatcher()
+    self.updateEvent = threading.Event()
+
+  def usesInotify(self):
+    return self.inotifyWatcher.isSupported()
+
+  # Add inotify watches for the dirs of a repo (or poll the repo if it can't
+  # be fully watched, e.g. if its worktree has more dirs than are left of
+  # daemonMaxNumInotifyWatches).  Must be called with self.lock held.
+  def updateRepoWatches(self, repoDir):
+    if repoDir in self.polledRepoDirsSet:
+      return
+    watchDirsList = None
+    if self.usesInotify():
+      numOtherWatches = len(self.watchDescriptorsDict) - \
+        len(self.repoWatchDescriptorsDict.get(repoDir, ()))
+      watchDirsList = getRepoWatchDirs(repoDir,
+        daemonMaxNumInotifyWatches - numOtherWatches)
+    if watchDirsList is None:
+      self.pollRepo(repoDir)
+      return
+    repoWatchDescriptorsSet = \
+      self.repoWatchDescriptorsDict.setdefault(repoDir, set())
+    for (watchDir, isGitDir) in watchDirsList:
+      wd = self.inotifyWatcher.addWatch(watchDir)
+      if wd < 0:
+        if os.path.isdir(watchDir):
+          self.pollRepo(repoDir)  # Out of watches
+          return
+        continue  # Removed since the dirs were listed
+      self.watchDescriptorsDict.setdefault(wd, {})[repoDir] = isGitDir
+      repoWatchDescriptorsSet.add(wd)
+    # The global config and excludes files change the status of every repo
+    for globalFile in getGlobalGitExcludesFiles(GitRepoRefReader(repoDir)):
+      (globalFileDir, globalFileName) = \
+        os.path.split(fsEncodePath(os.path.abspath(globalFile)))
+      if not os.path.isdir(globalFileDir):
+        continue
+      wd = self.inotifyWatcher.addWatch(globalFileDir)
+      if wd < 0:
+        self.pollRepo(repoDir)
+        return
+      self.globalWatchDescriptorsDict.setdefault(wd, set()).add(globalFileName)
+
+  # Poll a repo instead of watching it and remove its inotify watches.  Must
+  # be called with self.lock held.
+  def pollRepo(self, repoDir):
+    self.polledRepoDirsSet.add(repoDir)
+    for wd in self.repoWatchDescriptorsDict.pop(repoDir, ()):
+      repoWatchesDict = self.watchDescriptorsDict.get(wd, {})
+      repoWatchesDict.pop(repoDir, None)
+      if not repoWatchesDict:
+        self.watchDescriptorsDict.pop(wd, None)
+        if not wd in self.globalWatchDescriptorsDict:
+          self.inotifyWatcher.removeWatch(wd)
+
+  # Mark the repos with file changes as dirty.  Must be called with self.lock
+  # held.
+  def processInotifyEvents(self):
+    if not self.usesInotify():
+      return
+    for (wd, mask, name) in self.inotifyWatcher.readEvents():
+      if mask & InotifyWatcher.IN_Q_OVERFLOW:
+        self.dirtyRepoDirsSet.update(self.repoDirsList)
+        continue
+      if wd in self.globalWatchDescriptorsDict:
+        if name in self.globalWatchDescriptorsDict[wd]:
+          self.dirtyRepoDirsSet.update(self.repoDirsList)
+        if mask & InotifyWatcher.IN_IGNORED:
+          del self.globalWatchDescriptorsDict[wd]
+      repoWatchesDict = self.watchDescriptorsDict.get(wd, None)
+      if not repoWatchesDict:
+        continue
+      if mask & InotifyWatcher.IN_IGNORED:
+        # The dir was removed
+        del self.watchDescriptorsDict[wd]
+        for repoDir in repoWatchesDict:
+          self.repoWatchDescriptorsDict.get(repoDir, set()).discard(wd)
+          self.dirtyRepoDirsSet.add(repoDir)
+        continue
+      for (repoDir, isGitDir) in repoWatchesDict.items():
+        if isGitDir and \
+          (name.endswith(b(".lock")) or name.startswith(b("gitdist-"))) \
+          :
+          continue  # Lock files and gitdist's own files don't change the status
+        self.dirtyRepoDirsSet.add(repoDir)
+
+  # Mark the polled repos in repoDirsList whose signature changed (or that
+  # don't have a signature) as dirty.  The signatures are computed without
+  # holding self.lock.
+  def checkPolledRepos(self, repoDirsList):
+    self.lock.acquire()
+    try:
+      polledRepoDirsList = \
+        [ repoDir for repoDir in repoDirsList if repoDir in self.polledRepoDirsSet ]
+    finally:
+      self.lock.release()
+    for repoDir in polledRepoDirsList:
+      signatureStartTime = time.time()
+      signatureAndMtime = getRepoStatusSignature(repoDir)
+      self.lock.acquire()
+      try:
+        if signatureAndMtime and \
+          signatureAndMtime[0] == self.polledSignaturesDict.get(repoDir, None) \
+          :
+          continue
+        self.dirtyRepoDirsSet.add(repoDir)
+        if signatureAndMtime and \
+          signatureAndMtime[1] < signatureStartTime - 1.0 \
+          :
+          self.polledSignaturesDict[repoDir] = signatureAndMtime[0]
+        else:
+          # Can't trust the signature so check the repo again the next time
+          self.polledSignaturesDict[repoDir] = None
+      finally:
+        self.lock.release()
+
+  # Get the stats for a repo (or None if that fails, e.g. the repo was removed)
+  def getOneRepoStats(self, repoDir):
+    statusProfile = self.statusProfilesDict[repoDir]
+    if statusProfile == "fast":
+      # Let 'git status' write the untracked cache to the index (see
+      # runRepoStatsDaemon()) or else the 'fast' profile would not help
+      extraEnv = { "GIT_OPTIONAL_LOCKS" : "1" }
+    else:
+      extraEnv = None
+    def getCmndOutputFunc(cmnd, rtnCode=False):
+      return getCmndOutput(cmnd, rtnCode, workingDir=repoDir, extraEnv=extraEnv)
+    try:
+      return getRepoStats(self.options, getCmndOutputFunc,
+        statusProfile=statusProfile)
+    except Exception:
+      return None
+
+  # Recompute the stats for the dirty repos (called in the update thread)
+  def updateRepoStats(self):
+    self.lock.acquire()
+    try:
+      dirtyRepoDirsList = []
+      for repoDir in self.repoDirsList:
+        if repoDir in self.dirtyRepoDirsSet:
+          dirtyRepoDirsList.append(repoDir)
+          # Clean before getting the stats so later changes make it dirty again
+          self.dirtyRepoDirsSet.discard(repoDir)
+          self.updatingRepoDirsSet.add(repoDir)
+          self.updateRepoWatches(repoDir)
+    finally:
+      self.lock.release()
+    for (repoIdx, repoStats) in parallelMap(self.getOneRepoStats,
+      dirtyRepoDirsList, getNumParallelRepoStats(self.options), inOrder=False) \
+      :
+      repoDir = dirtyRepoDirsList[repoIdx]
+      self.lock.acquire()
+      try:
+        self.updatingRepoDirsSet.discard(repoDir)
+        if repoStats:
+          self.repoStatsDict[repoDir] = repoStats
+        else:
+          self.repoStatsDict.pop(repoDir, None)
+      finally:
+        self.lock.release()
+
+  # Keep updating the stats of the dirty repos when asked to (runs in its own
+  # thread)
+  def runUpdateThread(self):
+    while True:
+      self.updateEvent.wait()
+      self.updateEvent.clear()
+      self.updateRepoStats()
+
+  # Answer a request from queryRepoStatsDaemon() on a new connection (runs in
+  # its own thread)
+  def answerRequest(self, clientSocket):
+    try:
+      try:
+        clientSocket.settimeout(5.0)
+        requestedRepoDirsList = []
+        for repoDir in json.loads(readSocketLine(clientSocket))["repos"]:
+          if repoDir in self.repoDirsSet:
+            requestedRepoDirsList.append(repoDir)
+        # Make sure that all of the changes so far are seen
+        self.lock.acquire()
+        try:
+          self.processInotifyEvents()
+        finally:
+          self.lock.release()
+        self.checkPolledRepos(requestedRepoDirsList)
+        reposStatsDicts = {}
+        statusProfilesDict = {}
+        self.lock.acquire()
+        try:
+          for repoDir in requestedRepoDirsList:
+            repoStats = self.repoStatsDict.get(repoDir, None)
+            if repoStats and not repoDir in self.dirtyRepoDirsSet and \
+              not repoDir in self.updatingRepoDirsSet \
+              :
+              reposStatsDicts[repoDir] = repoStats.toDict()
+            else:
+              reposStatsDicts[repoDir] = None  # Not current
+            statusProfilesDict[repoDir] = self.statusProfilesDict[repoDir]
+          if self.dirtyRepoDirsSet:
+            self.updateEvent.set()
+        finally:
+          self.lock.release()
+        clientSocket.sendall(b(json.dumps(
+          { "repos" : reposStatsDicts, "statusProfiles" : statusProfilesDict })
+          + "\n"))
+      except (socket.error, ValueError, KeyError, TypeError):
+        pass  # Broken request so just drop it
+    finally:
+      clientSocket.close()
+
+  # Start a daemon thread
+  def startThread(self, target, args=()):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+
+  # Listen on the socket and keep the repo stats up to date until killed
+  def run(self):
+    if os.path.exists(self.socketPath):
+      testSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      try:
+        try:
+          testSocket.connect(self.socketPath)
+          daemonIsRunning = True
+        except socket.error:
+          daemonIsRunning = False
+      finally:
+        testSocket.close()
+      if daemonIsRunning:
+        print("Error, a gitdist daemon is already running on the socket '"
+              + self.socketPath + "'!")
+        sys.exit(1)
+      os.remove(self.socketPath)  # Left over from a killed daemon
+    serverSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      serverSocket.bind(self.socketPath)
+      serverSocket.listen(16)
+      self.lock.acquire()
+      try:
+        for repoDir in self.repoDirsList:
+          self.updateRepoWatches(repoDir)
+        numPolledRepos = len(self.polledRepoDirsSet)
+      finally:
+        self.lock.release()
+      pollingMethod = "polling every " + str(daemonPollIntervalSec) + " sec"
+      if not self.usesInotify():
+        watchMethod = pollingMethod
+      elif numPolledRepos:
+        watchMethod = "inotify, " + pollingMethod + " for " + \
+          str(numPolledRepos) + " repos"
+      else:
+        watchMethod = "inotify"
+      print("gitdist dist-daemon (pid " + str(os.getpid()) + ") keeping the"
+        + " status of " + str(len(self.repoDirsList)) + " git repos up to date"
+        + " (using " + watchMethod + ") on the socket '" + self.socketPath + "'")
+      sys.stdout.flush()
+      self.checkPolledRepos(self.repoDirsList)
+      self.startThread(self.runUpdateThread)
+      self.updateEvent.set()
+      lastPollTime = time.time()
+      while True:
+        readFdsList = [serverSocket]
+        if self.usesInotify():
+          readFdsList.append(self.inotifyWatcher)
+        self.lock.acquire()
+        try:
+          hasDirtyRepos = (len(self.dirtyRepoDirsSet) > 0)
+        finally:
+          self.lock.release()
+        if hasDirtyRepos:
+          selectTimeout = daemonQuietTimeSec
+        else:
+          selectTimeout = daemonPollIntervalSec
+        (readyList, writeReadyList, exceptList) = \
+          select.select(readFdsList, [], [], selectTimeout)
+        if self.inotifyWatcher in readyList:
+          self.lock.acquire()
+          try:
+            self.processInotifyEvents()
+          finally:
+            self.lock.release()
+        if serverSocket in readyList:
+          (clientSocket, clientAddress) = serverSocket.accept()
+          self.startThread(self.answerRequest, (clientSocket,))
+        if time.time() - lastPollTime >= daemonPollIntervalSec:
+          self.checkPolledRepos(self.repoDirsList)
+          lastPollTime = time.time()
+        if not readyList and hasDirtyRepos:
+          # Files have not changed for a bit so update the changed repos
+          self.updateEvent.set()
+    finally:
+      serverSocket.close()
+      if os.path.exists(self.socketPath):
+        os.remove(self.socketPath)
+      self.inotifyWatcher.close()
+
+
+# Run the repo stats daemon for dist-daemon (until killed)
+def runRepoStatsDaemon(options, reposList, baseDir, repoAttrsDict=None):
+  def exitOnSignal(signum, frame):
+    sys.exit(0)
+  signal.signal(signal.SIGTERM, exitOnSignal)
+  # Don't let 'git status' lock or refresh the index of the repos (except for
+  # the repos with the 'fast' status profile, see
+  # RepoStatsDaemon.getOneRepoStats())
+  os.environ["GIT_OPTIONAL_LOCKS"] = "0"
+  repoStatsDaemon = RepoStatsDaemon(options, baseDir, reposList,
+    getRepoStatsDaemonSocketPath(baseDir), repoAttrsDict)
+  try:
+    repoStatsDaemon.run()
+  except KeyboardInterrupt:
+    pass
+
+
+# Get the local branch for a repo
+def getLocalBranch(options, getCmndOutputFunc, repoDir=None):
+  if repoDir is not None:
+    localBranch = GitRepoRefReader(repoDir).getLocalBranch()
+    if localBranch is not None:
+      return localBranch
   (resp, rtnCode) = getCmndOutputFunc(
     options.useGit + " rev-parse --abbrev-ref HEAD",
     rtnCode=True )
@@ -1393,7 +4192,11 @@ def getLocalBranch(options, getCmndOutputFunc):
 
 
 # Get the tracking branch for a repo
-def getTrackingBranch(options, getCmndOutputFunc):
+def getTrackingBranch(options, getCmndOutputFunc, repoDir=None):
+  if repoDir is not None:
+    trackingBranch = GitRepoRefReader(repoDir).getTrackingBranch()
+    if trackingBranch is not None:
+      return trackingBranch
   (trackingBranch, rtnCode) = getCmndOutputFunc(
     options.useGit + " rev-parse --abbrev-ref --symbolic-full-name @{u}",
     rtnCode=True )
@@ -1438,10 +4241,46 @@ def matchFieldOneOrTwo(findIdx):
   return False
 
 
+# Cache of the result of gitHasBuiltinFsmonitor() for each git command
+gitHasBuiltinFsmonitorDict = {}
+
+
+# Determine if the git command has the builtin fsmonitor daemon (git 2.36+ on
+# some platforms)
+def gitHasBuiltinFsmonitor(options):
+  if not options.useGit in gitHasBuiltinFsmonitorDict:
+    (buildOptions, rtnCode) = getCmndOutput(
+      options.useGit + " version --build-options", rtnCode=True)
+    gitHasBuiltinFsmonitorDict[options.useGit] = \
+      (rtnCode == 0 and "fsmonitor--daemon" in buildOptions)
+  return gitHasBuiltinFsmonitorDict[options.useGit]
+
+
+# Get the 'git status <statusArgs>' command for a status profile
+def getStatusCmndStr(options, statusArgs, statusProfile="default"):
+  gitCmndStr = options.useGit
+  if statusProfile in ("fast", "no-untracked"):
+    gitCmndStr += " -c core.untrackedCache=true"
+    if gitHasBuiltinFsmonitor(options):
+      gitCmndStr += " -c core.fsmonitor=true"
+  gitCmndStr += " status " + statusArgs
+  if statusProfile == "no-untracked":
+    gitCmndStr += " -uno"
+  return gitCmndStr
+
+
+# Get the status profile of a repo (i.e. its 'status=<profile>' attribute or
+# else --dist-status-profile)
+def getRepoStatusProfile(options, repoAttrs):
+  return repoAttrs.get("status", options.statusProfile)
+
+
 # Get the number of modified
-def getNumModifiedAndUntracked(options, getCmndOutputFunc):
+def getNumModifiedAndUntracked(options, getCmndOutputFunc,
+  statusProfile="default" \
+  ):
   (rawStatusOutput, rtnCode) = getCmndOutputFunc(
-    options.useGit + " status --porcelain", rtnCode=True )
+    getStatusCmndStr(options, "--porcelain", statusProfile), rtnCode=True )
   if rtnCode == 0:
     numModified = 0
     numUntracked = 0
@@ -1460,6 +4299,8 @@ def getNumModifiedAndUntracked(options, getCmndOutputFunc):
         numModified += 1
       elif line.find(s("??")) == 0:
         numUntracked += 1
+    if statusProfile == "no-untracked":
+      return (str(numModified), "-")
     return (str(numModified), str(numUntracked))
   return ("", "")
 
@@ -1470,12 +4311,15 @@ def getNumModifiedAndUntracked(options, getCmndOutputFunc):
 
 class RepoStatsStruct:
 
-  def __init__(self, branch, trackingBranch, numCommits, numModified, numUntracked):
+  def __init__(self, branch, trackingBranch, numCommits, numModified, numUntracked,
+    numBehind="" \
+    ):
     self.branch = branch
     self.trackingBranch = trackingBranch
     self.numCommits = numCommits
     self.numModified = numModified
     self.numUntracked = numUntracked
+    self.numBehind = numBehind
 
   def __str__(self):
     return "{" \
@@ -1483,37 +4327,124 @@ class RepoStatsStruct:
      " trackingBranch='" + self.trackingBranch + "'," \
      " numCommits='" + self.numCommits + "'," \
      " numModified='" + self.numModified + "'," \
-     " numUntracked='" + self.numUntracked + "'" \
+     " numUntracked='" + self.numUntracked + "'," \
+     " numBehind='" + self.numBehind + "'" \
      "}"
 
   def numCommitsInt(self):
     if self.numCommits == '': return 0
     return int(self.numCommits)
 
+  def numBehindInt(self):
+    if self.numBehind == '': return 0
+    return int(self.numBehind)
+
   def numModifiedInt(self):
     if self.numModified == '': return 0
     return int(self.numModified)
 
   def numUntrackedInt(self):
-    if self.numUntracked == '': return 0
+    if self.numUntracked in ('', '-'): return 0  # '-' is not counted
     return int(self.numUntracked)
 
+  def toDict(self):
+    return {
+      "branch" : self.branch,
+      "trackingBranch" : self.trackingBranch,
+      "numCommits" : self.numCommits,
+      "numModified" : self.numModified,
+      "numUntracked" : self.numUntracked,
+      "numBehind" : self.numBehind,
+      }
+
   def hasLocalChanges(self):
     if self.numCommitsInt() + self.numModifiedInt() + self.numUntrackedInt() > 0:
       return True
     return False
 
 
-def getRepoStats(options, getCmndOutputFunc=None):
+def repoStatsFromDict(repoStatsDict):
+  return RepoStatsStruct(str(repoStatsDict["branch"]),
+                         str(repoStatsDict["trackingBranch"]),
+                         str(repoStatsDict["numCommits"]),
+                         str(repoStatsDict["numModified"]),
+                         str(repoStatsDict["numUntracked"]),
+                         str(repoStatsDict["numBehind"]))
+
+
+# Get the repo stats from the output of a single 'git status --porcelain=v2
+# --branch' command.  Returns None if the command fails (e.g. git older than
+# 2.11 that does not support --porcelain=v2).
+def getRepoStatsFromPorcelainV2(options, getCmndOutputFunc,
+  statusProfile="default" \
+  ):
+  (rawStatusOutput, rtnCode) = getCmndOutputFunc(
+    getStatusCmndStr(options, "--porcelain=v2 --branch", statusProfile),
+    rtnCode=True )
+  if rtnCode != 0:
+    return None
+  branch = ""
+  upstreamBranch = ""
+  aheadBehind = None
+  numModified = 0
+  numUntracked = 0
+  for line in rawStatusOutput.splitlines():
+    if line.startswith("# branch.head "):
+      branch = line[len("# branch.head "):].strip()
+      if branch == "(detached)":
+        branch = "HEAD"  # Same as 'rev-parse --abbrev-ref HEAD'
+    elif line.startswith("# branch.upstream "):
+      upstreamBranch = line[len("# branch.upstream "):].strip()
+    elif line.startswith("# branch.ab "):
+      aheadBehind = line[len("# branch.ab "):].split()
+    elif line[0:2] in ("1 ", "2 ", "u "):
+      numModified += 1
+    elif line[0:2] == "? ":
+      numUntracked += 1
+  if aheadBehind:
+    # The upstream branch exists (and not just configured)
+    trackingBranch = upstreamBranch
+    numCommits = str(abs(int(aheadBehind[0])))
+    numBehind = str(abs(int(aheadBehind[1])))
+  else:
+    trackingBranch = ""
+    numCommits = ""
+    numBehind = ""
+  if statusProfile == "no-untracked":
+    numUntracked = "-"
+  return RepoStatsStruct(branch,
+                         trackingBranch,
+                         numCommits,
+                         str(numModified),
+                         str(numUntracked),
+                         numBehind)
+
+
+# Get the repo stats for the repo in repoDir (or the current dir if None) using
+# the given status profile
+def getRepoStats(options, getCmndOutputFunc=None, repoDir=None,
+  statusProfile="default" \
+  ):
   if not getCmndOutputFunc:
-    getCmndOutputFunc = getCmndOutput
-  branch         = getLocalBranch(options, getCmndOutputFunc)
-  trackingBranch = getTrackingBranch(options, getCmndOutputFunc)
+    def getCmndOutputFunc(cmnd, rtnCode=False):
+      return getCmndOutput(cmnd, rtnCode, workingDir=repoDir)
+    refReaderRepoDir = (repoDir if repoDir else ".")
+  else:
+    refReaderRepoDir = None  # Only use the passed-in function
+  repoStats = getRepoStatsFromPorcelainV2(options, getCmndOutputFunc,
+    statusProfile)
+  if repoStats:
+    return repoStats
+  # Else, fall back on older versions of git
+  branch         = getLocalBranch(options, getCmndOutputFunc, refReaderRepoDir)
+  trackingBranch = getTrackingBranch(options, getCmndOutputFunc,
+                                     refReaderRepoDir)
   numCommits     = getNumCommitsWrtTrackingBranch(options,
                                                   trackingBranch,
                                                   getCmndOutputFunc)
   (numModified, numUntracked) = getNumModifiedAndUntracked(options,
-                                                           getCmndOutputFunc)
+                                                           getCmndOutputFunc,
+                                                           statusProfile)
   return RepoStatsStruct(branch,
                          trackingBranch,
                          numCommits,
@@ -1521,6 +4452,56 @@ def getRepoStats(options, getCmndOutputFunc=None):
                          numUntracked)
 
 
+# Get the tracking branch for the repo in repoDir from repoStats (if not None)
+# or else by reading the git files (only running git if that fails)
+def getRepoTrackingBranch(options, repoStats, repoDir):
+  if repoStats:
+    return repoStats.trackingBranch
+  def getCmndOutputFunc(cmnd, rtnCode=False):
+    return getCmndOutput(cmnd, rtnCode, workingDir=repoDir)
+  return getTrackingBranch(options, getCmndOutputFunc, repoDir)
+
+
+# Yield (repoID, repo, repoStats) for each repo in reposList (in order if
+# inOrder=True, or else as soon as the stats for each repo are ready) while
+# getting the stats for several repos at the same time.  Uses repoStatsCache
+# if not None (which the caller must write), or else reads/writes the repo
+# stats cache file unless --dist-no-cache.
+def getReposStatsInParallel(options, reposList, baseDir, inOrder=True,
+  repoAttrsDict=None, repoStatsCache=None \
+  ):
+  if repoAttrsDict is None:
+    repoAttrsDict = {}
+  statusProfilesDict = {}
+  for repo in reposList:
+    statusProfilesDict[os.path.abspath(os.path.join(baseDir, repo))] = \
+      getRepoStatusProfile(options, repoAttrsDict.get(repo, {}))
+  writeRepoStatsCache = False
+  if repoStatsCache is None and options.useCache:
+    repoStatsCache = RepoStatsCache(getRepoStatsCacheFilePath(baseDir))
+    writeRepoStatsCache = True
+  if options.useCache:
+    daemonRepoStatsDict = queryRepoStatsDaemon(
+      getRepoStatsDaemonSocketPath(baseDir),
+      [ os.path.abspath(os.path.join(baseDir, repo)) for repo in reposList ],
+      statusProfilesDict )
+  else:
+    daemonRepoStatsDict = {}
+  def getOneRepoStats(repo):
+    repoDir = os.path.join(baseDir, repo)
+    repoStats = daemonRepoStatsDict.get(os.path.abspath(repoDir), None)
+    if repoStats:
+      return repoStats
+    return getRepoStatsUsingCache(options, repoDir, repoStatsCache,
+      statusProfilesDict[os.path.abspath(repoDir)])
+  for (repoID, repoStats) in parallelMap(getOneRepoStats, reposList,
+    getNumParallelRepoStats(options), inOrder) \
+    :
+    yield (repoID, reposList[repoID], repoStats)
+  if writeRepoStatsCache:
+    repoStatsCache.write()
+
+
 def convertZeroStrToEmpty(strIn):
   if strIn == "0":
     return ""
@@ -1536,6 +4517,7 @@ class RepoStatTable:
       { "label" : "Branch", "align":"L", "fields" : [] },
       { "label" : "Tracking Branch", "align":"L", "fields" : [] },
       { "label" : "C", "align":"R", "fields" : [] },
+      { "label" : "B", "align":"R", "fields" : [] },
       { "label" : "M", "align":"R", "fields" : [] },
       { "label" : "?", "align":"R", "fields" : [] },
       ]
@@ -1546,18 +4528,461 @@ class RepoStatTable:
     self.tableData[2]["fields"].append(repoStat.branch)
     self.tableData[3]["fields"].append(repoStat.trackingBranch)
     self.tableData[4]["fields"].append(convertZeroStrToEmpty(repoStat.numCommits))
-    self.tableData[5]["fields"].append(convertZeroStrToEmpty(repoStat.numModified))
-    self.tableData[6]["fields"].append(convertZeroStrToEmpty(repoStat.numUntracked))
+    self.tableData[5]["fields"].append(convertZeroStrToEmpty(repoStat.numBehind))
+    self.tableData[6]["fields"].append(convertZeroStrToEmpty(repoStat.numModified))
+    self.tableData[7]["fields"].append(convertZeroStrToEmpty(repoStat.numUntracked))
 
   def getTableData(self):
     return self.tableData
 
   
+# Formats for the output of dist-repo-status
+repoStatFormats = [ "table", "jsonl", "csv" ]
+
+# Default number of seconds between the updates of dist-repo-status
+# --dist-live
+defaultLiveIntervalSec = 2.0
+
+
+# Fields of each record written for --dist-format=jsonl and csv
+repoStatRecordFields = [ "id", "repoDir", "repoName", "branch",
+  "trackingBranch", "numCommits", "numBehind", "numModified", "numUntracked" ]
+
+
+# Count fields of each record (written as ints, or None if not known)
+repoStatRecordCountFields = [ "numCommits", "numBehind", "numModified",
+  "numUntracked" ]
+
+
+# Get a count field of a RepoStatsStruct as an int (or None if it is empty or
+# '-')
+def getRepoStatRecordCount(countStr):
+  try:
+    return int(countStr)
+  except ValueError:
+    return None
+
+
+def getRepoStatRecordDict(repoID, repoDir, repoName, repoStat):
+  recordDict = repoStat.toDict()
+  for countField in repoStatRecordCountFields:
+    recordDict[countField] = getRepoStatRecordCount(recordDict[countField])
+  recordDict.update(
+    { "id" : repoID, "repoDir" : repoDir, "repoName" : repoName } )
+  return recordDict
+
+
+# Write the stats for each repo as one JSON object per line as soon as it is
+# inserted (i.e. --dist-format=jsonl)
+class RepoStatJsonLinesWriter:
+
+  def __init__(self, outFile):
+    self.outFile = outFile
+
+  def insertRepoStat(self, repoID, repoDir, repoName, repoStat):
+    recordDict = getRepoStatRecordDict(repoID, repoDir, repoName, repoStat)
+    self.outFile.write(json.dumps(recordDict, sort_keys=True) + "\n")
+    self.outFile.flush()
+
+
+# Write the stats for each repo as a CSV line as soon as it is inserted
+# (i.e. --dist-format=csv)
+class RepoStatCsvWriter:
+
+  def __init__(self, outFile):
+    self.outFile = outFile
+    self.csvWriter = csv.writer(outFile, lineterminator="\n")
+    self.csvWriter.writerow(repoStatRecordFields)
+    self.outFile.flush()
+
+  def insertRepoStat(self, repoID, repoDir, repoName, repoStat):
+    recordDict = getRepoStatRecordDict(repoID, repoDir, repoName, repoStat)
+    self.csvWriter.writerow(
+      [ recordDict[field] for field in repoStatRecordFields ] )
+    self.outFile.flush()
+
+
+# Get the writer object for a --dist-format=<fmt> that prints the stats for
+# each repo as soon as they are ready (or None for the 'table' format)
+def getRepoStatStreamWriter(statusFormat, outFile):
+  if statusFormat == "jsonl":
+    return RepoStatJsonLinesWriter(outFile)
+  elif statusFormat == "csv":
+    return RepoStatCsvWriter(outFile)
+  return None
+
+
 def getRepoName(repoDir, baseRepoName):
   if repoDir == ".":
     return baseRepoName
   return repoDir
+
+
+# Get the lines of the dist-repo-status table for the list of (repoID, repo,
+# repoStats)
+def getRepoStatTableLines(reposAndStatsList, baseRepoName):
+  repoStatTable = RepoStatTable()
+  for (repoID, repo, repoStats) in reposAndStatsList:
+    repoNameInTpl = getRepoName(repo, baseRepoName) \
+      + (" (Base)" if repo=="." else "")
+    repoStatTable.insertRepoStat(repoNameInTpl, repoStats, repoID)
+  return createAsciiTable(repoStatTable.getTableData()).splitlines()
+
+
+# Keep the dist-repo-status table up to date in the terminal until Ctrl-C
+# (i.e. --dist-live).  The repo stats are kept in memory keyed on the repo
+# status signatures so each update only gets the status again for the repos
+# whose signature changed (or takes it from the dist-daemon if it is running),
+# and only redraws the lines that changed using ANSI cursor addressing.  The
+# repo stats cache file is read once at the start and written once at the end
+# (unless --dist-no-cache).
+def runRepoStatusLive(options, reposList, baseDir, baseRepoName,
+  repoAttrsDict=None \
+  ):
+  if options.useCache:
+    repoStatsCache = RepoStatsCache(getRepoStatsCacheFilePath(baseDir))
+  else:
+    repoStatsCache = RepoStatsCache(None)
+  outFile = sys.stdout
+  drawnLines = []
+  outFile.write("\033[?25l")  # Hide the cursor
+  try:
+    while True:
+      updateStartTime = time.time()
+      reposAndStatsList = []
+      for (repoID, repo, repoStats) in getReposStatsInParallel(options,
+        reposList, baseDir, repoAttrsDict=repoAttrsDict,
+        repoStatsCache=repoStatsCache) \
+        :
+        # See if we should show the repo based on --dist-mod-only
+        if options.modifiedOnly and not repoStats.hasLocalChanges():
+          continue
+        reposAndStatsList.append((repoID, repo, repoStats))
+      # Redraw the lines that changed (or everything if the table layout
+      # changed)
+      newLines = [
+        "gitdist dist-repo-status --dist-live: " + time.strftime("%H:%M:%S")
+          + " (every " + str(options.liveIntervalSec) + " sec, Ctrl-C to quit)",
+        "" ]
+      newLines.extend(getRepoStatTableLines(reposAndStatsList, baseRepoName))
+      if options.printLegend:
+        newLines.extend(distRepoStatusLegend.splitlines())
+      if len(newLines) != len(drawnLines) or newLines[2] != drawnLines[2]:
+        outFile.write("\033[H\033[2J")  # Clear the screen
+        drawnLines = [None] * len(newLines)
+      for line_i in range(len(newLines)):
+        if newLines[line_i] != drawnLines[line_i]:
+          outFile.write("\033[%d;1H%s\033[K" % (line_i+1, newLines[line_i]))
+      drawnLines = newLines
+      outFile.write("\033[%d;1H" % (len(drawnLines)+1))
+      outFile.flush()
+      time.sleep(max(
+        options.liveIntervalSec - (time.time() - updateStartTime), 0.1))
+  except KeyboardInterrupt:
+    None
+  finally:
+    outFile.write("\033[?25h")  # Show the cursor again
+    outFile.flush()
+    repoStatsCache.write()
   
+#
+# Discover the git repos under a base dir (i.e. dist-discover)
+#
+
+
+# Return (hasDotGit, subdirNamesList) for the entries of a directory (not
+# following symlinks to directories)
+def readDirEntries(absDir):
+  hasDotGit = False
+  subdirNamesList = []
+  if hasattr(os, "scandir"):
+    for dirEntry in os.scandir(absDir):
+      if dirEntry.name == ".git":
+        hasDotGit = True
+      elif dirEntry.is_dir(follow_symlinks=False):
+        subdirNamesList.append(dirEntry.name)
+  else:
+    for entryName in os.listdir(absDir):
+      if entryName == ".git":
+        hasDotGit = True
+      else:
+        entryPath = os.path.join(absDir, entryName)
+        if os.path.isdir(entryPath) and not os.path.islink(entryPath):
+          subdirNamesList.append(entryName)
+  return (hasDotGit, sorted(subdirNamesList))
+
+
+def dirMatchesIgnoreGlobs(relDir, ignoreGlobsList):
+  dirName = os.path.basename(relDir)
+  for ignoreGlob in ignoreGlobsList:
+    if fnmatch.fnmatch(dirName, ignoreGlob) or \
+      fnmatch.fnmatch(relDir, ignoreGlob) \
+      :
+      return True
+  return False
+
+
+# Search the directory tree under baseDir/topRelDir and return the dict
+# { <relDir> : { "mtime" : <mtime>, "isRepo" : <bool>, "subdirs" : [...] } }
+# for every directory searched.  The entries of a directory are only read if
+# its mtime is different than in oldDirsDict.  If maxDepth=0, then only
+# topRelDir itself is read.
+def discoverDirsUnder(baseDir, topRelDir, ignoreGlobsList, oldDirsDict,
+  scanStartTime, maxDepth=None \
+  ):
+  newDirsDict = {}
+  relDirsStack = [(topRelDir, 0)]
+  while relDirsStack:
+    (relDir, depth) = relDirsStack.pop()
+    absDir = os.path.join(baseDir, relDir)
+    try:
+      dirMtime = os.stat(absDir).st_mtime
+    except OSError:
+      continue
+    oldDirEntry = oldDirsDict.get(relDir, None)
+    if oldDirEntry and oldDirEntry.get("mtime") == dirMtime:
+      (isRepo, subdirNamesList) = (oldDirEntry["isRepo"], oldDirEntry["subdirs"])
+    else:
+      try:
+        (isRepo, subdirNamesList) = readDirEntries(absDir)
+      except OSError:
+        continue  # Can't read the directory so just skip it
+    if dirMtime >= scanStartTime - 1.0:
+      # Changed too recently to trust the mtime the next time
+      dirMtime = None
+    newDirsDict[relDir] = \
+      { "mtime" : dirMtime, "isRepo" : isRepo, "subdirs" : subdirNamesList }
+    if maxDepth is not None and depth >= maxDepth:
+      continue
+    for subdirName in subdirNamesList:
+      if relDir == ".":
+        subRelDir = subdirName
+      else:
+        subRelDir = relDir + "/" + subdirName
+      if not dirMatchesIgnoreGlobs(subRelDir, ignoreGlobsList):
+        relDirsStack.append((subRelDir, depth+1))
+  return newDirsDict
+
+
+# Find all of the git repos under baseDir and return the list of their
+# relative dirs (sorted with '.' first).  The subdirectories of baseDir are
+# searched in parallel.  If cacheFilePath != None, then the directory cache
+# file is read and written.
+def discoverRepos(baseDir, ignoreGlobsList, numParallel, cacheFilePath=None):
+  cacheVersion = 1
+  oldDirsDict = {}
+  if cacheFilePath:
+    cacheDict = readJsonCacheFile(cacheFilePath, cacheVersion)
+    if cacheDict and cacheDict.get("ignoreGlobs") == ignoreGlobsList and \
+      isinstance(cacheDict.get("dirs"), dict) \
+      :
+      oldDirsDict = cacheDict["dirs"]
+  scanStartTime = time.time()
+  dirsDict = discoverDirsUnder(baseDir, ".", ignoreGlobsList, oldDirsDict,
+    scanStartTime, maxDepth=0)
+  topSubdirsList = []
+  if "." in dirsDict:
+    for subdirName in dirsDict["."]["subdirs"]:
+      if not dirMatchesIgnoreGlobs(subdirName, ignoreGlobsList):
+        topSubdirsList.append(subdirName)
+  def discoverTopSubdir(topSubdir):
+    return discoverDirsUnder(baseDir, topSubdir, ignoreGlobsList, oldDirsDict,
+      scanStartTime)
+  for subdirsDict in parallelMapInOrder(discoverTopSubdir, topSubdirsList,
+    numParallel) \
+    :
+    dirsDict.update(subdirsDict)
+  if cacheFilePath:
+    writeJsonCacheFile(cacheFilePath,
+      { "version" : cacheVersion, "ignoreGlobs" : ignoreGlobsList,
+        "dirs" : dirsDict } )
+  reposList = []
+  for relDir in sorted(dirsDict.keys()):
+    if dirsDict[relDir]["isRepo"] and relDir != ".":
+      reposList.append(relDir)
+  if "." in dirsDict and dirsDict["."]["isRepo"]:
+    reposList.insert(0, ".")
+  return reposList
+
+
+# Merge the discovered repos into the repos listed in the existing .gitdist
+# file.  The listed repos keep their order (including the ones that were not
+# found, e.g. not cloned yet) and the new repos are added at the end (except
+# for the base repo '.' which goes first).  Returns (mergedReposList,
+# notFoundReposList).
+def mergeDiscoveredRepos(listedReposList, discoveredReposList):
+  listedReposSet = set(listedReposList)
+  discoveredReposSet = set(discoveredReposList)
+  mergedReposList = list(listedReposList)
+  for repo in discoveredReposList:
+    if repo in listedReposSet:
+      continue
+    if repo == ".":
+      mergedReposList.insert(0, repo)
+    else:
+      mergedReposList.append(repo)
+  notFoundReposList = \
+    [ repo for repo in listedReposList if not repo in discoveredReposSet ]
+  return (mergedReposList, notFoundReposList)
+
+
+# Get the contents of a .gitdist file for a list of repos (listing the
+# default branch for each repo that is not 'master' and the '<name>=<value>'
+# attributes of each repo)
+def getGitdistFileStr(reposList, defaultBranchDict, repoAttrsDict=None):
+  if repoAttrsDict is None:
+    repoAttrsDict = {}
+  gitdistFileStr = ""
+  for repo in reposList:
+    repoLineEntries = [ repo ]
+    defaultBranch = defaultBranchDict.get(repo, "master")
+    if defaultBranch != "master":
+      repoLineEntries.append(defaultBranch)
+    repoAttrs = repoAttrsDict.get(repo, {})
+    for attrName in gitdistFileAttrNames:
+      if attrName in repoAttrs:
+        repoLineEntries.append(attrName + "=" + repoAttrs[attrName])
+    gitdistFileStr += " ".join(repoLineEntries) + "\n"
+  return gitdistFileStr
+
+
+#
+# Python API to use gitdist in-process (without changing the current dir)
+#
+# For example:
+#
+#   import gitdist
+#   workspace = gitdist.Workspace("/path/to/BaseRepo", ["--dist-not-repos=."])
+#   for (repo, repoStats) in workspace.status():
+#     print(repo + ": " + repoStats.branch)
+#   for repoCmndResult in workspace.run(["fetch"], parallel=8):
+#     if repoCmndResult.rtnCode != 0:
+#       print(repoCmndResult.repoName + ":\n" + repoCmndResult.output)
+#
+
+
+# Result of running a git command in one repo with Workspace.run().  The
+# rtnCode is None if the repo was skipped because the git command failed in a
+# repo that it depends on.
+class RepoCmndResult:
+
+  def __init__(self, repo, repoName, egCmndArray, output, rtnCode,
+    wallTimeSec \
+    ):
+    self.repo = repo
+    self.repoName = repoName
+    self.egCmndArray = egCmndArray
+    self.output = output
+    self.rtnCode = rtnCode
+    self.wallTimeSec = wallTimeSec
+
+  def __str__(self):
+    return "{repo='" + self.repo + "', rtnCode=" + str(self.rtnCode) + "}"
+
+
+# The set of repos under a base dir as seen by gitdist run in that dir with
+# the native gitdist args distArgsList (e.g. [ "--dist-repos=.,ExtraRepo1" ]).
+# The repos are read from the .gitdist file (or --dist-repos) when this object
+# is created.  Errors in distArgsList or in the .gitdist file are thrown as
+# exceptions.
+class Workspace:
+
+  def __init__(self, baseDir=".", distArgsList=None):
+    self.baseDir = os.path.abspath(baseDir)
+    self.baseRepoName = getBaseDirNameFromPath(self.baseDir)
+    self.distArgsList = list(distArgsList or [])
+    options = self.getOptions()
+    (self.reposFullList, self.defaultBranchDict, self.repoAttrsDict,
+      notReposList) = getReposFullList(options, self.baseDir)
+    self.repoDepsDict = getRepoDepsDict(self.reposFullList, self.repoAttrsDict)
+    self.reposList = [ repo for repo in self.reposFullList \
+      if repoExistsAndNotExcluded(options, repo, notReposList, self.baseDir) ]
+    self.repoVersionDict = self.getRepoVersionDict(options.versionFile)
+    self.repoVersionDict2 = self.getRepoVersionDict(options.versionFile2)
+
+  # Get the options for the native gitdist args (and --dist-parallel=<N> if
+  # parallel is not None)
+  def getOptions(self, parallel=None):
+    distArgsList = self.distArgsList
+    if parallel is not None:
+      distArgsList = distArgsList + [ "--dist-parallel="+str(parallel) ]
+    (clp, nativeArgNames) = getNativeArgsOptionParser()
+    (options, args) = clp.parse_args(distArgsList)
+    if args:
+      raise Exception("Error, the args "+str(args)+" are not native gitdist"
+        +" args!")
+    if not options.useGit:
+      raise Exception("Error, can't find git, please set --dist-use-git!")
+    if options.parallel != None and options.parallel < 1:
+      raise Exception("Error, --dist-parallel="+str(options.parallel)
+        +" is invalid!  Must be >= 1.")
+    return options
+
+  # Read a repo version file (relative to the base dir)
+  def getRepoVersionDict(self, versionFile):
+    if versionFile:
+      return getRepoVersionDictFromRepoVersionFile(
+        os.path.join(self.baseDir, versionFile), self.baseRepoName)
+    return None
+
+  def getRepoName(self, repo):
+    return getRepoName(repo, self.baseRepoName)
+
+  # Get the list of (repo, repoStats) for the repos in the order that they
+  # are listed in .gitdist (like dist-repo-status)
+  def status(self, parallel=None):
+    options = self.getOptions(parallel)
+    return [ (repo, repoStats) for (repoID, repo, repoStats) in \
+      getReposStatsInParallel(options, self.reposList, self.baseDir,
+        repoAttrsDict=self.repoAttrsDict) ]
+
+  # Run the git command 'git <cmndLineArgsArray>' in each repo (with
+  # _VERSION_, _VERSION2_ and _DEFAULT_BRANCH_ replaced) and return the list
+  # of RepoCmndResult objects in the order that the repos are processed (i.e.
+  # one level of the repo dependencies at a time).  The git command is run in
+  # 'parallel' repos at the same time (default --dist-parallel or 1).  With
+  # --dist-mod-only, only the repos with local changes are included.
+  def run(self, cmndLineArgsArray, parallel=None):
+    options = self.getOptions(parallel)
+    if options.modifiedOnly:
+      reposList = [ repo for (repo, repoStats) in self.status(parallel) \
+        if repoStats.hasLocalChanges() ]
+    else:
+      reposList = self.reposList
+    def runOneRepoCmnd(repo):
+      egCmndArray = getRepoCmndArray(options, cmndLineArgsArray, repo,
+        self.repoVersionDict, self.repoVersionDict2, self.defaultBranchDict)
+      startTime = time.time()
+      (output, rtnCode) = getRepoCmndOutput(options, egCmndArray,
+        os.path.join(self.baseDir, repo))
+      return RepoCmndResult(repo, self.getRepoName(repo), egCmndArray, output,
+        rtnCode, time.time() - startTime)
+    repoCmndResultsDict = {}
+    failedReposSet = set()
+    processedReposList = []
+    for repoLevel in getRepoDependencyLevels(reposList, self.repoDepsDict):
+      levelReposList = []
+      for repoIdx in repoLevel:
+        repo = reposList[repoIdx]
+        processedReposList.append(repo)
+        failedRepoDeps = getFailedRepoDeps(repo, self.repoDepsDict,
+          failedReposSet)
+        if failedRepoDeps:
+          repoCmndResultsDict[repo] = RepoCmndResult(repo,
+            self.getRepoName(repo), None, getSkippedRepoMsg(failedRepoDeps),
+            None, 0.0)
+          failedReposSet.add(repo)
+        else:
+          levelReposList.append(repo)
+      for repoCmndResult in parallelMapInOrder(runOneRepoCmnd, levelReposList,
+        getNumParallelRepoCmnds(options)) \
+        :
+        repoCmndResultsDict[repoCmndResult.repo] = repoCmndResult
+        if repoCmndResult.rtnCode != 0:
+          failedReposSet.add(repoCmndResult.repo)
+    return [ repoCmndResultsDict[repo] for repo in processedReposList ]
+
+
 #
 # Run the script
 #
@@ -1568,7 +4993,7 @@ baseRepoName = None
 if __name__ == '__main__':
 
   (options, nativeCmnd, otherArgs, reposFullList, defaultBranchDict, \
-    notReposList) = getCommandlineOps()
+    notReposList, repoAttrsDict) = getCommandlineOps()
 
   if nativeCmnd == "dist-repo-status":
     distRepoStatus = True
@@ -1576,8 +5001,73 @@ if __name__ == '__main__':
       print("Error, passing in extra git commands/args ='" + " ".join(otherArgs)
             + "' with special comamnd 'dist-repo-status is not allowed!")
       sys.exit(1)
+    if options.liveStatus and options.statusFormat != "table":
+      print("Error, --dist-live can't be used with --dist-format="
+            + options.statusFormat + "!")
+      sys.exit(1)
   else:
     distRepoStatus = False
+    if options.liveStatus:
+      print("Error, --dist-live is only applicable with dist-repo-status!")
+      sys.exit(1)
+
+  if nativeCmnd == "dist-discover":
+    if len(otherArgs) > 0:
+      print("Error, passing in extra git commands/args ='" + " ".join(otherArgs)
+            + "' with special comamnd 'dist-discover is not allowed!")
+      sys.exit(1)
+    baseDir = os.getcwd()
+    if options.discoverIgnore:
+      ignoreGlobsList = options.discoverIgnore.split(",")
+    else:
+      ignoreGlobsList = []
+    if options.useCache:
+      discoverCacheFilePath = getGitdistCacheFilePath(baseDir,
+        "gitdist-discover-cache")
+    else:
+      discoverCacheFilePath = None
+    discoveredReposList = discoverRepos(baseDir, ignoreGlobsList,
+      getNumParallelRepoStats(options), discoverCacheFilePath)
+    if not options.repos and (os.path.exists(".gitdist") or
+      os.path.exists(".gitdist.default")) \
+      :
+      listedReposList = reposFullList
+    else:
+      listedReposList = []
+    (mergedReposList, notFoundReposList) = mergeDiscoveredRepos(
+      listedReposList, discoveredReposList)
+    gitdistFileStr = getGitdistFileStr(mergedReposList, defaultBranchDict,
+      repoAttrsDict)
+    gitdistFile = open(".gitdist", 'w')
+    try:
+      gitdistFile.write(gitdistFileStr)
+    finally:
+      gitdistFile.close()
+    print("Wrote " + str(len(mergedReposList)) + " git repos to the file"
+          + " .gitdist:\n")
+    sys.stdout.write(gitdistFileStr)
+    if notFoundReposList:
+      print("\nNOTE: Kept the " + str(len(notFoundReposList)) + " listed repos"
+        + " that were not found (remove them from .gitdist by hand if they are"
+        + " gone for good): " + ", ".join(notFoundReposList))
+    sys.stdout.flush()
+    sys.exit(0)
+
+  if nativeCmnd == "dist-clone":
+    if len(otherArgs) > 0:
+      print("Error, passing in extra git commands/args ='" + " ".join(otherArgs)
+            + "' with special comamnd 'dist-clone is not allowed!")
+      sys.exit(1)
+    failedCloneReposList = cloneRepos(options,
+      [ repo for repo in reposFullList if not repo in notReposList ],
+      defaultBranchDict, repoAttrsDict, os.getcwd())
+    print("")
+    if failedCloneReposList:
+      print(addColorToErrorMsg(options.useColor,
+        "Error, failed to clone " + str(len(failedCloneReposList)) + " repos: "
+        + ", ".join(failedCloneReposList)))
+      sys.exit(1)
+    sys.exit(0)
 
   # Get the reference base directory
   baseDir = os.getcwd()
@@ -1597,59 +5087,197 @@ if __name__ == '__main__':
     print("*** Using git: " + str(options.useGit))
 
   repoStatTable = RepoStatTable()
+  if distRepoStatus:
+    repoStatStreamWriter = getRepoStatStreamWriter(options.statusFormat,
+      sys.stdout)
+  else:
+    repoStatStreamWriter = None
 
-  repoID = 0
-
+  # Get the list of repos to process (in order)
+  reposList = []
   for repo in reposFullList:
+    if repoExistsAndNotExcluded(options, repo, notReposList, baseDir):
+      reposList.append(repo)
 
-    # Determine if we should process this repo
-    processThisExtraRepo = True
-    if not repoExistsAndNotExcluded(options, repo, notReposList):
-      processThisExtraRepo = False
-    if processThisExtraRepo:
-      repoDoesExistsAndNotExcluded = True
-      # cd into extrarepo dir
-      if options.debug:
-        print("\n*** Changing to directory " + repo)
-      os.chdir(repo)
-      # Get repo stats
-      if options.modifiedOnly or distRepoStatus:
-        repoStats = getRepoStats(options)
-      else:
-        repoStats = None
-      # See if we should process based on --dist-mod-only
-      if options.modifiedOnly and not repoStats.hasLocalChanges():
-         processThisExtraRepo = False
-    else:
-      repoDoesExistsAndNotExcluded = False
+  if nativeCmnd == "dist-version-snapshot":
+    if len(otherArgs) > 0:
+      print("Error, passing in extra git commands/args ='" + " ".join(otherArgs)
+            + "' with special comamnd 'dist-version-snapshot is not allowed!")
+      sys.exit(1)
+    headSha1sList = getReposHeadSha1s(options, reposList, baseDir)
+    failedRepoNames = [ getRepoName(reposList[repoIdx], baseRepoName) \
+      for repoIdx in range(len(reposList)) if not headSha1sList[repoIdx] ]
+    if failedRepoNames:
+      print(addColorToErrorMsg(options.useColor,
+        "Error, could not get the SHA1 of HEAD in " + str(len(failedRepoNames))
+        + " repos: " + ", ".join(failedRepoNames)))
+      sys.exit(1)
+    sys.stdout.write(getRepoVersionSnapshotStr(reposList, baseRepoName,
+      headSha1sList))
+    sys.stdout.flush()
+    sys.exit(0)
 
-    # Process this repo
-    if processThisExtraRepo:
-      repoName = getRepoName(repo, baseRepoName)
-      repoNameInTpl = repoName + (" (Base)" if repo=="." else "") 
-      if distRepoStatus:
-        repoStatTable.insertRepoStat(repoNameInTpl, repoStats, repoID)
-        processThisExtraRepo = False
-      else:
-        print("")
-        print(
-          "*** " + ("Base " if repo=="." else "") + "Git Repo: "
-          + addColorToRepoDir(options.useColor,repoName) )
-        sys.stdout.flush()
-        if options.debug:
-          print("*** Tracking branch for git repo '" + repoName + "' = '" +
-                repoStats.trackingBranch + "'")
-        runRepoCmnd(options, cmndLineArgsArray, repo, baseDir, \
-          repoVersionDict, repoVersionDict2, defaultBranchDict)
-        if options.debug:
-          print("*** Changing to directory " + baseDir)
+  if nativeCmnd == "dist-grep":
+    unsupportedGrepArgsMsg = getUnsupportedGrepArgsMsg(cmndLineArgsArray)
+    if unsupportedGrepArgsMsg:
+      print(addColorToErrorMsg(options.useColor, unsupportedGrepArgsMsg))
+      sys.exit(2)
+    sys.exit(runReposGrep(options, cmndLineArgsArray, reposList, baseDir,
+      options.maxCount))
 
-    if repoDoesExistsAndNotExcluded:
-      repoID += 1
+  if nativeCmnd == "dist-log":
+    try:
+      getRepoLogFormatAndArgs(cmndLineArgsArray)
+    except Exception as e:
+      print(addColorToErrorMsg(options.useColor, str(e)))
+      sys.exit(1)
+    failedRepoNames = runReposLog(options, cmndLineArgsArray, reposList,
+      baseDir, baseRepoName, options.maxCount)
+    if failedRepoNames:
+      sys.stderr.write(addColorToErrorMsg(options.useColor,
+        "Error, 'git log' failed in " + str(len(failedRepoNames)) + " of "
+        + str(len(reposList)) + " repos: " + ", ".join(failedRepoNames))
+        + "\n")
+      sys.exit(1)
+    sys.exit(0)
 
-    os.chdir(baseDir)
+  # Process the repos in the order of the levels of their dependencies
+  repoDepsDict = getRepoDepsDict(reposFullList, repoAttrsDict)
+  if not distRepoStatus:
+    reposList = [ reposList[repoIdx] \
+      for repoLevel in getRepoDependencyLevels(reposList, repoDepsDict) \
+      for repoIdx in repoLevel ]
+  failedReposSet = set()
 
-  if distRepoStatus:
+  if nativeCmnd == "dist-daemon":
+    if len(otherArgs) > 0:
+      print("Error, passing in extra git commands/args ='" + " ".join(otherArgs)
+            + "' with special comamnd 'dist-daemon is not allowed!")
+      sys.exit(1)
+    runRepoStatsDaemon(options, reposList, baseDir, repoAttrsDict)
+    sys.exit(0)
+
+  if nativeCmnd == "dist-maintenance":
+    if len(otherArgs) > 0:
+      print("Error, passing in extra git commands/args ='" + " ".join(otherArgs)
+            + "' with special comamnd 'dist-maintenance is not allowed!")
+      sys.exit(1)
+    failedRepoNames = runReposMaintenance(options, reposList, baseDir,
+      baseRepoName)
+    if failedRepoNames:
+      print(addColorToErrorMsg(options.useColor,
+        "Error, the maintenance failed in " + str(len(failedRepoNames))
+        + " of " + str(len(reposList)) + " repos: "
+        + ", ".join(failedRepoNames)))
+      sys.exit(1)
+    sys.exit(0)
+
+  if distRepoStatus and options.liveStatus:
+    runRepoStatusLive(options, reposList, baseDir, baseRepoName, repoAttrsDict)
+    sys.exit(0)
+
+  # Get the repo stats for several repos at the same time (yielded in order
+  # except for the streaming --dist-format=<fmt> output)
+  if options.modifiedOnly or distRepoStatus:
+    reposAndStatsIter = getReposStatsInParallel(options, reposList, baseDir,
+      inOrder=(repoStatStreamWriter is None), repoAttrsDict=repoAttrsDict)
+  else:
+    reposAndStatsIter = [ (repoID, reposList[repoID], None) \
+      for repoID in range(len(reposList)) ]
+
+  # List of (repo, repoName, repoStats) to run in parallel below
+  parallelRepoDataList = []
+
+  # Timing of the git command in each repo (see --dist-timing)
+  repoCmndTimingTable = RepoCmndTimingTable()
+  if not distRepoStatus and not options.noOpt and options.useCache and \
+    (options.printTiming or getNumParallelRepoCmnds(options) > 1) \
+    :
+    repoCmndTimingHistory = RepoCmndTimingHistory(
+      getGitdistCacheFilePath(baseDir, "gitdist-timing-history"))
+  else:
+    repoCmndTimingHistory = None
+  repoCmndTimingName = getRepoCmndTimingName(cmndLineArgsArray)
+  cmndsStartTime = time.time()
+
+  # Repos where the git command failed or was skipped (see after=), the
+  # number of repos where the git command was run or skipped, and the number
+  # of skipped repos (without --dist-parallel)
+  failedRepoNames = []
+  numCmndRepos = 0
+  numSkippedRepos = 0
+
+  for (repoID, repo, repoStats) in reposAndStatsIter:
+
+    # See if we should process based on --dist-mod-only
+    if options.modifiedOnly and not repoStats.hasLocalChanges():
+      continue
+
+    # Process this repo
+    repoName = getRepoName(repo, baseRepoName)
+    repoNameInTpl = repoName + (" (Base)" if repo=="." else "") 
+    if repoStatStreamWriter:
+      repoStatStreamWriter.insertRepoStat(repoID, repo, repoName, repoStats)
+    elif distRepoStatus:
+      repoStatTable.insertRepoStat(repoNameInTpl, repoStats, repoID)
+    elif getNumParallelRepoCmnds(options) > 1:
+      parallelRepoDataList.append((repo, repoName, repoStats))
+    elif getFailedRepoDeps(repo, repoDepsDict, failedReposSet):
+      numCmndRepos += 1
+      numSkippedRepos += 1
+      print("")
+      print(getRepoHeaderStr(options, repo, repoName))
+      print(getSkippedRepoMsg(
+        getFailedRepoDeps(repo, repoDepsDict, failedReposSet)))
+      print("")
+      sys.stdout.flush()
+      failedRepoNames.append(repoName)
+      failedReposSet.add(repo)
+    else:
+      numCmndRepos += 1
+      # cd into extrarepo dir
+      if options.debug:
+        print("\n*** Changing to directory " + repo)
+      os.chdir(repo)
+      print("")
+      print(getRepoHeaderStr(options, repo, repoName))
+      sys.stdout.flush()
+      if options.debug:
+        print("*** Tracking branch for git repo '" + repoName + "' = '" +
+              getRepoTrackingBranch(options, repoStats, ".") + "'")
+      repoCmndStartTime = time.time()
+      rtnCode = runRepoCmnd(options, cmndLineArgsArray, repo, baseDir, \
+        repoVersionDict, repoVersionDict2, defaultBranchDict)
+      wallTimeSec = time.time() - repoCmndStartTime
+      if rtnCode != 0:
+        failedRepoNames.append(repoName)
+        failedReposSet.add(repo)
+      repoCmndTimingTable.insertRepoCmndTiming(repoName, wallTimeSec, rtnCode)
+      if repoCmndTimingHistory:
+        repoCmndTimingHistory.addTime(os.path.join(baseDir, repo),
+          repoCmndTimingName, wallTimeSec)
+      if options.debug:
+        print("*** Changing to directory " + baseDir)
+      os.chdir(baseDir)
+
+  if parallelRepoDataList:
+    numCmndRepos = len(parallelRepoDataList)
+    (failedRepoNames, repoCmndTimingsList) = runRepoCmndsInParallel(options,
+      cmndLineArgsArray, parallelRepoDataList, baseDir, repoVersionDict,
+      repoVersionDict2, defaultBranchDict, repoCmndTimingHistory,
+      repoDepsDict)
+    for (repo, repoName, wallTimeSec, rtnCode) in repoCmndTimingsList:
+      repoCmndTimingTable.insertRepoCmndTiming(repoName, wallTimeSec, rtnCode)
+      if repoCmndTimingHistory:
+        repoCmndTimingHistory.addTime(os.path.join(baseDir, repo),
+          repoCmndTimingName, wallTimeSec)
+
+  if repoCmndTimingHistory:
+    repoCmndTimingHistory.write()
+
+  if repoStatStreamWriter:
+    None  # Already printed
+  elif distRepoStatus:
     print(createAsciiTable(repoStatTable.getTableData()))
     if options.printLegend:
       print(distRepoStatusLegend)
@@ -1658,4 +5286,20 @@ if __name__ == '__main__':
   else:
     print("")
 
+  if options.printTiming and not distRepoStatus:
+    print("Wall time of the git command in each repo (slowest first):\n")
+    print(createAsciiTable(repoCmndTimingTable.getTableData()))
+    print("Total wall time: %.2f sec (sum over repos: %.2f sec)\n" % (
+      time.time() - cmndsStartTime, repoCmndTimingTable.getTotalRepoTimeSec()))
+
   sys.stdout.flush()
+
+  # Without --dist-parallel, a failed git command only gives an error if it
+  # made gitdist skip other repos (e.g. 'gitdist grep' returns 1 in the repos
+  # without a match)
+  if failedRepoNames and (parallelRepoDataList or numSkippedRepos):
+    print(addColorToErrorMsg(options.useColor,
+      "Error, the git command failed in "+str(len(failedRepoNames))+" of "
+      +str(numCmndRepos)+" repos: "+", ".join(failedRepoNames)))
+    sys.stdout.flush()
+    sys.exit(1)
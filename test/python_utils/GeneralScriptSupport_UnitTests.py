@@ -0,0 +1,287 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+thisScriptsDir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(thisScriptsDir, "..", "..", "python_utils"))
+
+from GeneralScriptSupport import *
+
+
+def readFile(filePath):
+  fileHandle = open(filePath, 'r')
+  try:
+    return fileHandle.read()
+  finally:
+    fileHandle.close()
+
+
+def readFileBytes(filePath):
+  fileHandle = open(filePath, 'rb')
+  try:
+    return fileHandle.read()
+  finally:
+    fileHandle.close()
+
+
+#
+# Test SysCmndOutputLines and runSysCmndStreaming()
+#
+
+class test_SysCmndOutputLines(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="GeneralScriptSupport_UnitTests_")
+    g_sysCmndInterceptor.clear()
+
+  def tearDown(self):
+    g_sysCmndInterceptor.clear()
+    shutil.rmtree(self.testDir, ignore_errors=True)
+
+  def test_lines_and_rtnCode(self):
+    cmndOutputLines = SysCmndOutputLines("echo line1; echo line2; exit 3")
+    self.assertEqual(list(cmndOutputLines), [ "line1\n", "line2\n" ])
+    self.assertEqual(cmndOutputLines.rtnCode, 3)
+
+  def test_runSysCmndStreaming(self):
+    linesList = []
+    self.assertEqual(runSysCmndStreaming("echo line1; exit 2",
+      lineFunc=linesList.append, throwExcept=False), 2)
+    self.assertEqual(linesList, [ "line1\n" ])
+    self.assertRaises(RuntimeError, runSysCmndStreaming, "exit 2")
+
+  def test_intercepted(self):
+    g_sysCmndInterceptor.readCommandsFromStr(
+      "IT: make all; 2; 'built'\n" )
+    outFile = os.path.join(self.testDir, "make.out")
+    cmndOutputLines = SysCmndOutputLines("make all", outFile=outFile)
+    self.assertEqual(list(cmndOutputLines), [ "built\n" ])
+    self.assertEqual(cmndOutputLines.rtnCode, 2)
+    g_sysCmndInterceptor.assertAllCommandsRun()
+    self.assertEqual(readFile(outFile), "built\n")
+
+  def test_outFile_and_echo(self):
+    outFile = os.path.join(self.testDir, "cmnd.out")
+    echoFile = os.path.join(self.testDir, "echo.out")
+    savedStdout = sys.stdout
+    sys.stdout = open(echoFile, 'w')
+    try:
+      linesList = list(SysCmndOutputLines("echo line1; echo line2",
+        outFile=outFile, echoOutput=True))
+    finally:
+      sys.stdout.close()
+      sys.stdout = savedStdout
+    self.assertEqual(linesList, [ "line1\n", "line2\n" ])
+    self.assertEqual(readFile(outFile), "line1\nline2\n")
+    self.assertEqual(readFile(echoFile), "line1\nline2\n")
+
+  def test_non_utf8_output(self):
+    outFile = os.path.join(self.testDir, "cmnd.out")
+    cmndOutputLines = SysCmndOutputLines("printf 'caf\\351\\n'",
+      outFile=outFile)
+    linesList = list(cmndOutputLines)
+    self.assertEqual(cmndOutputLines.rtnCode, 0)
+    if sys.version_info >= (3,):
+      self.assertEqual(linesList, [ "caf\ufffd\n" ])
+    else:
+      self.assertEqual(linesList, [ "caf\351\n" ])
+    self.assertEqual(readFileBytes(outFile), b("caf\351\n"))
+
+  def test_stop_early_kills_cmnd(self):
+    touchedFile = os.path.join(self.testDir, "touched.txt")
+    cmndOutputLines = SysCmndOutputLines(
+      "echo line1; sleep 2; touch "+touchedFile+"; echo line2")
+    for line in cmndOutputLines:
+      break  # Closes the generator which kills the command
+    self.assertEqual(line, "line1\n")
+    self.assertEqual(cmndOutputLines.rtnCode, None)
+    time.sleep(2.5)
+    self.assertEqual(os.path.exists(touchedFile), False)
+
+
+#
+# Test runSysCmndsParallel()
+#
+
+class test_runSysCmndsParallel(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="GeneralScriptSupport_UnitTests_")
+    g_sysCmndInterceptor.clear()
+
+  def tearDown(self):
+    g_sysCmndInterceptor.clear()
+    shutil.rmtree(self.testDir, ignore_errors=True)
+
+  def test_intercepted_jobs(self):
+    g_sysCmndInterceptor.readCommandsFromStr(
+      "IT: make -C build1; 0; 'built build1'\n"
+      "IT: make -C build2; 2; 'failed build2'\n"
+      "IT: make -C build3; 0; 'built build3'\n" )
+    outFile = os.path.join(self.testDir, "build2.out")
+    jobResultsList = runSysCmndsParallel(
+      [ "make -C build1", SysCmndJob("make -C build2", outFile=outFile),
+        "make -C build3" ],
+      numParallel=2, verbose=False)
+    g_sysCmndInterceptor.assertAllCommandsRun()
+    self.assertEqual([ jobResult.job.cmnd for jobResult in jobResultsList ],
+      [ "make -C build1", "make -C build2", "make -C build3" ])
+    self.assertEqual([ jobResult.rtnCode for jobResult in jobResultsList ],
+      [ 0, 2, 0 ])
+    self.assertEqual([ jobResult.failed() for jobResult in jobResultsList ],
+      [ False, True, False ])
+    self.assertEqual(readFile(outFile), "failed build2\n")
+
+  def test_intercepted_jobs_not_keep_going(self):
+    g_sysCmndInterceptor.readCommandsFromStr(
+      "IT: make -C build1; 1; ''\n" )
+    g_sysCmndInterceptor.setAllowExtraCmnds(False)
+    jobResultsList = runSysCmndsParallel(
+      [ "make -C build1", "make -C build2" ], keepGoing=False, verbose=False)
+    g_sysCmndInterceptor.assertAllCommandsRun()
+    self.assertEqual([ jobResult.rtnCode for jobResult in jobResultsList ],
+      [ 1, None ])
+
+  def test_timeout_kills_all_processes(self):
+    touchedFile = os.path.join(self.testDir, "touched.txt")
+    jobResultsList = runSysCmndsParallel(
+      [ SysCmndJob("(sleep 2; touch "+touchedFile+"); true", timeout=0.5) ],
+      verbose=False)
+    self.assertEqual(jobResultsList[0].timedOut, True)
+    self.assertEqual(jobResultsList[0].failed(), True)
+    time.sleep(2.5)
+    self.assertEqual(os.path.exists(touchedFile), False)
+
+  def test_invalid_numParallel(self):
+    self.assertRaises(Exception, runSysCmndsParallel, [ "true" ],
+      numParallel=0)
+
+
+#
+# Test the per-thread working dir set by echoChDir() in a non-main thread
+#
+
+class test_threadWorkingDir(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="GeneralScriptSupport_UnitTests_")
+    self.subDir = os.path.join(self.testDir, "sub")
+    os.mkdir(self.subDir)
+    g_sysCmndInterceptor.clear()
+
+  def tearDown(self):
+    g_sysCmndInterceptor.clear()
+    shutil.rmtree(self.testDir, ignore_errors=True)
+
+  # Run func() in a new thread and return what it returned (or rethrow)
+  def runInThread(self, func):
+    resultList = []
+    def threadFunc():
+      try:
+        resultList.append((True, func()))
+      except Exception as e:
+        resultList.append((False, e))
+    thread = threading.Thread(target=threadFunc)
+    thread.start()
+    thread.join()
+    (succeeded, result) = resultList[0]
+    if not succeeded:
+      raise result
+    return result
+
+  def test_file_helpers(self):
+    origDir = os.getcwd()
+    def threadFunc():
+      echoChDir(self.testDir, verbose=False)
+      echoChDir("sub", verbose=False)
+      runSysCmnd("touch a")
+      writeStrToFile("b", "x")
+      createDir("c")
+      return (getCurrentWorkingDir(), readStrFromFile("b"),
+        os.path.exists(getThreadPath("a")), isEmptyDir("c"))
+    self.assertEqual(self.runInThread(threadFunc),
+      (self.subDir, "x", True, True))
+    self.assertEqual(os.getcwd(), origDir)
+    self.assertEqual(sorted(os.listdir(self.subDir)), [ "a", "b", "c" ])
+
+  def test_relative_outFile(self):
+    g_sysCmndInterceptor.readCommandsFromStr(
+      "IT: echo intercepted1; 0; 'intercepted1'\n"
+      "IT: echo intercepted2; 0; 'intercepted2'\n"
+      "FT: echo ran.*\n" )
+    def threadFunc():
+      echoChDir(self.testDir, verbose=False)
+      runSysCmnd("echo intercepted1", outFile="out1.txt", workingDir="sub")
+      runSysCmnd("echo ran3", outFile="out3.txt", workingDir="sub")
+      runSysCmndsParallel(
+        [ SysCmndJob("echo intercepted2", workingDir="sub",
+            outFile="out2.txt"),
+          SysCmndJob("echo ran4", workingDir="sub", outFile="out4.txt") ],
+        verbose=False)
+    self.runInThread(threadFunc)
+    g_sysCmndInterceptor.assertAllCommandsRun()
+    for (outFileName, outFileStr) in (("out1.txt", "intercepted1\n"),
+      ("out2.txt", "intercepted2\n"), ("out3.txt", "ran3\n"),
+      ("out4.txt", "ran4\n")) \
+      :
+      self.assertEqual(readFile(os.path.join(self.subDir, outFileName)),
+        outFileStr)
+
+
+
+#
+# Test getCmndOutput(..., cacheOutput=True) and CmndOutputCache
+#
+
+class test_cmndOutputCache(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="GeneralScriptSupport_UnitTests_")
+    self.cacheFile = os.path.join(self.testDir, "cmndOutputCache.json")
+    self.savedCacheFile = g_cmndOutputCache.getCacheFile()
+    g_cmndOutputCache.setCacheFile(self.cacheFile)
+    g_cmndOutputCache.clear()
+
+  def tearDown(self):
+    g_cmndOutputCache.clear()
+    g_cmndOutputCache.setCacheFile(self.savedCacheFile)
+    shutil.rmtree(self.testDir, ignore_errors=True)
+
+  def test_cache_hit(self):
+    counterFile = os.path.join(self.testDir, "counter.txt")
+    cmnd = "echo x >> "+counterFile+" && echo found"
+    for run_i in range(2):
+      self.assertEqual(getCmndOutput(cmnd, True, cacheOutput=True),
+        b("found"))
+    self.assertEqual(readFile(counterFile), "x\n")
+    # Also read back from the cache file
+    g_cmndOutputCache.setCacheFile(self.cacheFile)
+    self.assertEqual(getCmndOutput(cmnd, True, cacheOutput=True), b("found"))
+    self.assertEqual(readFile(counterFile), "x\n")
+
+  def test_failure_not_cached(self):
+    existsFile = os.path.join(self.testDir, "exists.txt")
+    cmnd = "cat "+existsFile
+    self.assertEqual(getCmndOutput(cmnd, True, False, cacheOutput=True,
+      rtnCode=True)[1] != 0, True)
+    self.assertEqual(os.path.exists(self.cacheFile), False)
+    writeStrToFile(existsFile, "now exists\n")
+    self.assertEqual(getCmndOutput(cmnd, True, cacheOutput=True),
+      b("now exists"))
+
+  def test_wrong_shape_cache_file(self):
+    for cacheFileStr in ('[1, 2]', '{"key": 1}', '{"key": [1]}',
+      '{"key": ["a", "b", 0]}') \
+      :
+      writeStrToFile(self.cacheFile, cacheFileStr)
+      g_cmndOutputCache.setCacheFile(self.cacheFile)
+      self.assertEqual(getCmndOutput("echo ok", True, cacheOutput=True),
+        b("ok"))
+
+
+if __name__ == '__main__':
+  unittest.main()
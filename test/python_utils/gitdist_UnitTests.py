@@ -0,0 +1,464 @@
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+thisScriptsDir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(thisScriptsDir, "..", "..", "python_utils"))
+
+import gitdist
+
+
+def runGit(repoDir, gitArgsList):
+  devNull = open(os.devnull, 'w')
+  try:
+    subprocess.check_call(["git", "-c", "user.name=Test User",
+      "-c", "user.email=test.user@example.com"] + gitArgsList,
+      cwd=repoDir, stdout=devNull, stderr=devNull)
+  finally:
+    devNull.close()
+
+
+def writeFile(filePath, fileStr):
+  fileHandle = open(filePath, 'w')
+  try:
+    fileHandle.write(fileStr)
+  finally:
+    fileHandle.close()
+
+
+# Set the mtime of all of the files and dirs under topDir (including topDir)
+def setTreeMtime(topDir, mtime):
+  for (dirPath, subdirNamesList, fileNamesList) in os.walk(topDir):
+    for fileName in fileNamesList:
+      os.utime(os.path.join(dirPath, fileName), (mtime, mtime))
+  for (dirPath, subdirNamesList, fileNamesList) in os.walk(topDir):
+    os.utime(dirPath, (mtime, mtime))
+
+
+#
+# Test the repo stats cache (getRepoStatsUsingCache())
+#
+
+class test_getRepoStatsUsingCache(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="gitdist_UnitTests_")
+    # Don't let the user's global git config change the results
+    self.savedEnvDict = {}
+    for (envVar, envValue) in (("HOME", self.testDir),
+      ("XDG_CONFIG_HOME", os.path.join(self.testDir, ".config")),
+      ("GIT_CONFIG_NOSYSTEM", "1")) \
+      :
+      self.savedEnvDict[envVar] = os.environ.get(envVar, None)
+      os.environ[envVar] = envValue
+    self.repoDir = os.path.join(self.testDir, "Repo")
+    os.mkdir(self.repoDir)
+    runGit(self.repoDir, ["init", "-q", "."])
+    writeFile(os.path.join(self.repoDir, "tracked.txt"), "tracked\n")
+    runGit(self.repoDir, ["add", "tracked.txt"])
+    runGit(self.repoDir, ["commit", "-q", "-m", "Initial commit"])
+    os.mkdir(os.path.join(self.repoDir, "untrackedDir"))
+    writeFile(os.path.join(self.repoDir, "untrackedDir", "file.txt"), "x\n")
+    self.options = gitdist.Workspace(self.repoDir).getOptions()
+    self.cacheFilePath = os.path.join(self.testDir, "gitdist-cache")
+    self.numGetRepoStatsCalls = 0
+    self.savedGetRepoStats = gitdist.getRepoStats
+    def getRepoStatsCounted(*args, **kwargs):
+      self.numGetRepoStatsCalls += 1
+      return self.savedGetRepoStats(*args, **kwargs)
+    gitdist.getRepoStats = getRepoStatsCounted
+    self.backdateRepo(100)
+
+  def tearDown(self):
+    gitdist.getRepoStats = self.savedGetRepoStats
+    for (envVar, envValue) in self.savedEnvDict.items():
+      if envValue is None:
+        del os.environ[envVar]
+      else:
+        os.environ[envVar] = envValue
+    shutil.rmtree(self.testDir)
+
+  # Backdate all of the files in the repo so that their signature can be
+  # cached (and refresh the index and keep it newer than the files so that
+  # 'git status' does not rewrite it)
+  def backdateRepo(self, secondsAgo):
+    mtime = time.time() - secondsAgo
+    setTreeMtime(self.repoDir, mtime)
+    runGit(self.repoDir, ["update-index", "-q", "--refresh"])
+    setTreeMtime(os.path.join(self.repoDir, ".git"), mtime + 10)
+
+  def getRepoStats(self, repoStatsCache):
+    return gitdist.getRepoStatsUsingCache(self.options, self.repoDir,
+      repoStatsCache)
+
+  def test_cache_hit(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    repoStats = self.getRepoStats(repoStatsCache)
+    self.assertEqual(repoStats.numUntracked, "1")
+    self.assertEqual(self.numGetRepoStatsCalls, 1)
+    repoStats = self.getRepoStats(repoStatsCache)
+    self.assertEqual(repoStats.numUntracked, "1")
+    self.assertEqual(self.numGetRepoStatsCalls, 1)
+    # Cache is also used after writing and reading it back
+    repoStatsCache.write()
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    repoStats = self.getRepoStats(repoStatsCache)
+    self.assertEqual(repoStats.numUntracked, "1")
+    self.assertEqual(self.numGetRepoStatsCalls, 1)
+
+  def test_in_memory_cache(self):
+    repoStatsCache = gitdist.RepoStatsCache(None)
+    for run_i in range(2):
+      self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "1")
+    self.assertEqual(self.numGetRepoStatsCalls, 1)
+    repoStatsCache.write()
+    self.assertEqual(os.path.exists(self.cacheFilePath), False)
+
+  def test_staged_tracked_file(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numModified, "0")
+    writeFile(os.path.join(self.repoDir, "tracked.txt"), "changed\n")
+    runGit(self.repoDir, ["add", "tracked.txt"])
+    self.backdateRepo(50)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numModified, "1")
+    self.assertEqual(self.numGetRepoStatsCalls, 2)
+
+  def test_new_commit(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "1")
+    runGit(self.repoDir, ["add", "untrackedDir"])
+    runGit(self.repoDir, ["commit", "-q", "-m", "Second commit"])
+    self.backdateRepo(50)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "0")
+    self.assertEqual(self.numGetRepoStatsCalls, 2)
+
+  def test_untracked_file_in_top_dir(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "1")
+    writeFile(os.path.join(self.repoDir, "untracked.txt"), "x\n")
+    self.backdateRepo(50)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "2")
+    self.assertEqual(self.numGetRepoStatsCalls, 2)
+
+  def test_in_place_edit_not_seen(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numModified, "0")
+    # Documented trade-off of the cheap signature: an in-place edit of a
+    # tracked file does not change the index or the top dir
+    trackedFile = os.path.join(self.repoDir, "tracked.txt")
+    writeFile(trackedFile, "changed\n")
+    mtime = time.time() - 50
+    os.utime(trackedFile, (mtime, mtime))
+    self.assertEqual(self.getRepoStats(repoStatsCache).numModified, "0")
+    self.assertEqual(self.numGetRepoStatsCalls, 1)
+    self.assertEqual(self.getRepoStats(None).numModified, "1")
+
+  def test_info_exclude(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "1")
+    writeFile(os.path.join(self.repoDir, ".git", "info", "exclude"),
+      "untrackedDir/\n")
+    self.backdateRepo(50)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "0")
+    self.assertEqual(self.numGetRepoStatsCalls, 2)
+
+  def test_recently_changed_not_cached(self):
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    writeFile(os.path.join(self.repoDir, "untracked.txt"), "x\n")
+    self.getRepoStats(repoStatsCache)
+    self.getRepoStats(repoStatsCache)
+    self.assertEqual(self.numGetRepoStatsCalls, 2)
+
+  def test_large_repo_cached(self):
+    for dir_i in range(150):
+      subDir = os.path.join(self.repoDir, "dir"+str(dir_i))
+      os.mkdir(subDir)
+      for file_i in range(3):
+        writeFile(os.path.join(subDir, "file"+str(file_i)+".txt"), "x\n")
+    runGit(self.repoDir, ["add", "."])
+    runGit(self.repoDir, ["commit", "-q", "-m", "Add many files"])
+    self.backdateRepo(100)
+    repoStatsCache = gitdist.RepoStatsCache(self.cacheFilePath)
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "0")
+    self.assertEqual(self.getRepoStats(repoStatsCache).numUntracked, "0")
+    self.assertEqual(self.numGetRepoStatsCalls, 1)
+
+
+
+#
+# Test that dist-version-snapshot writes a file that --dist-version-file reads
+#
+
+class test_repoVersionSnapshot(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="gitdist_UnitTests_")
+    self.reposList = [".", "ExtraRepo1", "ExtraRepo2"]
+    for repo in self.reposList:
+      repoDir = os.path.join(self.testDir, repo)
+      if not os.path.isdir(repoDir):
+        os.mkdir(repoDir)
+      runGit(repoDir, ["init", "-q", "."])
+      for commit_i in range(2):
+        writeFile(os.path.join(repoDir, repo+".txt"), str(commit_i)+"\n")
+        runGit(repoDir, ["add", repo+".txt"])
+        runGit(repoDir, ["commit", "-q", "-m", "Commit "+str(commit_i)])
+    # Branch only in packed-refs
+    runGit(os.path.join(self.testDir, "ExtraRepo1"), ["pack-refs", "--all"])
+    # Detached HEAD at the first commit
+    runGit(os.path.join(self.testDir, "ExtraRepo2"),
+      ["checkout", "-q", "--detach", "HEAD~1"])
+
+  def tearDown(self):
+    shutil.rmtree(self.testDir)
+
+  def getGitHeadSha1(self, repo):
+    return subprocess.Popen(["git", "rev-parse", "HEAD"],
+      cwd=os.path.join(self.testDir, repo), stdout=subprocess.PIPE
+      ).communicate()[0].decode("ascii").strip()
+
+  def test_round_trip(self):
+    extraRepo1Dir = os.path.join(self.testDir, "ExtraRepo1")
+    (headType, headRef) = gitdist.GitRepoRefReader(extraRepo1Dir).getHead()
+    self.assertEqual(headType, "ref")
+    self.assertFalse(os.path.exists(os.path.join(extraRepo1Dir, ".git",
+      headRef)))  # Only in packed-refs
+    options = gitdist.Workspace(self.testDir).getOptions()
+    numGitCmnds = [0]
+    savedGetCmndOutput = gitdist.getCmndOutput
+    def getCmndOutputCounted(*args, **kwargs):
+      numGitCmnds[0] += 1
+      return savedGetCmndOutput(*args, **kwargs)
+    gitdist.getCmndOutput = getCmndOutputCounted
+    try:
+      headSha1sList = gitdist.getReposHeadSha1s(options, self.reposList,
+        self.testDir)
+    finally:
+      gitdist.getCmndOutput = savedGetCmndOutput
+    self.assertEqual(numGitCmnds[0], 0)  # All read from the git files
+    expectedHeadSha1sList = \
+      [ self.getGitHeadSha1(repo) for repo in self.reposList ]
+    self.assertEqual(headSha1sList, expectedHeadSha1sList)
+    snapshotStr = gitdist.getRepoVersionSnapshotStr(self.reposList,
+      "BaseRepo", headSha1sList)
+    self.assertEqual(snapshotStr,
+      "*** Base Git Repo: BaseRepo\n" + expectedHeadSha1sList[0] + "\n" +
+      "*** Git Repo: ExtraRepo1\n" + expectedHeadSha1sList[1] + "\n" +
+      "*** Git Repo: ExtraRepo2\n" + expectedHeadSha1sList[2] + "\n")
+    self.assertEqual(
+      gitdist.getRepoVersionDictFromRepoVersionFileString(snapshotStr,
+        "BaseRepo"),
+      { "." : expectedHeadSha1sList[0],
+        "ExtraRepo1" : expectedHeadSha1sList[1],
+        "ExtraRepo2" : expectedHeadSha1sList[2] })
+
+
+
+#
+# Test merging the repos found by dist-discover into the listed repos
+#
+
+class test_mergeDiscoveredRepos(unittest.TestCase):
+
+  def test_no_listed_repos(self):
+    self.assertEqual(gitdist.mergeDiscoveredRepos([], [".", "A", "B"]),
+      ([".", "A", "B"], []))
+
+  def test_keep_listed_repos(self):
+    self.assertEqual(
+      gitdist.mergeDiscoveredRepos(["B", "NotCloned", "A"],
+        [".", "A", "B", "C"]),
+      ([".", "B", "NotCloned", "A", "C"], ["NotCloned"]))
+
+
+
+#
+# Test the records written for dist-repo-status --dist-format=jsonl|csv
+#
+
+class test_getRepoStatRecordDict(unittest.TestCase):
+
+  def test_counts(self):
+    repoStats = gitdist.RepoStatsStruct("master", "origin/master", "1", "2",
+      "0", numBehind="3")
+    self.assertEqual(
+      gitdist.getRepoStatRecordDict(1, "ExtraRepo1", "ExtraRepo1", repoStats),
+      { "id" : 1, "repoDir" : "ExtraRepo1", "repoName" : "ExtraRepo1",
+        "branch" : "master", "trackingBranch" : "origin/master",
+        "numCommits" : 1, "numBehind" : 3, "numModified" : 2,
+        "numUntracked" : 0 })
+
+  def test_unknown_counts(self):
+    repoStats = gitdist.RepoStatsStruct("master", "", "", "0", "-")
+    recordDict = gitdist.getRepoStatRecordDict(0, ".", "BaseRepo", repoStats)
+    self.assertEqual(
+      [ recordDict[field] for field in gitdist.repoStatRecordCountFields ],
+      [ None, None, 0, None ])
+
+
+
+#
+# Test the watches and polling of the repo stats daemon (RepoStatsDaemon)
+#
+
+class test_RepoStatsDaemon(unittest.TestCase):
+
+  def setUp(self):
+    self.testDir = tempfile.mkdtemp(prefix="gitdist_UnitTests_")
+    for repo in ("Repo1", "Repo2"):
+      repoDir = os.path.join(self.testDir, repo)
+      os.mkdir(repoDir)
+      runGit(repoDir, ["init", "-q", "."])
+      for dir_i in range(10):
+        os.mkdir(os.path.join(repoDir, "dir"+str(dir_i)))
+      writeFile(os.path.join(repoDir, "tracked.txt"), "tracked\n")
+      runGit(repoDir, ["add", "tracked.txt"])
+      runGit(repoDir, ["commit", "-q", "-m", "Initial commit"])
+      setTreeMtime(repoDir, time.time() - 100)
+    self.repoDaemon = gitdist.RepoStatsDaemon(
+      gitdist.Workspace(self.testDir).getOptions(), self.testDir,
+      ["Repo1", "Repo2"], os.path.join(self.testDir, "daemon.sock"))
+    self.repoDirsList = self.repoDaemon.repoDirsList
+    self.savedMaxNumWatches = gitdist.daemonMaxNumInotifyWatches
+
+  def tearDown(self):
+    gitdist.daemonMaxNumInotifyWatches = self.savedMaxNumWatches
+    self.repoDaemon.inotifyWatcher.close()
+    shutil.rmtree(self.testDir)
+
+  def test_watch_limit(self):
+    if not self.repoDaemon.usesInotify():
+      return
+    # Room for all of the dirs of the first repo but not the second
+    gitdist.daemonMaxNumInotifyWatches = 25
+    for repoDir in self.repoDirsList:
+      self.repoDaemon.updateRepoWatches(repoDir)
+    self.assertEqual(self.repoDaemon.polledRepoDirsSet,
+      set([self.repoDirsList[1]]))
+    self.assertEqual(
+      set(self.repoDaemon.repoWatchDescriptorsDict.keys()),
+      set([self.repoDirsList[0]]))
+    self.assertTrue(len(self.repoDaemon.watchDescriptorsDict) <= 25)
+    # Updating the watches of the watched repo does not add more watches
+    numWatches = len(self.repoDaemon.watchDescriptorsDict)
+    self.repoDaemon.updateRepoWatches(self.repoDirsList[0])
+    self.assertEqual(len(self.repoDaemon.watchDescriptorsDict), numWatches)
+
+  def test_polled_repos(self):
+    self.repoDaemon.polledRepoDirsSet.update(self.repoDirsList)
+    self.repoDaemon.dirtyRepoDirsSet.clear()
+    # The first poll gets the signatures and the later ones only mark the
+    # changed repos as dirty
+    self.repoDaemon.checkPolledRepos(self.repoDirsList)
+    self.repoDaemon.dirtyRepoDirsSet.clear()
+    self.repoDaemon.checkPolledRepos(self.repoDirsList)
+    self.assertEqual(self.repoDaemon.dirtyRepoDirsSet, set())
+    writeFile(os.path.join(self.repoDirsList[1], "untracked.txt"), "x\n")
+    mtime = time.time() - 50
+    os.utime(self.repoDirsList[1], (mtime, mtime))
+    self.repoDaemon.checkPolledRepos(self.repoDirsList)
+    self.assertEqual(self.repoDaemon.dirtyRepoDirsSet,
+      set([self.repoDirsList[1]]))
+
+
+
+#
+# Test the handling of the 'git grep' output and args for dist-grep
+#
+
+class test_distGrep(unittest.TestCase):
+
+  def test_addRepoDirToGrepLine(self):
+    b = gitdist.b
+    self.assertEqual(
+      gitdist.addRepoDirToGrepLine(b("src/a.txt:foo\n"), b("ExtraRepo1/")),
+      b("ExtraRepo1/src/a.txt:foo\n"))
+    self.assertEqual(
+      gitdist.addRepoDirToGrepLine(b("Binary file b.bin matches\n"),
+        b("ExtraRepo1/")),
+      b("Binary file ExtraRepo1/b.bin matches\n"))
+    self.assertEqual(
+      gitdist.addRepoDirToGrepLine(b("src/a.txt:foo\n"), b("")),
+      b("src/a.txt:foo\n"))
+
+  def test_non_utf8_lines(self):
+    b = gitdist.b
+    testDir = tempfile.mkdtemp(prefix="gitdist_UnitTests_")
+    try:
+      runGit(testDir, ["init", "-q", "."])
+      repoDir = os.path.join(testDir, "ExtraRepo1")
+      os.mkdir(repoDir)
+      runGit(repoDir, ["init", "-q", "."])
+      fileHandle = open(os.path.join(repoDir, "latin1.txt"), 'wb')
+      try:
+        fileHandle.write(b("caf\xe9 foo\n"))
+      finally:
+        fileHandle.close()
+      runGit(repoDir, ["add", "latin1.txt"])
+      writeFile(os.path.join(testDir, ".gitdist"), ".\nExtraRepo1\n")
+      child = subprocess.Popen([sys.executable,
+        os.path.join(thisScriptsDir, "..", "..", "python_utils", "gitdist.py"),
+        "dist-grep", "foo"], cwd=testDir, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE)
+      (stdoutBytes, stderrBytes) = child.communicate()
+      self.assertEqual((child.returncode, stdoutBytes, stderrBytes),
+        (0, b("ExtraRepo1/latin1.txt:caf\xe9 foo\n"), b("")))
+    finally:
+      shutil.rmtree(testDir)
+
+  def test_supported_args(self):
+    for grepArgsArray in (["foo"], ["-c", "foo"], ["-z", "foo"],
+      ["-c", "-z", "foo"], ["-l", "foo"], ["-e", "-h"], ["-A", "3", "foo"],
+      ["--context", "-h", "foo"], ["-A1", "foo"], ["-ie", "-h"],
+      ["foo", "--", "-h"]) \
+      :
+      self.assertEqual(gitdist.getUnsupportedGrepArgsMsg(grepArgsArray), "",
+        str(grepArgsArray))
+
+  def test_unsupported_args(self):
+    for (grepArgsArray, unsupportedArg) in (
+      (["-h", "foo"], "'-h'"), (["-ih", "foo"], "'-h'"),
+      (["--no-filename", "foo"], "'--no-filename'"),
+      (["--heading", "foo"], "'--heading'"), (["-Ovim", "foo"], "'-O'"),
+      (["-l", "-z", "foo"], "'-z with -l'"),
+      (["--null", "--name-only", "foo"], "'--null with --name-only'")) \
+      :
+      self.assertTrue(unsupportedArg in
+        gitdist.getUnsupportedGrepArgsMsg(grepArgsArray), str(grepArgsArray))
+
+
+
+#
+# Test the handling of the 'git log' args for dist-log
+#
+
+class test_getRepoLogFormatAndArgs(unittest.TestCase):
+
+  def test_format_args(self):
+    for (logArgsArray, logFormat, otherLogArgsArray) in (
+      ([], gitdist.defaultRepoLogFormat, []),
+      (["-n", "2"], gitdist.defaultRepoLogFormat, ["-n", "2"]),
+      (["--oneline", "--since=1.day"], "%h %s", ["--since=1.day"]),
+      (["--pretty=oneline"], "%H %s", []),
+      (["--format=format:%h"], "%h", []),
+      (["--pretty=tformat:%h %an"], "%h %an", []),
+      (["--pretty=%h|%s"], "%h|%s", []),
+      (["--format=%h", "--", "--oneline"], "%h", ["--", "--oneline"])) \
+      :
+      self.assertEqual(gitdist.getRepoLogFormatAndArgs(logArgsArray),
+        (logFormat, otherLogArgsArray))
+
+  def test_multi_line_formats(self):
+    for logArgsArray in (["--pretty"], ["--pretty=medium"],
+      ["--format=fuller"], ["--pretty=raw"]) \
+      :
+      self.assertRaises(Exception, gitdist.getRepoLogFormatAndArgs,
+        logArgsArray)
+
+
+if __name__ == '__main__':
+  unittest.main()